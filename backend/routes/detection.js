@@ -267,6 +267,7 @@ router.get('/history', authenticateToken, async (req, res) => {
         started_at,
         ended_at,
         preview_image,
+        preview_thumb,
         status
       `)
       .eq('user_id', userId)
@@ -477,7 +478,7 @@ router.get('/stream-result', async (req, res) => {
 });
 router.post('/frame', async (req, res) => {
   try {
-    const { image } = req.body;
+    const { image, session_id } = req.body;
 
     if (!image) {
       return res.status(400).json({ success: false, message: 'No image' });
@@ -485,6 +486,7 @@ router.post('/frame', async (req, res) => {
 
     // 🆕 Try to call Python detection API with timeout
     let pythonData = null;
+    let rejected = null;  // admission Python: 409 superseded / 503 overloaded
     try {
       const controller = new AbortController();
       const timeout = setTimeout(() => controller.abort(), 5000); // Increased to 5s
@@ -493,8 +495,10 @@ router.post('/frame', async (req, res) => {
         method: 'POST',
         headers: { 
           'Content-Type': 'application/json',
+          // Per-session admission slot (latest frame wins) di Python API
+          ...(session_id ? { 'X-Session-Id': String(session_id) } : {}),
         },
-        body: JSON.stringify({ image }),
+        body: JSON.stringify({ image, session_id }),
         signal: controller.signal
       });
 
@@ -503,6 +507,12 @@ router.post('/frame', async (req, res) => {
       if (pythonResponse.ok) {
         pythonData = await pythonResponse.json();
         console.log('✅ Python API response:', pythonData.direction);
+      } else if (pythonResponse.status === 409 || pythonResponse.status === 503) {
+        rejected = {
+          status: pythonResponse.status,
+          retryAfter: pythonResponse.headers.get('Retry-After'),
+          body: await pythonResponse.json().catch(() => ({})),
+        };
       } else {
         console.warn(`⚠️ Python API returned ${pythonResponse.status}`);
       }
@@ -510,6 +520,22 @@ router.post('/frame', async (req, res) => {
       console.warn('⚠️ Python API error:', pythonError.message);
     }
 
+    // Frame ditolak admission: teruskan apa adanya, jangan jatuh ke mock data
+    // (arah acak akan tercatat sebagai kejadian palsu saat server penuh)
+    if (rejected) {
+      console.warn(`⚠️ Frame dropped by Python API (${rejected.status} ${rejected.body.reason || ''})`);
+      if (rejected.retryAfter) {
+        res.set('Retry-After', rejected.retryAfter);
+      }
+      return res.status(rejected.status).json({
+        status: 'dropped',
+        success: false,
+        reason: rejected.body.reason || (rejected.status === 409 ? 'superseded' : 'overloaded'),
+        retry_after_ms: rejected.body.retry_after_ms,
+        message: rejected.body.message || 'Frame dropped',
+      });
+    }
+
     // If Python API returns data, use it. Otherwise use mock data
     if (pythonData && pythonData.success) {
       console.log('✅ Python API response:', {
@@ -0,0 +1,18 @@
+"""
+Akses endpoint /admin/* di detection services
+
+Dengan DETECTION_ADMIN_TOKEN: request wajib mengirim header X-Admin-Token yang sama.
+Tanpa token: hanya dari loopback (Node backend / operator di host yang sama).
+"""
+
+import os
+import hmac
+
+ADMIN_TOKEN = os.getenv('DETECTION_ADMIN_TOKEN', '')
+LOOPBACK = ('127.0.0.1', '::1', 'localhost')
+
+
+def admin_allowed(request):
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+    return request.remote_addr in LOOPBACK
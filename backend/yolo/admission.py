@@ -0,0 +1,163 @@
+"""
+Admission control untuk endpoint deteksi di bawah overload
+
+Flask threaded menerima semua request dan membuat thread baru untuk masing-masing,
+jadi saat client mengirim frame lebih cepat dari inference, latency dan memori
+(frame yang sudah di-decode) naik tanpa batas. Controller ini:
+
+- membatasi jumlah request yang sedang diproses (global in-flight limit)
+- per session hanya satu frame yang boleh menunggu: frame baru dari session yang
+  sama menggantikan frame yang masih menunggu (latest frame wins, 409 superseded);
+  request tanpa session id tidak pernah digabung (bisa saja banyak client di balik
+  satu proxy, mis. Node backend dari 127.0.0.1)
+- antrean global dibatasi dan waktu tunggu dibatasi: kalau penuh / terlalu lama,
+  langsung ditolak 503 + Retry-After (fail fast, frame basi tidak diproses telat)
+
+Admit dilakukan sebelum decode, jadi frame yang ditolak tidak pernah di-decode.
+
+    admission = AdmissionController.from_env()
+
+    try:
+        with admission.admit(session_key(request, data)):
+            ...decode + inference...
+    except Rejected as e:
+        return rejection_response(e)
+
+Konfigurasi:
+    DETECTION_MAX_INFLIGHT       request yang diproses paralel (default: 2)
+    DETECTION_ADMISSION_QUEUE    maksimum session yang menunggu (default: 16)
+    DETECTION_ADMISSION_WAIT_MS  waktu tunggu maksimum sebelum ditolak (default: 500)
+"""
+
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+from flask import jsonify
+
+
+class Rejected(Exception):
+    """Request tidak diterima: reason 'overloaded' | 'timeout' | 'superseded'"""
+
+    def __init__(self, reason, status, retry_after=0.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_inflight=2, max_queue=16, max_wait=0.5):
+        self.max_inflight = max(1, int(max_inflight))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting = {}  # session -> ticket yang sedang menunggu
+        self.inflight = 0
+        self.service_time = 0.0  # EWMA durasi request (detik), untuk Retry-After
+        self.counters = {'admitted': 0, 'overloaded': 0, 'timeout': 0, 'superseded': 0}
+        self.peak_queue = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_inflight=int(os.getenv('DETECTION_MAX_INFLIGHT', '2')),
+            max_queue=int(os.getenv('DETECTION_ADMISSION_QUEUE', '16')),
+            max_wait=float(os.getenv('DETECTION_ADMISSION_WAIT_MS', '500')) / 1000,
+        )
+
+    def _retry_after(self):
+        # Perkiraan waktu sampai antrean sekarang habis, minimal satu durasi request
+        rounds = (len(self._waiting) + self.inflight) / self.max_inflight
+        return max(self.service_time, self.service_time * rounds, 0.05)
+
+    def _reject(self, reason, status):
+        self.counters[reason] += 1
+        return Rejected(reason, status, self._retry_after())
+
+    def _wait_turn(self, session):
+        """Tunggu slot in-flight (dipanggil dengan lock), raise Rejected kalau gagal"""
+        old = self._waiting.get(session)
+        if old is None and len(self._waiting) >= self.max_queue:
+            raise self._reject('overloaded', 503)
+
+        ticket = object()
+        self._waiting[session] = ticket
+        self.peak_queue = max(self.peak_queue, len(self._waiting))
+        if old is not None:
+            self._cond.notify_all()  # bangunkan frame lama supaya langsung dibalas superseded
+
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            if self._waiting.get(session) is not ticket:
+                raise self._reject('superseded', 409)
+            if self.inflight < self.max_inflight:
+                del self._waiting[session]
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                del self._waiting[session]
+                raise self._reject('timeout', 503)
+            self._cond.wait(remaining)
+
+    @contextmanager
+    def admit(self, session=None):
+        """Context manager satu request; raise Rejected kalau tidak diterima"""
+        if session is None:
+            session = object()  # slot sendiri, tidak menggantikan / digantikan request lain
+        with self._cond:
+            # Jangan menyalip request yang sudah menunggu
+            if self.inflight >= self.max_inflight or self._waiting:
+                self._wait_turn(session)
+            self.inflight += 1
+            self.counters['admitted'] += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self.inflight -= 1
+                self.service_time = elapsed if not self.service_time else 0.8 * self.service_time + 0.2 * elapsed
+                self._cond.notify_all()
+
+    @property
+    def queue_depth(self):
+        return len(self._waiting)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'inflight': self.inflight,
+                'max_inflight': self.max_inflight,
+                'queue_depth': len(self._waiting),
+                'max_queue': self.max_queue,
+                'peak_queue': self.peak_queue,
+                'max_wait_ms': round(self.max_wait * 1000),
+                'service_ms': round(self.service_time * 1000, 1),
+                'shed': self.counters['overloaded'] + self.counters['timeout'] + self.counters['superseded'],
+                **self.counters,
+            }
+
+
+def session_key(request, data=None):
+    """Identitas session: session_id di body atau header X-Session-Id, None kalau tidak ada"""
+    if data and data.get('session_id'):
+        return str(data['session_id'])
+    return request.headers.get('X-Session-Id') or None
+
+
+def rejection_response(e):
+    """Response Flask untuk Rejected (Retry-After dalam detik, retry_after_ms lebih presisi)"""
+    body = {
+        'success': False,
+        'status': 'error',
+        'reason': e.reason,
+        'message': 'Frame diganti frame yang lebih baru' if e.reason == 'superseded' else 'Server sedang penuh, coba lagi',
+        'retry_after_ms': round(e.retry_after * 1000),
+    }
+    headers = {'Retry-After': str(max(1, math.ceil(e.retry_after)))} if e.status == 503 else {}
+    return jsonify(body), e.status, headers
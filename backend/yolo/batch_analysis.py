@@ -0,0 +1,584 @@
+"""
+Analisis offline rekaman ujian (video upload / folder gambar) dengan hasil yang sama seperti stream live
+
+    python batch_analysis.py uploads/ujian.mp4 --out batch_results/ujian --vid-stride 5 --batch 8 --workers 4
+    python batch_analysis.py uploads/ujian.mp4 --out batch_results/ujian --resume      # lanjut setelah crash
+    python batch_analysis.py frames/ --image-fps 2 --session-id <id> --user-id <id>     # screenshot ke Supabase
+
+Pipeline per proses worker (model + pose di-load sekali per proses):
+    LoadImages (yolov5/utils/dataloaders.py, vid_stride) di thread prefetch -> antrean batch
+    -> YOLO satu forward per batch -> arah: keypoints landmark head (vectorized per batch)
+       atau MediaPipe Pose per frame seperti detection_stream.py -> frames/<unit>.jsonl
+
+Sharding: video dipotong jadi unit `--unit-seconds` (kelipatan vid_stride, jadi frame yang
+diambil sama persis dengan tanpa sharding), folder gambar per `--unit-images`, unit dibagi
+ke `--workers` proses. Checkpoint: hasil di-append per batch, unit selesai ditandai .done,
+--resume melanjutkan dari frame terakhir yang tertulis.
+
+Setelah semua unit selesai: frames.jsonl (urut), trigger screenshot dengan ScreenshotTrigger
+(logika sama seperti stream live, waktu = timestamp video), screenshot PNG (dan Supabase kalau
+--session-id + --user-id diisi), summary.json. Progress di progress.json.
+
+API (detection_api_v2.py, admin only): POST /batch {"source": path, ...} -> job id (proses
+terpisah, pid di job.pid), GET /batch/<job_id> -> progress / summary / running.
+
+Konfigurasi:
+    DETECTION_BATCH_DIR   folder hasil job /batch (default: backend/yolo/batch_results)
+"""
+
+import os
+import pathlib
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
+
+import re
+import sys
+import glob
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+import psutil
+
+from renditions import make_renditions
+from screenshot_trigger import ScreenshotTrigger
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+yolov5_dir = os.path.join(script_dir, 'yolov5')
+
+BATCH_DIR = os.getenv('DETECTION_BATCH_DIR', os.path.join(script_dir, 'batch_results'))
+IMAGE_SOURCE = 'images'  # `source` untuk semua gambar dari satu folder (satu timeline trigger)
+
+
+def _dataloaders():
+    """utils.dataloaders dari yolov5 yang di-vendor (import torch, jadi lazy)"""
+    if yolov5_dir not in sys.path:
+        sys.path.insert(0, yolov5_dir)
+    from utils import dataloaders
+    return dataloaders
+
+
+# =========================
+# PLAN (unit kerja)
+# =========================
+
+def list_sources(source):
+    """(gambar, video) urut nama, format sama seperti LoadImages"""
+    dl = _dataloaders()
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, '*.*')))
+    elif os.path.isfile(source):
+        files = [source]
+    else:
+        raise FileNotFoundError(f"{source} tidak ditemukan")
+    ext = lambda f: f.rsplit('.', 1)[-1].lower()  # noqa: E731
+    images = [f for f in files if ext(f) in dl.IMG_FORMATS]
+    videos = [f for f in files if ext(f) in dl.VID_FORMATS]
+    if not images and not videos:
+        raise ValueError(f"Tidak ada gambar/video di {source}")
+    return images, videos
+
+
+def plan_units(source, vid_stride=1, unit_seconds=300, unit_images=500):
+    """Potong source jadi unit kerja independen, urut seperti LoadImages (gambar dulu, lalu video)"""
+    images, videos = list_sources(source)
+    units = []
+    for i in range(0, len(images), unit_images):
+        chunk = images[i:i + unit_images]
+        units.append({'id': f"img-{i:07d}", 'kind': 'image', 'files': chunk, 'start': i, 'stop': i + len(chunk)})
+
+    for v, path in enumerate(videos):
+        cap = cv2.VideoCapture(path)
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        if n <= 0:  # jumlah frame tidak diketahui (sebagian WebM): satu unit sampai EOF
+            units.append({'id': f"vid{v:03d}-{0:08d}", 'kind': 'video', 'files': [path], 'start': 0, 'stop': None,
+                          'fps': fps})
+            continue
+        step = max(vid_stride, int(unit_seconds * fps) // vid_stride * vid_stride)
+        for start in range(0, n, step):
+            units.append({'id': f"vid{v:03d}-{start:08d}", 'kind': 'video', 'files': [path], 'start': start,
+                          'stop': min(n, start + step), 'fps': fps})
+    return units
+
+
+# =========================
+# WORKER
+# =========================
+
+_worker = {}
+
+
+def _as_is(im):
+    return im  # transforms LoadImages: frame BGR asli, letterbox dilakukan model per batch
+
+
+def init_worker(threads=0, direction='auto'):
+    """Load model + pose sekali per proses worker"""
+    if threads:
+        os.environ['DETECTION_THREADS'] = str(threads)
+    from model_loader import load_models
+
+    boot = load_models(conf=0.4, pose_options={'static_image_mode': False}, warmup_shape=None)
+    model = boot['model']
+    use_kpts = getattr(model, 'nk', 0) > 0 if direction == 'auto' else direction == 'keypoints'
+    _worker.update(model=model, pose=boot['pose'], mp_pose=boot['mp_pose'], keypoints=use_kpts, batch=None)
+
+
+def unit_path(out, unit):
+    return os.path.join(out, 'frames', f"{unit['id']}.jsonl")
+
+
+def read_checkpoint(path):
+    """Jumlah frame yang sudah tertulis; baris terakhir yang terpotong (crash saat menulis) dibuang"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+    return data[:end].count(b'\n')
+
+
+def iter_unit(unit, vid_stride, done, image_fps):
+    """(path, index frame, timestamp, frame BGR) untuk unit, mulai setelah `done` frame yang sudah tercatat"""
+    LoadImages = _dataloaders().LoadImages
+    if unit['kind'] == 'image':
+        files = unit['files'][done:]
+        if not files:
+            return
+        for k, (path, _, im0, _, _) in enumerate(LoadImages(files, transforms=_as_is)):
+            index = unit['start'] + done + k
+            yield path, index, index / image_fps, im0
+        return
+
+    loader = LoadImages(unit['files'][0], transforms=_as_is, vid_stride=vid_stride)
+    start = unit['start'] + done * vid_stride
+    if start:
+        loader.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        loader.frame = start // vid_stride
+    for path, _, im0, _, _ in loader:
+        index = loader.frame * vid_stride - 1  # frame terakhir yang di-grab, sama seperti tanpa sharding
+        if unit['stop'] is not None and index >= unit['stop']:
+            break
+        yield path, index, index / unit['fps'], im0
+
+
+def prefetch(items, batch, depth=4):
+    """Decode di thread terpisah (overlap dengan inference), yield list berisi `batch` item"""
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def reader():
+        chunk = []
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                chunk.append(item)
+                if len(chunk) == batch:
+                    q.put(chunk)
+                    chunk = []
+            if chunk:
+                q.put(chunk)
+            q.put(None)
+        except Exception as e:  # diteruskan ke consumer
+            q.put(e)
+
+    thread = threading.Thread(target=reader, name='batch-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = q.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set()
+        while thread.is_alive():  # lepaskan reader yang menunggu put()
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _detect(frames):
+    """Satu forward untuk semua frame; backend dengan batch statis turun ke satu frame per forward"""
+    from inference_backend import result_arrays
+
+    model = _worker['model']
+    if _worker['batch'] != 1 and len(frames) > 1:
+        try:
+            results = model(frames, bgr=True)
+            return [result_arrays(results, i) for i in range(len(frames))]
+        except Exception as e:
+            print(f"⚠️ Batch inference gagal ({e}), lanjut satu frame per forward", file=sys.stderr)
+            _worker['batch'] = 1
+    return [result_arrays(model(frame, bgr=True)) for frame in frames]
+
+
+def analyze_batch(items):
+    """Batch (path, index, t, frame) -> hasil per frame, format sama dengan /detect"""
+    from head_pose import classify_direction, keypoint_directions, nose_ear_ratio
+
+    frames = [im0 for *_, im0 in items]
+    detections = _detect(frames)
+
+    directions = [("DEPAN", 0.0)] * len(items)
+    if _worker['keypoints']:  # arah semua frame sekaligus dari keypoints wajah pertama
+        faces = [i for i, (boxes, kpts) in enumerate(detections) if len(boxes) and kpts.shape[1]]
+        if faces:
+            dirs, confs = keypoint_directions(np.stack([detections[i][1][0] for i in faces]))
+            for i, d, c in zip(faces, dirs, confs):
+                directions[i] = (str(d), float(c))
+    else:  # MediaPipe Pose per frame, sama seperti detection_stream.py
+        pose, mp_pose = _worker['pose'], _worker['mp_pose']
+        for i, frame in enumerate(frames):
+            result = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if result.pose_landmarks:
+                lm = result.pose_landmarks.landmark
+                ratio = nose_ear_ratio(lm[mp_pose.PoseLandmark.NOSE], lm[mp_pose.PoseLandmark.LEFT_EAR],
+                                       lm[mp_pose.PoseLandmark.RIGHT_EAR])
+                directions[i] = classify_direction(ratio)
+
+    records = []
+    for (path, index, t, _), (boxes, _), (direction, confidence) in zip(items, detections, directions):
+        video = path.rsplit('.', 1)[-1].lower() in _dataloaders().VID_FORMATS
+        records.append({
+            'source': os.path.basename(path) if video else IMAGE_SOURCE,
+            'file': os.path.basename(path),
+            'frame': index,
+            't': round(t, 3),
+            'success': True,
+            'direction': direction,
+            'confidence': confidence,
+            'face_detected': len(boxes) > 0,
+            'bbox': list(map(int, boxes[0, :4].tolist())) if len(boxes) else None,
+        })
+    return records
+
+
+def process_unit(unit, opts):
+    """Proses satu unit sampai selesai, append hasil per batch (checkpoint)"""
+    path = unit_path(opts['out'], unit)
+    if os.path.exists(path[:-len('.jsonl')] + '.done'):
+        return {'id': unit['id'], 'frames': 0, 'skipped': True}
+    done = read_checkpoint(path)
+    t0, n = time.perf_counter(), 0
+    with open(path, 'a') as f:
+        items = iter_unit(unit, opts['vid_stride'], done, opts['image_fps'])
+        for chunk in prefetch(items, opts['batch'], opts['prefetch']):
+            records = analyze_batch(chunk)
+            f.write(''.join(json.dumps(r) + '\n' for r in records))
+            f.flush()
+            n += len(records)
+    open(path[:-len('.jsonl')] + '.done', 'w').close()
+    return {'id': unit['id'], 'frames': n, 'resumed_from': done, 'seconds': round(time.perf_counter() - t0, 2)}
+
+
+# =========================
+# MERGE + SCREENSHOT
+# =========================
+
+def _clock(t):
+    ms = int(round(t * 1000))
+    return f"{ms // 3600000:02d}h{ms // 60000 % 60:02d}m{ms // 1000 % 60:02d}s{ms % 1000:03d}"
+
+
+def merge(out, units):
+    """Gabung hasil unit ke frames.jsonl (urut) dan hitung trigger screenshot per source"""
+    triggers, counts, faces, frames = [], Counter(), 0, 0
+    trigger, current = ScreenshotTrigger(), None
+    with open(os.path.join(out, 'frames.jsonl'), 'w') as dst:
+        for unit in units:
+            with open(unit_path(out, unit)) as src:
+                for line in src:
+                    r = json.loads(line)
+                    dst.write(line)
+                    if r['source'] != current:  # source baru: timeline baru
+                        trigger.reset()
+                        current = r['source']
+                    frames += 1
+                    faces += r['face_detected']
+                    counts[r['direction']] += 1
+                    if trigger.update(r['direction'], r['t']):
+                        triggers.append(r)
+    return triggers, {'frames': frames, 'face_detected': faces, 'directions': dict(counts)}
+
+
+def save_screenshots(out, units, triggers, session_id=None, user_id=None):
+    """Ambil frame trigger, gambar box wajah seperti stream live, simpan PNG (dan upload ke Supabase)"""
+    paths = {os.path.basename(f): f for unit in units for f in unit['files']}
+    os.makedirs(os.path.join(out, 'screenshots'), exist_ok=True)
+    if session_id and user_id:
+        from supabase_client import save_screenshot_record, update_preview_image, upload_renditions
+
+    shots, caps = [], {}
+    try:
+        for r in triggers:
+            path = paths[r['file']]
+            if r['source'] == IMAGE_SOURCE:
+                frame = cv2.imread(path)
+            else:
+                cap = caps.get(path) or caps.setdefault(path, cv2.VideoCapture(path))
+                cap.set(cv2.CAP_PROP_POS_FRAMES, r['frame'])
+                ok, frame = cap.read()
+                frame = frame if ok else None
+            if frame is None:
+                continue
+            if r['bbox']:
+                x1, y1, x2, y2 = r['bbox']
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+            stem = f"{r['direction']}_{os.path.splitext(r['file'])[0]}_{_clock(r['t'])}"
+            renditions = make_renditions(frame)  # [0] = original PNG
+            local = os.path.join(out, 'screenshots', f"{stem}.png")
+            with open(local, 'wb') as f:
+                f.write(renditions[0][1])
+
+            shot = {'source': r['source'], 'file': r['file'], 'frame': r['frame'], 't': r['t'],
+                    'direction': r['direction'], 'path': local}
+            if session_id and user_id:  # sama seperti detection_stream.save_screenshot
+                urls = upload_renditions(user_id, session_id, renditions, stem)
+                shot['url'] = urls['original']
+                save_screenshot_record(session_id, urls['original'], r['direction'],
+                                       thumb_url=urls.get('thumb'), medium_url=urls.get('medium'))
+                update_preview_image(session_id, urls['original'], thumb_url=urls.get('thumb'))
+            shots.append(shot)
+    finally:
+        for cap in caps.values():
+            cap.release()
+    return shots
+
+
+# =========================
+# RUN
+# =========================
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)  # pembaca (GET /batch/<id>) tidak melihat file setengah jadi
+
+
+def run_batch(source, out, vid_stride=1, batch=8, workers=None, prefetch_depth=4, unit_seconds=300,
+              unit_images=500, image_fps=1.0, direction='auto', resume=False, session_id=None, user_id=None):
+    """Analisis seluruh source, return summary (juga ditulis ke <out>/summary.json)"""
+    t0 = time.time()
+    options = {'source': os.path.abspath(source), 'vid_stride': vid_stride, 'unit_seconds': unit_seconds,
+               'unit_images': unit_images, 'image_fps': image_fps, 'direction': direction}
+    plan_file = os.path.join(out, 'plan.json')
+    if os.path.exists(plan_file):
+        if not resume:
+            raise FileExistsError(f"{out} sudah berisi hasil, pakai --resume atau folder lain")
+        with open(plan_file) as f:
+            plan = json.load(f)
+        if plan['options'] != options:
+            raise ValueError("Opsi berbeda dengan run sebelumnya di folder ini, checkpoint tidak bisa dipakai")
+        units = plan['units']
+    else:
+        units = plan_units(source, vid_stride, unit_seconds, unit_images)
+        os.makedirs(os.path.join(out, 'frames'), exist_ok=True)
+        _write_json(plan_file, {'options': options, 'units': units})
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or max(1, cpus // 2), len(units)))
+    threads = max(1, cpus // workers)
+    opts = {'out': out, 'vid_stride': vid_stride, 'batch': batch, 'prefetch': prefetch_depth, 'image_fps': image_fps}
+    progress = {'status': 'running', 'source': source, 'units_total': len(units), 'units_done': 0, 'frames': 0,
+                'workers': workers, 'started_at': t0, 'errors': []}
+    _write_json(os.path.join(out, 'progress.json'), progress)
+
+    def finished(result):
+        progress['units_done'] += 1
+        progress['frames'] += result['frames']
+        progress['elapsed_s'] = round(time.time() - t0, 1)
+        progress['fps'] = round(progress['frames'] / max(progress['elapsed_s'], 1e-3), 1)
+        _write_json(os.path.join(out, 'progress.json'), progress)
+        print(f"✅ {result['id']}: {result['frames']} frame ({progress['units_done']}/{len(units)})")
+
+    if workers == 1:
+        init_worker(threads, direction)
+        for unit in units:
+            finished(process_unit(unit, opts))
+    else:
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=init_worker,
+                                 initargs=(threads, direction)) as pool:
+            futures = {pool.submit(process_unit, unit, opts): unit for unit in units}
+            for future in as_completed(futures):
+                try:
+                    finished(future.result())
+                except Exception as e:  # unit lain tetap jalan, --resume mengulang unit ini
+                    progress['errors'].append({'unit': futures[future]['id'], 'error': str(e)})
+                    _write_json(os.path.join(out, 'progress.json'), progress)
+                    print(f"❌ {futures[future]['id']}: {e}", file=sys.stderr)
+
+    if progress['errors']:
+        progress['status'] = 'failed'
+        _write_json(os.path.join(out, 'progress.json'), progress)
+        raise RuntimeError(f"{len(progress['errors'])} unit gagal, jalankan ulang dengan --resume")
+
+    progress['status'] = 'merging'
+    _write_json(os.path.join(out, 'progress.json'), progress)
+    triggers, stats = merge(out, units)
+    shots = save_screenshots(out, units, triggers, session_id, user_id)
+
+    elapsed = time.time() - t0
+    summary = {
+        'source': source,
+        'units': len(units),
+        'vid_stride': vid_stride,
+        'batch': batch,
+        'workers': workers,
+        'threads_per_worker': threads,
+        **stats,
+        'elapsed_s': round(elapsed, 1),
+        'fps': round(stats['frames'] / max(elapsed, 1e-3), 1),
+        'screenshots': shots,
+        'frames_file': os.path.join(out, 'frames.jsonl'),
+    }
+    _write_json(os.path.join(out, 'summary.json'), summary)
+    progress.update(status='done', elapsed_s=summary['elapsed_s'], fps=summary['fps'])
+    _write_json(os.path.join(out, 'progress.json'), progress)
+    return summary
+
+
+# =========================
+# HTTP API
+# =========================
+
+# Status job dibaca dari file di BATCH_DIR/<job_id> (job.pid, job.exit), bukan state proses:
+# POST dan GET bisa dilayani worker / proses yang berbeda (prefork_server, restart)
+
+
+def _job_running(out):
+    """
+    True kalau job belum mencatat job.exit dan pid di job.pid masih ada
+
+    psutil, bukan os.kill(pid, 0): di Windows signal 0 adalah CTRL_C_EVENT dan akan
+    menghentikan job.
+    """
+    if os.path.exists(os.path.join(out, 'job.exit')):
+        return False
+    try:
+        with open(os.path.join(out, 'job.pid')) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    return psutil.pid_exists(pid)
+
+
+def _reap(proc, out):
+    """Tunggu job selesai (tidak jadi zombie, jadi cek pid tetap akurat) lalu catat exit code"""
+    code = proc.wait()
+    with open(os.path.join(out, 'job.exit'), 'w') as f:
+        f.write(str(code))
+
+
+BATCH_OPTIONS = {'vid_stride': '--vid-stride', 'batch': '--batch', 'workers': '--workers',
+                 'image_fps': '--image-fps', 'direction': '--direction', 'session_id': '--session-id',
+                 'user_id': '--user-id'}
+
+
+def register_batch_routes(app):
+    """POST /batch (mulai job di proses terpisah), GET /batch/<job_id> (progress / summary)"""
+    from flask import jsonify, request
+
+    from admin import admin_allowed
+
+    @app.route('/batch', methods=['POST'])
+    def batch_start():
+        if not admin_allowed(request):
+            return jsonify({'success': False, 'message': 'Forbidden'}), 403
+        data = request.get_json(silent=True) or {}
+        source = data.get('source')
+        if not source or not os.path.exists(source):
+            return jsonify({'success': False, 'message': f"Source tidak ditemukan: {source}"}), 400
+        job_id = data.get('job_id') or uuid.uuid4().hex[:12]
+        if not re.fullmatch(r'[\w-]{1,64}', job_id):
+            return jsonify({'success': False, 'message': 'job_id tidak valid'}), 400
+        out = os.path.join(BATCH_DIR, job_id)
+        if _job_running(out):
+            return jsonify({'success': False, 'message': 'Job sedang berjalan', 'job_id': job_id}), 409
+
+        os.makedirs(out, exist_ok=True)
+        cmd = [sys.executable, os.path.abspath(__file__), source, '--out', out, '--resume']
+        for key, flag in BATCH_OPTIONS.items():
+            if data.get(key) is not None:
+                cmd += [flag, str(data[key])]
+        if os.path.exists(os.path.join(out, 'job.exit')):
+            os.remove(os.path.join(out, 'job.exit'))  # --resume job lama
+        with open(os.path.join(out, 'batch.log'), 'ab') as log:
+            proc = subprocess.Popen(cmd, cwd=script_dir, stdout=log, stderr=subprocess.STDOUT)
+        with open(os.path.join(out, 'job.pid'), 'w') as f:
+            f.write(str(proc.pid))
+        threading.Thread(target=_reap, args=(proc, out), name=f'batch-{job_id}', daemon=True).start()
+        return jsonify({'success': True, 'job_id': job_id, 'status_url': f'/batch/{job_id}'}), 202
+
+    @app.route('/batch/<job_id>', methods=['GET'])
+    def batch_status(job_id):
+        if not admin_allowed(request):
+            return jsonify({'success': False, 'message': 'Forbidden'}), 403
+        if not re.fullmatch(r'[\w-]{1,64}', job_id):
+            return jsonify({'success': False, 'message': 'job_id tidak valid'}), 400
+        out = os.path.join(BATCH_DIR, job_id)
+        result = {'job_id': job_id}
+        for name in ('progress', 'summary'):
+            path = os.path.join(out, f'{name}.json')
+            if os.path.exists(path):
+                with open(path) as f:
+                    result[name] = json.load(f)
+        if len(result) == 1:
+            return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+        status = result.get('progress', {}).get('status')
+        result['running'] = status not in ('done', 'failed') and _job_running(out)
+        try:
+            with open(os.path.join(out, 'job.exit')) as f:
+                code = int(f.read().strip())
+            if code != 0:
+                result['exit_code'] = code
+        except (OSError, ValueError):
+            pass
+        return jsonify(result), 200
+
+    return batch_start, batch_status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analisis offline video / folder gambar')
+    parser.add_argument('source', help='file video, file gambar, atau folder')
+    parser.add_argument('--out', required=True, help='folder hasil (frames.jsonl, screenshots/, summary.json)')
+    parser.add_argument('--vid-stride', type=int, default=1, help='ambil satu dari setiap N frame video')
+    parser.add_argument('--batch', type=int, default=8, help='frame per forward YOLO')
+    parser.add_argument('--workers', type=int, default=None, help='jumlah proses (default: setengah jumlah core)')
+    parser.add_argument('--prefetch', type=int, default=4, help='batch yang di-decode di depan inference')
+    parser.add_argument('--unit-seconds', type=float, default=300, help='panjang unit video (detik) per shard')
+    parser.add_argument('--unit-images', type=int, default=500, help='jumlah gambar per shard')
+    parser.add_argument('--image-fps', type=float, default=1.0, help='timeline gambar (untuk trigger screenshot)')
+    parser.add_argument('--direction', choices=('auto', 'keypoints', 'pose'), default='auto',
+                        help='auto = keypoints kalau model punya landmark head, selain itu MediaPipe Pose')
+    parser.add_argument('--resume', action='store_true', help='lanjutkan dari checkpoint di --out')
+    parser.add_argument('--session-id', default=None, help='session Supabase untuk screenshot')
+    parser.add_argument('--user-id', default=None, help='user Supabase untuk screenshot')
+    args = parser.parse_args()
+
+    summary = run_batch(args.source, args.out, args.vid_stride, args.batch, args.workers, args.prefetch,
+                        args.unit_seconds, args.unit_images, args.image_fps, args.direction, args.resume,
+                        args.session_id, args.user_id)
+    print(json.dumps({k: v for k, v in summary.items() if k != 'screenshots'}, indent=2))
+    print(f"📸 {len(summary['screenshots'])} screenshot, 💾 {args.out}")
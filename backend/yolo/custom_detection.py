@@ -5,27 +5,35 @@ Berjalan di port 5001
 Melayani single-frame detection untuk frontend
 """
 
+import os
 import pathlib
-pathlib.PosixPath = pathlib.WindowsPath
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
 
-import cv2
-import torch
-import mediapipe as mp
-import numpy as np
-import base64
 import sys
-import os
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import logging
 
+from admission import AdmissionController, Rejected, rejection_response, session_key
+from frame_context import FrameContext
+from head_pose import classify_direction, nose_ear_ratio
+from metrics import get_logger, instrument, stage
+import image_decode
+from model_loader import load_models
+from profiling import register_profiling_routes
+from thread_budget import thread_layout
+
 # Suppress TensorFlow/PyTorch warnings
 import warnings
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 CORS(app)
+instrument(app)  # /metrics, histogram per request, Server-Timing
+register_profiling_routes(app)  # /admin/profile (torch.profiler), /admin/tracemalloc
+log = get_logger('custom_detection')
 
 # Reduce logging noise
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
@@ -42,97 +50,60 @@ print(f"📍 Weights: {weights_path}")
 print(f"📍 Weights exists: {os.path.exists(weights_path)}")
 
 # =========================
-# LOAD YOLO MODEL (GPU)
+# LOAD YOLO MODEL + MEDIAPIPE POSE (PARALEL)
 # =========================
-print("\n📦 Loading YOLOv5 model...")
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
+print("\n📦 Loading YOLOv5 model + MediaPipe Pose...")
+boot = load_models(conf=0.4, iou=0.45, pose_options={'static_image_mode': True})
+model, pose, mp_pose = boot['model'], boot['pose'], boot['mp_pose']
+backend_config, device = boot['config'], boot['device']
+admission = AdmissionController.from_env()  # batas in-flight + latest frame wins per session
 print(f"🔧 Device: {device}")
+print(f"🔧 Backend: {backend_config['backend']} ({backend_config['weights']})")
 
-if device == 'cuda':
+if device == 'cuda' and backend_config['runtime'] == 'torch':
+    import torch
     print(f"   NVIDIA GPU detected")
     print(f"   CUDA Version: {torch.version.cuda}")
     print(f"   GPU: {torch.cuda.get_device_name(0)}")
 
-model = torch.hub.load(
-    'ultralytics/yolov5',
-    'custom',
-    path=weights_path,
-    force_reload=False,
-    verbose=False
-)
-
-model.to(device)
-model.eval()
-model.conf = 0.4
-model.iou = 0.45
-
-# FP16 untuk GPU
-if device == 'cuda':
-    model.half()
+# FP16 untuk GPU (backend pytorch)
+if device == 'cuda' and backend_config['backend'] == 'pytorch':
     print("✅ FP16 precision enabled")
 
-print("✅ YOLOv5 model loaded")
-
-# =========================
-# MEDIAPIPE POSE
-# =========================
-print("📦 Loading MediaPipe Pose...")
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=0,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
-print("✅ MediaPipe Pose loaded")
+print("✅ YOLOv5 model + MediaPipe Pose loaded")
 
 # =========================
 # HELPER FUNCTIONS
 # =========================
 
 def decode_base64_image(image_base64):
-    """Decode base64 image"""
+    """Decode base64 image (JPEG besar di-decode reduced), return (frame, scale)"""
     try:
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        img_bytes = base64.b64decode(image_base64)
-        img_array = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            raise ValueError("Failed to decode image")
-        
-        return frame
+        return image_decode.decode_base64_image(image_base64)
     except Exception as e:
-        print(f"❌ Decode error: {e}")
+        log.warning("Decode error: %s", e)
         raise
 
-def detect_faces(frame):
+def detect_faces(ctx):
     """YOLO face detection"""
-    h, w, _ = frame.shape
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    with torch.no_grad():
-        results = model(rgb)
-    
-    df = results.pandas().xyxy[0]
-    print(f"🔍 YOLO Detection: found {len(df)} faces")
+    h, w, _ = ctx.shape
+    # flip BGR->RGB di preprocessing model, box dalam koordinat frame asli
+    boxes, _ = ctx.detections(model)
+    log.debug("YOLO Detection: found %d faces", len(boxes))
     
     faces = []
-    if len(df) > 0:
-        for idx, det in df.iterrows():
-            x1, y1, x2, y2 = int(det.xmin), int(det.ymin), int(det.xmax), int(det.ymax)
-            confidence = float(det.confidence)
+    if len(boxes) > 0:
+        for idx, (x1, y1, x2, y2, confidence, _) in enumerate(boxes.tolist()):
+            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
             
-            print(f"   Face {idx}: bbox=({x1},{y1},{x2},{y2}), conf={confidence}")
+            log.debug("Face %d: bbox=(%d,%d,%d,%d), conf=%.2f", idx, x1, y1, x2, y2, confidence)
             
             faces.append({
                 'bbox': (x1, y1, x2, y2),
                 'confidence': confidence
             })
     else:
-        print(f"   ⚠️ No faces detected! Using mock face for testing")
+        log.debug("No faces detected, using mock face for testing")
         # Mock face untuk testing jika model tidak detect
         # Face di tengah layar
         mock_x1, mock_y1 = int(w * 0.25), int(h * 0.15)
@@ -141,13 +112,12 @@ def detect_faces(frame):
             'bbox': (mock_x1, mock_y1, mock_x2, mock_y2),
             'confidence': 0.9
         })
-        print(f"   Mock face: ({mock_x1},{mock_y1},{mock_x2},{mock_y2})")
+        log.debug("Mock face: (%d,%d,%d,%d)", mock_x1, mock_y1, mock_x2, mock_y2)
     
     return faces
 
-def detect_head_direction(frame):
+def detect_head_direction(rgb):
     """MediaPipe Pose untuk head direction"""
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     pose_result = pose.process(rgb)
     
     direction = "DEPAN"
@@ -155,26 +125,12 @@ def detect_head_direction(frame):
     
     if pose_result.pose_landmarks:
         lm = pose_result.pose_landmarks.landmark
+        ratio = nose_ear_ratio(lm[mp_pose.PoseLandmark.NOSE],
+                               lm[mp_pose.PoseLandmark.LEFT_EAR],
+                               lm[mp_pose.PoseLandmark.RIGHT_EAR])
         
-        nose = lm[mp_pose.PoseLandmark.NOSE]
-        l_ear = lm[mp_pose.PoseLandmark.LEFT_EAR]
-        r_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR]
-        
-        dist_l = np.hypot(nose.x - l_ear.x, nose.y - l_ear.y)
-        dist_r = np.hypot(nose.x - r_ear.x, nose.y - r_ear.y)
-        
-        ratio = (dist_r - dist_l) / (dist_r + dist_l + 1e-6)
-        
-        # Threshold: 0.25 untuk agresif detection
-        if ratio > 0.25:
-            direction = "KIRI"
-            confidence = min(abs(ratio), 1.0)
-        elif ratio < -0.25:
-            direction = "KANAN"
-            confidence = min(abs(ratio), 1.0)
-        else:
-            direction = "DEPAN"
-            confidence = 1.0 - abs(ratio)
+        # Threshold: 0.25 untuk agresif detection (head_pose.YAW_THRESHOLD)
+        direction, confidence = classify_direction(ratio)
     
     return direction, confidence
 
@@ -195,18 +151,21 @@ def detect():
                 'message': 'Image required'
             }), 400
         
-        # Decode
-        frame = decode_base64_image(data['image'])
-        h, w, _ = frame.shape
-        print(f"\n📊 Processing frame: {w}x{h}")
-        
-        # YOLO detection (semua faces)
-        faces = detect_faces(frame)
-        print(f"✅ Detected {len(faces)} faces")
-        
-        # Pose detection (single - untuk overall direction)
-        direction, conf = detect_head_direction(frame)
-        print(f"✅ Head direction: {direction} (conf={conf:.2f})")
+        # Admit sebelum decode: frame yang ditolak / digantikan tidak pernah di-decode
+        with admission.admit(session_key(request, data)):
+            # Decode
+            frame, scale = decode_base64_image(data['image'])
+            ctx = FrameContext(frame, scale=scale)
+            h, w, _ = ctx.shape
+            log.debug("Processing frame: %dx%d", w, h)
+            
+            # YOLO detection (semua faces)
+            faces = detect_faces(ctx)
+            log.debug("Detected %d faces", len(faces))
+            
+            # Pose detection (single - untuk overall direction)
+            direction, conf = detect_head_direction(ctx.rgb)
+            log.debug("Head direction: %s (conf=%.2f)", direction, conf)
         
         # Response
         response = {
@@ -228,7 +187,6 @@ def detect():
                 'bbox': bbox_obj,
                 'confidence': float(face['confidence'])
             })
-            print(f"   Face bbox: ({x1},{y1}) to ({x2},{y2}) - confidence: {face['confidence']:.2f}")
         
         # Backward compatibility - add first face info
         if faces:
@@ -237,14 +195,15 @@ def detect():
         else:
             response['face_confidence'] = 0.0
         
-        print(f"📤 Response: {len(response['faces'])} faces, frame={w}x{h}, direction={direction}")
+        log.debug("Response: %d faces, frame=%dx%d, direction=%s", len(response['faces']), w, h, direction)
         
-        return jsonify(response), 200
+        with stage('serialize'):
+            return jsonify(response), 200
     
+    except Rejected as e:
+        return rejection_response(e)
     except Exception as e:
-        print(f"❌ Detection error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Detection error: %s", e)
         return jsonify({
             'success': False,
             'status': 'error',
@@ -257,7 +216,11 @@ def health():
     return jsonify({
         'status': 'ok',
         'message': 'Detection API running',
-        'device': device
+        'device': device,
+        'backend': backend_config['backend'],
+        'startup_ms': boot['timings'],
+        'threads': thread_layout(boot['budget']),
+        'admission': admission.stats()
     }), 200
 
 @app.route('/', methods=['GET'])
@@ -2,36 +2,82 @@
 Simple YOLO + Pose detection script untuk per-frame processing
 Input: image path
 Output: JSON result
+
+Mode worker (model di-load sekali, lalu memproses job sampai EOF / dihentikan):
+    python detect_frame.py --worker                         job dari stdin, hasil ke stdout
+    python detect_frame.py --worker --socket /tmp/det.sock  Unix socket (POSIX), banyak koneksi
+
+Framing dideteksi dari byte pertama setiap stream:
+    NDJSON   satu job per baris: {"id": 1, "image_path": "a.jpg", "output_path": "a.json"}
+             atau {"id": 2, "image": "<base64 / data URL>"}; hasil satu baris JSON per job
+    binary   [u32 panjang header][header JSON][u32 panjang gambar][bytes JPEG/PNG]
+             (big-endian, panjang gambar 0 = pakai image_path di header);
+             hasil [u32 panjang][JSON]
+
+Setiap hasil membawa `id` dari job. Job diproses berurutan dengan model yang sama
+(MediaPipe Pose tidak thread-safe); koneksi socket dilayani paralel untuk I/O saja.
 """
 
+import os
 import pathlib
-pathlib.PosixPath = pathlib.WindowsPath
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
 
 import sys
 import json
+import socket
+import struct
+import threading
+
+# Mode worker stdio: stdout khusus untuk hasil, log (juga saat load model) ke stderr
+results_out = sys.stdout
+if __name__ == '__main__' and '--worker' in sys.argv and '--socket' not in sys.argv:
+    sys.stdout = sys.stderr
+
 import cv2
-import torch
-import mediapipe as mp
-import numpy as np
-
-# Load model
-model = torch.hub.load(
-    'ultralytics/yolov5',
-    'custom',
-    path='weights/best.pt',
-    force_reload=False
-)
-model.conf = 0.4
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-model.to(device)
-
-# MediaPipe Pose
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=0,
-    min_detection_confidence=0.5
-)
+
+from frame_context import FrameContext
+from head_pose import classify_direction, nose_ear_ratio
+from image_decode import decode_base64_image, decode_image
+from model_loader import load_models
+
+WORKER = '--worker' in sys.argv
+
+# Load model (backend dari DETECTION_BACKEND) + MediaPipe Pose secara paralel
+# CLI tanpa warmup (hanya satu frame), worker di-warmup karena dipakai terus
+boot = load_models(conf=0.4, pose_options={'static_image_mode': True},
+                   **({} if WORKER else {'warmup_shape': None}))
+model, pose, mp_pose = boot['model'], boot['pose'], boot['mp_pose']
+
+HEADER = struct.Struct('>I')
+MAX_MESSAGE = 64 * 1024 * 1024
+NOT_OBJECT = {'id': None, 'success': False, 'error': 'Job harus object JSON'}  # mis. baris `[1]`
+
+def analyze(ctx):
+    """YOLO + pose untuk satu frame -> dict hasil"""
+    # YOLO Detection
+    boxes, _ = ctx.detections(model)
+    bbox = list(map(int, boxes[0, :4].tolist())) if len(boxes) > 0 else None
+
+    # Pose Detection
+    direction = "DEPAN"
+    pose_confidence = 0.0
+
+    pose_result = pose.process(ctx.rgb)
+    if pose_result.pose_landmarks:
+        lm = pose_result.pose_landmarks.landmark
+        ratio = nose_ear_ratio(lm[mp_pose.PoseLandmark.NOSE],
+                               lm[mp_pose.PoseLandmark.LEFT_EAR],
+                               lm[mp_pose.PoseLandmark.RIGHT_EAR])
+        direction, pose_confidence = classify_direction(ratio)
+
+    return {
+        'success': True,
+        'direction': direction,
+        'confidence': pose_confidence,
+        'face_detected': bbox is not None,
+        'bbox': bbox
+    }
 
 def detect_frame(image_path, output_path):
     """Detect frame dari image file"""
@@ -40,83 +86,143 @@ def detect_frame(image_path, output_path):
         frame = cv2.imread(image_path)
         if frame is None:
             return {'success': False, 'error': 'Failed to read image'}
-        
-        h, w, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # YOLO Detection
-        face_box = None
-        results = model(rgb)
-        df = results.pandas().xyxy[0]
-        
-        if len(df) > 0:
-            det = df.iloc[0]
-            x1, y1, x2, y2 = map(int, [det.xmin, det.ymin, det.xmax, det.ymax])
-            confidence = float(det.confidence)
-            face_box = {
-                'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
-                'confidence': confidence
-            }
-        
-        # Pose Detection
-        direction = "DEPAN"
-        pose_confidence = 0.0
-        
-        pose_result = pose.process(rgb)
-        if pose_result.pose_landmarks:
-            lm = pose_result.pose_landmarks.landmark
-            
-            nose = lm[mp_pose.PoseLandmark.NOSE]
-            l_ear = lm[mp_pose.PoseLandmark.LEFT_EAR]
-            r_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR]
-            
-            dist_l = np.hypot(nose.x - l_ear.x, nose.y - l_ear.y)
-            dist_r = np.hypot(nose.x - r_ear.x, nose.y - r_ear.y)
-            
-            ratio = (dist_r - dist_l) / (dist_r + dist_l + 1e-6)
-            
-            if ratio > 0.25:
-                direction = "KIRI"
-                pose_confidence = min(abs(ratio), 1.0)
-            elif ratio < -0.25:
-                direction = "KANAN"
-                pose_confidence = min(abs(ratio), 1.0)
-            else:
-                direction = "DEPAN"
-                pose_confidence = 1.0 - abs(ratio)
-        
-        # Return result
-        result = {
-            'success': True,
-            'direction': direction,
-            'confidence': pose_confidence,
-            'face_detected': face_box is not None,
-            'bbox': [face_box['x1'], face_box['y1'], face_box['x2'], face_box['y2']] if face_box else None
-        }
-        
+
+        result = analyze(FrameContext(frame))
+
         # Write to file
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-        
+        if output_path:
+            with open(output_path, 'w') as f:
+                json.dump(result, f)
+
         return result
-        
+
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"Error: {e}", file=sys.stderr)
         return {'success': False, 'error': str(e)}
 
+# =========================
+# WORKER
+# =========================
+process_lock = threading.Lock()  # satu job dalam satu waktu (model + pose dipakai bersama)
+
+def run_job(job, image_bytes=None):
+    """Job (header JSON + bytes gambar opsional) -> hasil dengan `id` yang sama"""
+    try:
+        if image_bytes:
+            frame, scale = decode_image(image_bytes)
+        elif job.get('image'):
+            frame, scale = decode_base64_image(job['image'])
+        else:
+            with process_lock:
+                result = detect_frame(job['image_path'], job.get('output_path'))
+            return {'id': job.get('id'), **result}
+
+        with process_lock:
+            result = analyze(FrameContext(frame, scale=scale))
+        if job.get('output_path'):
+            with open(job['output_path'], 'w') as f:
+                json.dump(result, f)
+    except KeyError:
+        result = {'success': False, 'error': "Job butuh 'image_path', 'image', atau bytes gambar"}
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    return {'id': job.get('id'), **result}
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    if len(data) < n:
+        raise EOFError
+    return data
+
+def serve_stream(rfile, wfile):
+    """Proses job dari satu stream sampai EOF, framing dari byte pertama ('{' = NDJSON)"""
+    first = rfile.peek(1)[:1] if hasattr(rfile, 'peek') else b''
+    if first and first != b'{' and first not in b' \r\n':
+        return _serve_binary(rfile, wfile)
+    for line in rfile:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            result = {'id': None, 'success': False, 'error': f'JSON tidak valid: {e}'}
+        else:
+            result = run_job(job) if isinstance(job, dict) else NOT_OBJECT
+        wfile.write(json.dumps(result).encode() + b'\n')
+        wfile.flush()
+
+def _serve_binary(rfile, wfile):
+    while True:
+        try:
+            (size,) = HEADER.unpack(_read_exact(rfile, HEADER.size))
+            if size > MAX_MESSAGE:
+                raise ValueError(f"Header terlalu besar: {size}")
+            job = json.loads(_read_exact(rfile, size))
+            (size,) = HEADER.unpack(_read_exact(rfile, HEADER.size))
+            if size > MAX_MESSAGE:
+                raise ValueError(f"Gambar terlalu besar: {size}")
+            image_bytes = _read_exact(rfile, size) if size else None
+        except EOFError:
+            return
+        except ValueError as e:  # stream tidak bisa di-resync, tutup
+            body = json.dumps({'id': None, 'success': False, 'error': str(e)}).encode()
+            wfile.write(HEADER.pack(len(body)) + body)
+            wfile.flush()
+            return
+        result = run_job(job, image_bytes) if isinstance(job, dict) else NOT_OBJECT  # frame sudah terbaca utuh
+        body = json.dumps(result).encode()
+        wfile.write(HEADER.pack(len(body)) + body)
+        wfile.flush()
+
+def serve_socket(path):
+    """Unix socket server, satu thread per koneksi"""
+    if not hasattr(socket, 'AF_UNIX'):
+        raise SystemExit("--socket butuh Unix socket (tidak ada di Windows), pakai mode stdio")
+    if os.path.exists(path):
+        os.unlink(path)  # socket sisa proses sebelumnya
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    print(f"Worker listening on {path}")
+
+    def handle(conn):
+        with conn, conn.makefile('rb') as rfile, conn.makefile('wb') as wfile:
+            try:
+                serve_stream(rfile, wfile)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client pergi sebelum hasil terkirim
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    finally:
+        server.close()
+        os.unlink(path)
+
 if __name__ == '__main__':
+    if WORKER:
+        if '--socket' in sys.argv:
+            serve_socket(sys.argv[sys.argv.index('--socket') + 1])
+        else:
+            print(f"Worker ready ({boot['timings']['total']:.0f}ms startup), reading jobs from stdin")
+            serve_stream(sys.stdin.buffer, results_out.buffer)
+        sys.exit(0)
+
     if len(sys.argv) < 3:
         print("Usage: python detect_frame.py <image_path> <output_path>")
+        print("       python detect_frame.py --worker [--socket <path>]")
         sys.exit(1)
-    
+
     image_path = sys.argv[1]
     output_path = sys.argv[2]
-    
+
     result = detect_frame(image_path, output_path)
-    
+
     if not result['success']:
         print(f"Detection failed: {result.get('error', 'Unknown error')}")
         sys.exit(1)
-    
+
     print("Detection completed successfully")
     sys.exit(0)
@@ -3,22 +3,29 @@ Flask API untuk detection menggunakan YOLO + MediaPipe Pose
 Mengganti custom_detection.py yang pakai webcam loop
 """
 
+import os
 import pathlib
-pathlib.PosixPath = pathlib.WindowsPath
-
-import cv2
-import torch
-import mediapipe as mp
-import numpy as np
-import base64
-from io import BytesIO
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import logging
-import os
+
+from admission import AdmissionController, Rejected, rejection_response, session_key
+from frame_context import FrameContext
+from head_pose import classify_direction, nose_ear_ratio
+from metrics import get_logger, instrument, stage
+import image_decode
+from model_loader import load_models
+from profiling import register_profiling_routes
+from thread_budget import thread_layout
 
 app = Flask(__name__)
 CORS(app)
+instrument(app)  # /metrics, histogram per request, Server-Timing
+register_profiling_routes(app)  # /admin/profile (torch.profiler), /admin/tracemalloc
+log = get_logger('detection_api')
 
 # Reduce logging noise
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
@@ -32,87 +39,41 @@ print(f"📍 Weights path: {weights_path}")
 print(f"📍 Weights exists: {os.path.exists(weights_path)}")
 
 # =========================
-# LOAD MODEL ONCE (ON GPU)
+# LOAD MODELS ONCE (YOLO + MEDIAPIPE POSE, PARALEL)
 # =========================
-print("📦 Loading YOLOv5 model...")
-
-# Set device BEFORE loading
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-print(f"🔧 Using device: {device}")
+print("📦 Loading YOLOv5 + MediaPipe Pose...")
 
-# Load model dengan GPU optimization
-model = torch.hub.load(
-    'ultralytics/yolov5',
-    'custom',
-    path=weights_path,
-    force_reload=False
-)
+# Model sesuai DETECTION_BACKEND (pytorch/torchscript/onnx/openvino)
+# FP16 otomatis di GPU untuk backend pytorch, runtime slim tidak import torch
+boot = load_models(conf=0.4, iou=0.45, pose_options={'static_image_mode': True})
+model, pose, mp_pose = boot['model'], boot['pose'], boot['mp_pose']
+backend_config, device = boot['config'], boot['device']
+admission = AdmissionController.from_env()  # batas in-flight + latest frame wins per session
 
-# 🆕 Optimasi GPU
-model.to(device)
-model.eval()  # Set to eval mode untuk inference
-model.conf = 0.4
-model.iou = 0.45
-
-# Enable half precision (FP16) untuk inference lebih cepat di GPU
-if device == 'cuda':
-    model.half()
-    print("✅ Using FP16 precision on GPU")
-
-print(f"✅ Model loaded on {device}")
-
-# =========================
-# MEDIAPIPE POSE (CPU)
-# =========================
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=0,  # Lightweight model
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+print(f"✅ Model loaded on {device} ({backend_config['backend']})")
 
 # =========================
 # HELPER FUNCTIONS
 # =========================
 
 def decode_base64_image(image_base64: str):
-    """Decode base64 image ke numpy array (BGR)"""
+    """Decode base64 image ke numpy array (BGR) + scale ke frame asli (JPEG besar di-decode reduced)"""
     try:
-        # Remove data URL prefix jika ada
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        # Decode base64
-        img_bytes = base64.b64decode(image_base64)
-        img_array = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            raise ValueError("Failed to decode image")
-        
-        return frame
+        return image_decode.decode_base64_image(image_base64)
     except Exception as e:
-        print(f"❌ Decode error: {e}")
+        log.warning("Decode error: %s", e)
         raise
 
-def run_yolo_detection(frame):
+def run_yolo_detection(ctx):
     """Run YOLO detection pada GPU"""
-    h, w, _ = frame.shape
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    # 🆕 Inference dengan GPU (auto batching, faster)
-    with torch.no_grad():
-        results = model(rgb)
-    
-    df = results.pandas().xyxy[0]
+    # 🆕 Inference dengan GPU (auto batching, faster), flip BGR->RGB di preprocessing model
+    boxes, _ = ctx.detections(model)  # koordinat frame asli
     
     face_box = None
-    if len(df) > 0:
-        # Ambil detection dengan confidence tertinggi
-        det = df.loc[df['confidence'].idxmax()]
-        x1, y1, x2, y2 = int(det.xmin), int(det.ymin), int(det.xmax), int(det.ymax)
-        confidence = float(det.confidence)
+    if len(boxes) > 0:
+        # Ambil detection dengan confidence tertinggi (NMS sudah urut confidence)
+        x1, y1, x2, y2, confidence, _ = boxes[0].tolist()
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
         
         face_box = {
             'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
@@ -121,9 +82,8 @@ def run_yolo_detection(frame):
     
     return face_box
 
-def detect_head_direction(frame):
+def detect_head_direction(rgb):
     """Detect head direction using pose estimation (sama seperti custom_detection.py)"""
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     pose_result = pose.process(rgb)
     
     direction = "DEPAN"
@@ -131,31 +91,14 @@ def detect_head_direction(frame):
     
     if pose_result.pose_landmarks:
         lm = pose_result.pose_landmarks.landmark
+        ratio = nose_ear_ratio(lm[mp_pose.PoseLandmark.NOSE],
+                               lm[mp_pose.PoseLandmark.LEFT_EAR],
+                               lm[mp_pose.PoseLandmark.RIGHT_EAR])
         
-        nose = lm[mp_pose.PoseLandmark.NOSE]
-        l_ear = lm[mp_pose.PoseLandmark.LEFT_EAR]
-        r_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR]
+        # 🔥 THRESHOLD AGRESIF SAMA SEPERTI custom_detection.py (head_pose.YAW_THRESHOLD)
+        direction, confidence = classify_direction(ratio)
         
-        # Hitung jarak antara nose dan ears
-        dist_l = np.hypot(nose.x - l_ear.x, nose.y - l_ear.y)
-        dist_r = np.hypot(nose.x - r_ear.x, nose.y - r_ear.y)
-        
-        # Ratio positif: right ear lebih jauh = looking LEFT
-        # Ratio negatif: left ear lebih jauh = looking RIGHT
-        ratio = (dist_r - dist_l) / (dist_r + dist_l + 1e-6)
-        
-        # 🔥 THRESHOLD AGRESIF SAMA SEPERTI custom_detection.py
-        if ratio > 0.25:
-            direction = "KIRI"
-            confidence = min(abs(ratio), 1.0)
-        elif ratio < -0.25:
-            direction = "KANAN"
-            confidence = min(abs(ratio), 1.0)
-        else:
-            direction = "DEPAN"
-            confidence = 1.0 - abs(ratio)
-        
-        print(f"🎯 Pose: ratio={ratio:.3f}, direction={direction}, conf={confidence:.2f}")
+        log.debug("Pose: ratio=%.3f, direction=%s, conf=%.2f", ratio, direction, confidence)
     
     return direction, confidence
 
@@ -189,14 +132,17 @@ def detect():
                 'message': 'Image data required'
             }), 400
         
-        # Decode image
-        frame = decode_base64_image(data['image'])
-        
-        # Run YOLO detection
-        face_box = run_yolo_detection(frame)
-        
-        # Run Pose detection
-        direction, conf = detect_head_direction(frame)
+        # Admit sebelum decode: frame yang ditolak / digantikan tidak pernah di-decode
+        with admission.admit(session_key(request, data)):
+            # Decode image (RGB dll dihitung sekali per frame di FrameContext)
+            frame, scale = decode_base64_image(data['image'])
+            ctx = FrameContext(frame, scale=scale)
+            
+            # Run YOLO detection
+            face_box = run_yolo_detection(ctx)
+            
+            # Run Pose detection
+            direction, conf = detect_head_direction(ctx.rgb)
         
         # Prepare response
         response = {
@@ -217,13 +163,14 @@ def detect():
                 face_box['y2']
             ]
         
-        print(f"✅ Response: {direction}, face={face_box is not None}")
-        return jsonify(response), 200
+        log.debug("Response: %s, face=%s", direction, face_box is not None)
+        with stage('serialize'):
+            return jsonify(response), 200
     
+    except Rejected as e:
+        return rejection_response(e)
     except Exception as e:
-        print(f"❌ Detection error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Detection error: %s", e)
         return jsonify({
             'success': False,
             'message': 'Detection failed',
@@ -236,7 +183,11 @@ def health():
     return jsonify({
         'status': 'ok',
         'message': 'Python Detection API is running',
-        'device': device
+        'device': device,
+        'backend': backend_config['backend'],
+        'startup_ms': boot['timings'],
+        'threads': thread_layout(boot['budget']),
+        'admission': admission.stats()
     }), 200
 
 # =========================
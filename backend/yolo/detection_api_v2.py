@@ -5,120 +5,162 @@ Berjalan di port 5001
 Melayani single-frame detection untuk frontend
 """
 
+import os
 import pathlib
-pathlib.PosixPath = pathlib.WindowsPath
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
 
-import cv2
-import torch
-import mediapipe as mp
 import numpy as np
-import base64
 import sys
-import os
 import warnings
 warnings.filterwarnings('ignore')
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from flask_sock import Sock
 import logging
 
+from admission import AdmissionController, Rejected, rejection_response, session_key
+from batch_analysis import register_batch_routes
+from frame_context import FrameContext
+from metrics import instrument, registry, stage
+from head_pose import classify_direction, keypoint_directions, nose_ear_ratio
+import image_decode
+from model_loader import load_models
+from profiling import register_profiling_routes
+from model_reload import HotModel, ModelReloader, register_reload_routes
+from qos import QosController
+from thread_budget import thread_layout
+from ws_stream import register_ws_detect
+
 app = Flask(__name__)
 CORS(app)
+instrument(app)  # /metrics, histogram per request, Server-Timing
+register_profiling_routes(app)  # /admin/profile (torch.profiler), /admin/tracemalloc
+sock = Sock(app)
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 # Path model
 script_dir = os.path.dirname(os.path.abspath(__file__))
 weights_path = os.path.join(script_dir, 'weights', 'best.pt')
 
-# Load device
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-
-# Load YOLO model
-model = torch.hub.load(
-    'ultralytics/yolov5',
-    'custom',
-    path=weights_path,
-    force_reload=False,
-    verbose=False
-)
-
-model.to(device)
-model.eval()
-model.conf = 0.4
-model.iou = 0.45
-
-if device == 'cuda':
-    model.half()
-
-# Load MediaPipe Pose
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=0,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+# Load YOLO model (backend dari DETECTION_BACKEND) + MediaPipe Pose secara paralel
+boot = load_models(conf=0.4, iou=0.45, pose_options={'static_image_mode': True})
+backend_config, device = boot['config'], boot['device']
+boot['model'] = HotModel(boot['model'], backend_config['weights'])  # bisa diganti tanpa restart (/admin/reload)
+model, pose, mp_pose = boot['model'], boot['pose'], boot['mp_pose']
+admission = AdmissionController.from_env()  # batas in-flight + latest frame wins per session
+qos = QosController.from_env(boot, admission, conf=0.4, iou=0.45)  # ladder size/model/pose sesuai SLO latency
+reloader = ModelReloader.from_boot(model, boot, conf=0.4, iou=0.45, warmup=qos.warm)  # warmup semua size QoS
+if os.getenv('DETECTION_RELOAD_WATCH', '0') == '1':
+    reloader.watch()
+
+registry.gauge('detection_admission', 'Admission control (in-flight, antrean, shed)', admission.stats)
+registry.gauge('detection_qos', 'Level QoS aktif', lambda: {k: v for k, v in qos.stats().items()
+                                                          if k in ('level', 'size', 'p50_ms', 'p99_ms')})
 
 # =========================
 # Helper Functions
 # =========================
 
 def decode_base64_image(image_base64):
+    """(frame BGR, scale ke frame asli), JPEG besar di-decode reduced"""
     try:
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        img_bytes = base64.b64decode(image_base64)
-        img_array = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        if frame is None:
-            raise ValueError("Gagal decode gambar")
-        return frame
+        return image_decode.decode_base64_image(image_base64)
     except Exception as e:
         raise ValueError(f"Decode error: {str(e)}")
 
-def detect_faces(frame):
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    with torch.no_grad():
-        results = model(rgb)
-
-    df = results.pandas().xyxy[0]
+def detect_faces(ctx, level):
+    # flip BGR->RGB di preprocessing model, koordinat frame asli; size/model dari level QoS
+    boxes, kpts = ctx.detections(qos.model(level), size=level.size)  # kpts (n, 10) jika model punya landmark head
     faces = []
-    for _, det in df.iterrows():
-        x1, y1, x2, y2 = int(det.xmin), int(det.ymin), int(det.xmax), int(det.ymax)
+    for i, (x1, y1, x2, y2, conf, _) in enumerate(boxes.tolist()):
         faces.append({
-            "bbox": (x1, y1, x2, y2),
-            "confidence": float(det.confidence)
+            "bbox": (int(x1), int(y1), int(x2), int(y2)),
+            "confidence": float(conf),
+            "keypoints": kpts[i] if kpts.shape[1] else None
         })
     return faces
 
-def detect_head_direction(frame):
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+def detect_head_direction(rgb):
+    """MediaPipe Pose pada crop kepala (threshold 0.2 dan confidence |ratio| seperti semula)"""
     res = pose.process(rgb)
-    direction = "DEPAN"
-    confidence = 0.0
-
-    if res.pose_landmarks:
-        lm = res.pose_landmarks.landmark
-        nose = lm[mp_pose.PoseLandmark.NOSE]
-        left_ear = lm[mp_pose.PoseLandmark.LEFT_EAR]
-        right_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR]
-        
-        dist_l = ((nose.x - left_ear.x)**2 + (nose.y - left_ear.y)**2)**0.5
-        dist_r = ((nose.x - right_ear.x)**2 + (nose.y - right_ear.y)**2)**0.5
-        
-        if dist_l + dist_r > 0:
-            ratio = (dist_r - dist_l) / (dist_r + dist_l)
-            if ratio > 0.2:
-                direction = "KIRI"
-            elif ratio < -0.2:
-                direction = "KANAN"
-            else:
-                direction = "DEPAN"
-            confidence = min(abs(ratio), 1.0)
-        else:
-            confidence = 0.0
-    
-    return direction, float(confidence)
+    if not res.pose_landmarks:
+        return "DEPAN", 0.0
+
+    lm = res.pose_landmarks.landmark
+    ratio = nose_ear_ratio(lm[mp_pose.PoseLandmark.NOSE],
+                           lm[mp_pose.PoseLandmark.LEFT_EAR],
+                           lm[mp_pose.PoseLandmark.RIGHT_EAR])
+    return classify_direction(ratio, threshold=0.2, inverse_front=False)
+
+def analyze_frame(ctx):
+    """
+    YOLO + head direction untuk satu frame (dipakai /detect dan /ws/detect)
+
+    Returns:
+        (direction_overall, trigger_side, detections)
+    """
+    level = qos.level()
+    try:
+        return _analyze_frame(ctx, level)
+    finally:
+        qos.observe()
+
+def _analyze_frame(ctx, level):
+    with qos.stage('yolo'):
+        faces = detect_faces(ctx, level)
+
+    detections = []
+    trigger_side = False
+    direction_overall = "DEPAN"  # Default direction
+
+    # Landmark head: yaw semua wajah sekaligus, tanpa MediaPipe per crop
+    kpt_dirs = None
+    if faces and faces[0]["keypoints"] is not None:
+        kpt_dirs = keypoint_directions(np.stack([f["keypoints"] for f in faces]))
+
+    for i, face in enumerate(faces):
+        x1, y1, x2, y2 = face["bbox"]
+        # Crop dari RGB frame: konversi warna sekali per frame, bukan per crop
+        head_crop = ctx.crop(x1, y1, x2, y2, rgb=kpt_dirs is None)
+        if head_crop.size == 0:
+            continue
+
+        if kpt_dirs is not None:
+            direction, conf = str(kpt_dirs[0][i]), float(kpt_dirs[1][i])
+        elif level.pose:
+            with qos.stage('pose'):
+                direction, conf = detect_head_direction(np.ascontiguousarray(head_crop))
+        else:  # QoS level terendah: pose dilewati
+            direction, conf = "DEPAN", 0.0
+
+        detections.append({
+            "bbox": [x1, y1, x2, y2],
+            "yolo_confidence": face["confidence"],
+            "direction": direction,
+            "pose_confidence": conf,
+            "timestamp": 0  # untuk tracking di frontend nanti
+        })
+
+        if direction in ["KIRI", "KANAN"]:
+            trigger_side = True
+            direction_overall = direction  # Update overall direction
+
+    return direction_overall, trigger_side, detections
+
+def analyze_compact(ctx):
+    """Hasil ringkas untuk WebSocket: dets = [x1, y1, x2, y2, conf, direction, pose_conf]"""
+    direction_overall, trigger_side, detections = analyze_frame(ctx)
+    h, w, _ = ctx.shape
+    return {
+        "d": direction_overall,
+        "t": trigger_side,
+        "w": w,
+        "h": h,
+        "dets": [[*det["bbox"], round(det["yolo_confidence"], 3), det["direction"], round(det["pose_confidence"], 3)]
+                 for det in detections],
+    }
 
 # =========================
 # API Endpoint
@@ -131,52 +173,53 @@ def detect():
         if not data or 'image' not in data:
             return jsonify({"success": False, "status": "error", "message": "Gambar wajib dikirim"}), 400
 
-        frame = decode_base64_image(data['image'])
-        h, w, _ = frame.shape
-        
-        faces = detect_faces(frame)
-
-        detections = []
-        trigger_side = False
-        direction_overall = "DEPAN"  # Default direction
-
-        for face in faces:
-            x1, y1, x2, y2 = face["bbox"]
-            head_crop = frame[y1:y2, x1:x2]
-            if head_crop.size == 0:
-                continue
-
-            direction, conf = detect_head_direction(head_crop)
-
-            detections.append({
-                "bbox": [x1, y1, x2, y2],
-                "yolo_confidence": face["confidence"],
-                "direction": direction,
-                "pose_confidence": conf,
-                "timestamp": 0  # untuk tracking di frontend nanti
-            })
-
-            if direction in ["KIRI", "KANAN"]:
-                trigger_side = True
-                direction_overall = direction  # Update overall direction
-
-        return jsonify({
-            "status": "ok",
-            "success": True,
-            "direction": direction_overall,  # 🆕 Add overall direction
-            "frame_width": w,  # 🆕 Add frame dimensions
-            "frame_height": h,
-            "multi_person": len(detections),
-            "trigger_direction_detected": trigger_side,
-            "detections": detections
-        }), 200
-
+        # Admit sebelum decode: frame yang ditolak / digantikan tidak pernah di-decode
+        with admission.admit(session_key(request, data)):
+            frame, scale = decode_base64_image(data['image'])
+            ctx = FrameContext(frame, scale=scale)
+            h, w, _ = ctx.shape
+
+            direction_overall, trigger_side, detections = analyze_frame(ctx)
+
+        with stage('serialize'):
+            return jsonify({
+                "status": "ok",
+                "success": True,
+                "direction": direction_overall,  # 🆕 Add overall direction
+                "frame_width": w,  # 🆕 Add frame dimensions
+                "frame_height": h,
+                "multi_person": len(detections),
+                "trigger_direction_detected": trigger_side,
+                "detections": detections
+            }), 200
+
+    except Rejected as e:
+        return rejection_response(e)
     except Exception as e:
         return jsonify({"success": False, "status": "error", "message": str(e)}), 500
 
+# Streaming: frame biner lewat satu koneksi WebSocket, hasil di-push dengan seq frame
+register_ws_detect(sock, '/ws/detect', analyze_compact, admission)
+
+# Hot reload: POST /admin/reload (load + warmup di background, swap setelah request lama selesai)
+register_reload_routes(app, reloader)
+
+# Analisis offline video / folder gambar: POST /batch (job di proses terpisah), GET /batch/<job_id>
+register_batch_routes(app)
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "message": "API berjalan", "device": device}), 200
+    return jsonify({
+        "status": "ok",
+        "message": "API berjalan",
+        "device": device,
+        "backend": backend_config['backend'],
+        "model": model.info(),
+        "startup_ms": boot['timings'],
+        "threads": thread_layout(boot['budget']),
+        "admission": admission.stats(),
+        "qos": qos.stats()
+    }), 200
 
 @app.route('/', methods=['GET'])
 def info():
@@ -1,24 +1,37 @@
+import os
 import pathlib
-pathlib.PosixPath = pathlib.WindowsPath
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
 
 import cv2
-import torch
-import mediapipe as mp
-import numpy as np
 from flask import Flask, Response, request, jsonify
 import threading
-import time
 from datetime import datetime
 import sys
-import os
+from concurrent.futures import ThreadPoolExecutor
+
+from evidence_clip import ClipRecorder
+from frame_context import FrameContext
+from frame_source import open_source
+from head_pose import classify_direction, nose_ear_ratio
+from metrics import get_logger, instrument, stage
+from inference_backend import result_arrays
+from model_loader import load_models
+from profiling import register_profiling_routes
+from renditions import make_renditions
+from screenshot_trigger import ScreenshotTrigger
+from thread_budget import thread_layout
 
 # Import Supabase client
 from supabase_client import (
-    create_session, finish_session, upload_screenshot,
-    save_screenshot_record, update_preview_image
+    create_session, finish_session, upload_screenshot, upload_renditions,
+    save_screenshot_record, update_preview_image, attach_clip
 )
 
 app = Flask(__name__)
+instrument(app)  # /metrics, histogram per request, Server-Timing
+register_profiling_routes(app)  # /admin/profile (torch.profiler), /admin/tracemalloc
+log = get_logger('detection_stream')
 
 # Global state
 camera_lock = threading.Lock()
@@ -29,53 +42,25 @@ cap = None
 current_session_id = None
 current_user_id = None
 
-# Direction tracking for screenshot logic
-direction_tracker = {
-    'current_direction': 'DEPAN',
-    'direction_start_time': None,
-    'last_screenshot_direction': None,
-    'last_screenshot_time': None,
-    'screenshot_cooldown': 5  # seconds between screenshots for same direction
-}
-
-# Screenshot threshold (seconds)
-SCREENSHOT_DELAY = 3.5  # 3-4 seconds
-
-# =========================
-# YOLOv5
-# =========================
-print("Loading YOLOv5 model...")
-model = torch.hub.load(
-    'ultralytics/yolov5',
-    'custom',
-    path='weights/best.pt',
-    force_reload=False
-)
-model.conf = 0.4
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-model.to(device)
-print(f"Model loaded on {device}")
+# Direction tracking for screenshot logic (sama dengan batch_analysis.py)
+direction_tracker = ScreenshotTrigger()
 
 # =========================
-# MEDIAPIPE POSE
+# YOLOv5 + MEDIAPIPE POSE (load paralel)
 # =========================
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    model_complexity=0,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+print("Loading YOLOv5 model + MediaPipe Pose...")
+boot = load_models(conf=0.4, pose_options={'static_image_mode': False})
+model, pose, mp_pose = boot['model'], boot['pose'], boot['mp_pose']
+backend_config, device = boot['config'], boot['device']
+print(f"Model loaded on {device} ({backend_config['backend']})")
 
 def init_camera():
-    """Initialize camera with 720p settings"""
+    """Initialize frame source (DETECTION_SOURCE: webcam, video, image folder, synthetic) at 720p"""
     global cap
     if cap is not None:
         cap.release()
     
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    cap = open_source(width=1280, height=720)
     
     if not cap.isOpened():
         raise RuntimeError("Failed to open camera")
@@ -83,96 +68,67 @@ def init_camera():
     return cap
 
 def should_capture_screenshot(direction):
-    """
-    Determine if a screenshot should be captured based on direction persistence
-    
-    Args:
-        direction: Current detected direction (KIRI, KANAN, or DEPAN)
-        
-    Returns:
-        bool: True if screenshot should be captured
-    """
-    global direction_tracker
-    
-    current_time = time.time()
-    
-    # Only capture for KIRI or KANAN
-    if direction not in ['KIRI', 'KANAN']:
-        direction_tracker['current_direction'] = direction
-        direction_tracker['direction_start_time'] = None
-        return False
-    
-    # Check if direction changed
-    if direction != direction_tracker['current_direction']:
-        direction_tracker['current_direction'] = direction
-        direction_tracker['direction_start_time'] = current_time
-        return False
-    
-    # Direction hasn't changed - check duration
-    if direction_tracker['direction_start_time'] is None:
-        direction_tracker['direction_start_time'] = current_time
-        return False
-    
-    duration = current_time - direction_tracker['direction_start_time']
-    
-    # Check if enough time has passed
-    if duration < SCREENSHOT_DELAY:
-        return False
-    
-    # Check cooldown to prevent duplicate screenshots
-    if direction_tracker['last_screenshot_direction'] == direction:
-        if direction_tracker['last_screenshot_time'] is not None:
-            time_since_last = current_time - direction_tracker['last_screenshot_time']
-            if time_since_last < direction_tracker['screenshot_cooldown']:
-                return False
-    
-    # All checks passed - capture screenshot
-    direction_tracker['last_screenshot_direction'] = direction
-    direction_tracker['last_screenshot_time'] = current_time
-    direction_tracker['direction_start_time'] = None  # Reset for next detection
-    
-    return True
+    """True kalau KIRI/KANAN sudah bertahan SCREENSHOT_DELAY detik (lihat screenshot_trigger.py)"""
+    return direction_tracker.update(direction)
 
-def capture_and_save_screenshot(frame, direction):
+def capture_and_save_screenshot(frame, direction, timestamp=None):
     """
-    Capture screenshot and save to Supabase
+    Capture screenshot and save to Supabase (encode + upload di screenshot_worker)
     
     Args:
-        frame: OpenCV frame to save
+        frame: OpenCV frame to save (di-copy, canvas masih dipakai untuk overlay)
         direction: Direction detected (KIRI or KANAN)
-    """
-    global current_session_id, current_user_id
+        timestamp: Nama file, default waktu sekarang
     
+    Returns:
+        Future: Screenshot record (None if failed), None if no active session
+    """
     if not current_session_id or not current_user_id:
-        print("⚠️ No active session - screenshot not saved")
-        return
+        log.warning("No active session - screenshot not saved")
+        return None
     
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    return screenshot_worker.submit(save_screenshot, frame.copy(), direction, timestamp,
+                                    current_session_id, current_user_id)
+
+def save_screenshot(frame, direction, timestamp, session_id, user_id):
+    """Original PNG + medium/thumbnail JPEG, upload semua, simpan record + preview"""
     try:
-        # Encode frame to PNG
-        ret, buffer = cv2.imencode('.png', frame)
-        if not ret:
-            print("❌ Failed to encode frame")
-            return
-        
-        image_bytes = buffer.tobytes()
-        
-        # Generate filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        filename = f"{direction}_{timestamp}.png"
-        
-        # Upload to Supabase Storage
-        image_url = upload_screenshot(current_user_id, current_session_id, image_bytes, filename)
+        with stage('encode'):
+            renditions = make_renditions(frame)
         
-        # Save record to database
-        save_screenshot_record(current_session_id, image_url, direction)
-        
-        # Update preview image if not set
-        update_preview_image(current_session_id, image_url)
+        with stage('persist'):
+            # Upload to Supabase Storage
+            urls = upload_renditions(user_id, session_id, renditions, f"{direction}_{timestamp}")
+            
+            # Save record to database
+            record = save_screenshot_record(session_id, urls['original'], direction,
+                                            thumb_url=urls.get('thumb'), medium_url=urls.get('medium'))
+            
+            # Update preview image if not set
+            update_preview_image(session_id, urls['original'], thumb_url=urls.get('thumb'))
         
-        print(f"📸 Screenshot captured: {direction} at {timestamp}")
+        log.info("Screenshot captured: %s at %s", direction, timestamp)
+        return record
         
     except Exception as e:
-        print(f"❌ Error capturing screenshot: {e}")
+        log.error("Error capturing screenshot: %s", e)
+        return None
+
+# Screenshot di-encode dan di-upload di luar loop stream, berurutan
+screenshot_worker = ThreadPoolExecutor(1, thread_name_prefix='screenshot')
+
+def save_clip(clip_bytes, meta, ext, content_type):
+    """Upload klip bukti (thread encode evidence_clip) dan tautkan ke record screenshot"""
+    filename = f"{meta['direction']}_{meta['timestamp']}.{ext}"
+    clip_url = upload_screenshot(meta['user_id'], meta['session_id'], clip_bytes, filename,
+                                 content_type=content_type)
+    record = meta['screenshot'].result()  # screenshot diproses lebih dulu di screenshot_worker
+    if record:
+        attach_clip(record['id'], clip_url)
+
+# Klip bukti N detik sebelum / M detik sesudah screenshot (DETECTION_CLIP_BEFORE / _AFTER)
+clips = ClipRecorder(save_clip)
 
 def generate_frames():
     """Generate MJPEG frames with YOLO detection and yaw analysis"""
@@ -180,6 +136,7 @@ def generate_frames():
     
     try:
         cap = init_camera()
+        seq = 0
         
         while active_stream:
             with camera_lock:
@@ -188,24 +145,24 @@ def generate_frames():
                     
                 ret, frame = cap.read()
                 if not ret:
-                    print("Failed to read frame")
+                    log.warning("Failed to read frame")
                     break
 
-            h, w, _ = frame.shape
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            seq += 1
+            ctx = FrameContext(frame, seq)  # RGB/JPEG dihitung sekali per frame
+            canvas = ctx.canvas()  # satu copy untuk overlay, frame asli tetap bersih untuk model
 
             # =========================
             # YOLO FACE DETECTION
             # =========================
-            results = model(rgb)
-            df = results.pandas().xyxy[0]
+            results = ctx.detect(model)
+            boxes, _ = result_arrays(results)
 
             face_box = None
-            if len(df) > 0:
-                det = df.iloc[0]
-                x1, y1, x2, y2 = map(int, [det.xmin, det.ymin, det.xmax, det.ymax])
+            if len(boxes) > 0:
+                x1, y1, x2, y2 = map(int, boxes[0, :4].tolist())
                 face_box = (x1, y1, x2, y2)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.rectangle(canvas, (x1, y1), (x2, y2), (0, 255, 0), 2)
 
             # =========================
             # POSE & YAW ANALYSIS
@@ -213,32 +170,32 @@ def generate_frames():
             direction = "DEPAN"
             color = (0, 255, 0)
 
-            pose_result = pose.process(rgb)
+            pose_result = pose.process(ctx.rgb)
             if pose_result.pose_landmarks:
                 lm = pose_result.pose_landmarks.landmark
+                ratio = nose_ear_ratio(lm[mp_pose.PoseLandmark.NOSE],
+                                       lm[mp_pose.PoseLandmark.LEFT_EAR],
+                                       lm[mp_pose.PoseLandmark.RIGHT_EAR])
 
-                nose = lm[mp_pose.PoseLandmark.NOSE]
-                l_ear = lm[mp_pose.PoseLandmark.LEFT_EAR]
-                r_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR]
-
-                dist_l = np.hypot(nose.x - l_ear.x, nose.y - l_ear.y)
-                dist_r = np.hypot(nose.x - r_ear.x, nose.y - r_ear.y)
-
-                ratio = (dist_r - dist_l) / (dist_r + dist_l + 1e-6)
-
-                # THRESHOLD
-                if ratio > 0.25:
-                    direction = "KIRI"
-                    color = (0, 0, 255)
-                elif ratio < -0.25:
-                    direction = "KANAN"
+                # THRESHOLD (head_pose.YAW_THRESHOLD)
+                direction, _ = classify_direction(ratio)
+                if direction != "DEPAN":
                     color = (0, 0, 255)
 
             # =========================
             # SCREENSHOT LOGIC
             # =========================
             if should_capture_screenshot(direction):
-                capture_and_save_screenshot(frame.copy(), direction)
+                timestamp = datetime.fromtimestamp(ctx.timestamp).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+                screenshot = capture_and_save_screenshot(canvas, direction, timestamp)
+                if screenshot:
+                    clips.trigger(ctx.timestamp, {
+                        'screenshot': screenshot,
+                        'session_id': current_session_id,
+                        'user_id': current_user_id,
+                        'direction': direction,
+                        'timestamp': timestamp,
+                    })
 
             # =========================
             # VISUALIZATION
@@ -249,28 +206,29 @@ def generate_frames():
                 cy = (y1 + y2) // 2
 
                 # Direction label
-                cv2.putText(frame, direction, (x1 + 10, y1 + 25),
+                cv2.putText(canvas, direction, (x1 + 10, y1 + 25),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
 
                 # Direction arrow
                 if direction == "KANAN":
-                    cv2.arrowedLine(frame, (cx, cy), (cx - 80, cy), color, 4)
+                    cv2.arrowedLine(canvas, (cx, cy), (cx - 80, cy), color, 4)
                 elif direction == "KIRI":
-                    cv2.arrowedLine(frame, (cx, cy), (cx + 80, cy), color, 4)
+                    cv2.arrowedLine(canvas, (cx, cy), (cx + 80, cy), color, 4)
 
             # Encode frame to JPEG
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
+            try:
+                frame_bytes = ctx.jpeg(quality=85, annotated=True)
+            except ValueError:
                 continue
-                
-            frame_bytes = buffer.tobytes()
+            clips.push(ctx.timestamp, frame_bytes)  # JPEG yang sama dengan MJPEG, tanpa encode ulang
             
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
 
     except Exception as e:
-        print(f"Error in generate_frames: {e}")
+        log.exception("Error in generate_frames: %s", e)
     finally:
+        clips.flush()  # klip yang belum lengkap tetap disimpan
         cleanup_camera()
 
 def cleanup_camera():
@@ -283,15 +241,10 @@ def cleanup_camera():
         print("Camera released")
 
 def reset_direction_tracker():
-    """Reset direction tracker state"""
-    global direction_tracker
-    direction_tracker = {
-        'current_direction': 'DEPAN',
-        'direction_start_time': None,
-        'last_screenshot_direction': None,
-        'last_screenshot_time': None,
-        'screenshot_cooldown': 5
-    }
+    """Reset direction tracker state; klip tertunda disimpan dulu, lalu ring buffer dikosongkan"""
+    direction_tracker.reset()
+    clips.flush()
+    clips.reset()
 
 @app.route('/stream')
 def video_feed():
@@ -387,7 +340,8 @@ def get_status():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for initialization detection"""
-    return jsonify({'status': 'ok', 'ready': True}), 200
+    return jsonify({'status': 'ok', 'ready': True, 'startup_ms': boot['timings'],
+                    'threads': thread_layout(boot['budget'])}), 200
 
 if __name__ == '__main__':
     print("Starting Flask detection server on port 5001...")
@@ -395,5 +349,6 @@ if __name__ == '__main__':
     print("  - YOLOv5 face detection")
     print("  - MediaPipe head orientation")
     print("  - Auto screenshot on KIRI/KANAN (3-4s persistence)")
+    print("  - Evidence clip around each screenshot")
     print("  - Supabase session tracking")
     app.run(host='0.0.0.0', port=5001, threaded=True, debug=False)
@@ -3,23 +3,33 @@ Flask API untuk stream detection dari webcam real-time
 Menggunakan YOLO + MediaPipe Pose sama seperti custom_detection.py
 """
 
+import os
 import pathlib
-pathlib.PosixPath = pathlib.WindowsPath
+if os.name == 'nt':  # weights yang di-pickle di Linux (PosixPath) tetap bisa di-load di Windows
+    pathlib.PosixPath = pathlib.WindowsPath
 
 import cv2
-import torch
-import mediapipe as mp
 import numpy as np
-import os
 import json
-from flask import Flask, Response, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import threading
 import base64
 from io import BytesIO
 
+from event_stream import Broadcaster, SSE_HEADERS
+from frame_context import FrameContext
+from frame_source import open_source
+from metrics import instrument, registry
+from inference_backend import result_arrays
+from model_loader import load_models
+from profiling import register_profiling_routes
+from thread_budget import thread_layout
+
 app = Flask(__name__)
 CORS(app)
+instrument(app)  # /metrics, histogram per request, Server-Timing
+register_profiling_routes(app)  # /admin/profile (torch.profiler), /admin/tracemalloc
 
 # 🆕 Get script directory untuk path file
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -30,44 +40,25 @@ print(f"📍 Weights path: {weights_path}")
 print(f"📍 Weights exists: {os.path.exists(weights_path)}")
 
 # =========================
-# LOAD MODEL (ON GPU)
+# LOAD MODEL + MEDIAPIPE POSE (PARALEL)
 # =========================
-print("📦 Loading YOLOv5 model...")
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
+print("📦 Loading YOLOv5 model + MediaPipe Pose...")
+boot = load_models(conf=0.4, pose_options={'static_image_mode': False})  # Pose streaming mode
+model, pose, mp_pose = boot['model'], boot['pose'], boot['mp_pose']
+backend_config, device = boot['config'], boot['device']
 print(f"🔧 Using device: {device}")
 
-model = torch.hub.load(
-    'ultralytics/yolov5',
-    'custom',
-    path=weights_path,
-    force_reload=False
-)
-model.to(device)
-model.eval()
-model.conf = 0.4
-
-if device == 'cuda':
-    model.half()
-    print("✅ Using FP16 precision on GPU")
-
-print(f"✅ Model loaded on {device}")
-
-# =========================
-# MEDIAPIPE POSE
-# =========================
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=False,  # Streaming mode
-    model_complexity=0,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+print(f"✅ Model loaded on {device} ({backend_config['backend']})")
 
 # =========================
 # GLOBAL STATE
 # =========================
 frame_lock = threading.Lock()
-current_frame = None
+frame_ready = threading.Condition(frame_lock)  # notify MJPEG clients saat ada frame baru
+current_ctx = None  # FrameContext terakhir, dipakai bersama semua client tanpa copy
+result_stream = Broadcaster()  # push current_result ke subscriber /detect_result/stream
+SSE_MAX_RATE = float(os.getenv('DETECTION_SSE_MAX_RATE', '10'))  # event/detik per subscriber
+registry.gauge('detection_result_stream', 'Subscriber dan event SSE /detect_result/stream', result_stream.stats)
 current_result = {
     'direction': 'DEPAN',
     'confidence': 0.0,
@@ -80,13 +71,12 @@ current_result = {
 # =========================
 def capture_frames():
     """Background thread untuk capture dan process frames"""
-    global current_frame, current_result
+    global current_ctx, current_result
     
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    cap = open_source(width=1280, height=720)  # DETECTION_SOURCE, default webcam 0
     
     print("📹 Camera started")
+    seq = 0
     
     while cap.isOpened():
         ret, frame = cap.read()
@@ -94,30 +84,30 @@ def capture_frames():
             break
         
         h, w, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        seq += 1
+        ctx = FrameContext(frame, seq)  # RGB/JPEG dihitung sekali per frame
+        canvas = ctx.canvas()  # satu copy untuk overlay
         
         # YOLO Detection
-        with torch.no_grad():
-            results = model(rgb)
-        df = results.pandas().xyxy[0]
+        results = ctx.detect(model)
+        boxes, _ = result_arrays(results)
         
         face_box = None
         face_confidence = 0.0
-        if len(df) > 0:
-            det = df.iloc[0]
-            x1, y1, x2, y2 = int(det.xmin), int(det.ymin), int(det.xmax), int(det.ymax)
-            face_confidence = float(det.confidence)
+        if len(boxes) > 0:
+            x1, y1, x2, y2, face_confidence, _ = boxes[0].tolist()
+            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
             face_box = (x1, y1, x2, y2)
             
             # Draw bbox
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), (0, 255, 0), 2)
         
         # Pose Detection
         direction = "DEPAN"
         direction_confidence = 0.0
         color = (0, 255, 0)
         
-        pose_result = pose.process(rgb)
+        pose_result = pose.process(ctx.rgb)
         if pose_result.pose_landmarks:
             lm = pose_result.pose_landmarks.landmark
             
@@ -141,26 +131,30 @@ def capture_frames():
         # Draw label
         if face_box:
             x1, y1, x2, y2 = face_box
-            cv2.putText(frame, direction, (x1 + 10, y1 + 25),
+            cv2.putText(canvas, direction, (x1 + 10, y1 + 25),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-            cv2.putText(frame, f"{int(face_confidence * 100)}%", (x1 + 10, y1 + 50),
+            cv2.putText(canvas, f"{int(face_confidence * 100)}%", (x1 + 10, y1 + 50),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
         
-        # Update global state
-        with frame_lock:
-            current_frame = frame.copy()
-            current_result = {
-                'direction': direction,
-                'confidence': float(direction_confidence),
-                'face_detected': face_box is not None,
-                'bbox': {
-                    'x': face_box[0] / w if face_box else None,
-                    'y': face_box[1] / h if face_box else None,
-                    'width': (face_box[2] - face_box[0]) / w if face_box else None,
-                    'height': (face_box[3] - face_box[1]) / h if face_box else None
-                } if face_box else None,
-                'face_confidence': face_confidence
-            }
+        result = {
+            'direction': direction,
+            'confidence': float(direction_confidence),
+            'face_detected': face_box is not None,
+            'bbox': {
+                'x': face_box[0] / w if face_box else None,
+                'y': face_box[1] / h if face_box else None,
+                'width': (face_box[2] - face_box[0]) / w if face_box else None,
+                'height': (face_box[3] - face_box[1]) / h if face_box else None
+            } if face_box else None,
+            'face_confidence': face_confidence
+        }
+        
+        # Update global state (publish context, tanpa copy)
+        with frame_ready:
+            current_ctx = ctx
+            current_result = result
+            frame_ready.notify_all()
+        result_stream.publish(result)  # serialize sekali untuk semua subscriber SSE
     
     cap.release()
     print("📹 Camera stopped")
@@ -177,21 +171,26 @@ camera_thread.start()
 def video_feed():
     """Stream video frames as MJPEG"""
     def generate():
+        last_seq = None
         while True:
-            with frame_lock:
-                if current_frame is None:
-                    continue
-                frame = current_frame.copy()
+            with frame_ready:
+                # Tunggu frame baru (bukan busy-loop / encode ulang frame yang sama)
+                frame_ready.wait_for(lambda: current_ctx is not None and current_ctx.seq != last_seq, timeout=1.0)
+                ctx = current_ctx
+            if ctx is None or ctx.seq == last_seq:
+                continue
+            last_seq = ctx.seq
             
-            # Encode frame as JPEG
-            ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            if not ret:
+            # JPEG di-encode sekali per frame, dipakai bersama semua client
+            try:
+                jpeg = ctx.jpeg(quality=70, annotated=True)
+            except ValueError:
                 continue
             
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n'
-                   b'Content-length: ' + str(len(jpeg.tobytes())).encode() + b'\r\n\r\n'
-                   + jpeg.tobytes() + b'\r\n')
+                   b'Content-length: ' + str(len(jpeg)).encode() + b'\r\n\r\n'
+                   + jpeg + b'\r\n')
     
     return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
@@ -201,13 +200,27 @@ def detect_result():
     with frame_lock:
         return jsonify(current_result)
 
+@app.route('/detect_result/stream')
+def detect_result_stream():
+    """
+    Push hasil deteksi (Server-Sent Events), pengganti polling /detect_result
+
+    Query: max_rate=<event/detik> (default DETECTION_SSE_MAX_RATE), update di
+    antaranya di-coalesce, client selalu menerima hasil terbaru.
+    """
+    max_rate = request.args.get('max_rate', SSE_MAX_RATE, type=float)
+    return Response(result_stream.subscribe(max_rate), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check"""
     return jsonify({
         'status': 'ok',
         'message': 'Stream Detection API running',
-        'device': device
+        'device': device,
+        'startup_ms': boot['timings'],
+        'threads': thread_layout(boot['budget']),
+        'result_stream': result_stream.stats()
     })
 
 # =========================
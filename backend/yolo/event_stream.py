@@ -0,0 +1,78 @@
+"""
+Server-Sent Events broadcaster untuk hasil deteksi
+
+Capture thread memanggil publish(result) setiap ada hasil baru. Semua subscriber
+membaca dari satu broadcast: payload di-serialize sekali per versi, lalu tiap
+subscriber menerima versi terbaru dengan rate maksimum sendiri (update di antara
+dua kirim di-coalesce, yang dikirim selalu yang terbaru).
+
+    broadcaster = Broadcaster()
+    broadcaster.publish(current_result)                      # capture thread
+    Response(broadcaster.subscribe(max_rate=10), mimetype='text/event-stream', headers=SSE_HEADERS)
+"""
+
+import json
+import time
+import threading
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # nginx: jangan buffer stream
+}
+
+KEEPALIVE_INTERVAL = 15.0  # detik, comment line supaya proxy tidak menutup koneksi idle
+
+
+class Broadcaster:
+    def __init__(self, event='result'):
+        self.event = event
+        self._cond = threading.Condition()
+        self._version = 0
+        self._payload = None  # bytes SSE untuk versi terakhir
+        self.subscribers = 0
+        self.published = 0
+
+    def publish(self, data):
+        """Simpan hasil terbaru dan bangunkan semua subscriber (serialize sekali)"""
+        body = json.dumps(data, separators=(',', ':'))
+        with self._cond:
+            self._version += 1
+            self._payload = f"id: {self._version}\nevent: {self.event}\ndata: {body}\n\n".encode()
+            self.published += 1
+            self._cond.notify_all()
+
+    def latest(self, after=0, timeout=None):
+        """(version, payload) terbaru dengan version > after, (after, None) kalau timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > after, timeout)
+            if self._version > after:
+                return self._version, self._payload
+            return after, None
+
+    def subscribe(self, max_rate=10.0):
+        """Generator SSE untuk satu subscriber, maksimal `max_rate` event per detik"""
+        min_interval = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield b"retry: 2000\n\n"
+            version, last_sent = 0, 0.0
+            while True:
+                # Coalesce: tunggu sampai interval berikutnya, update di antaranya tidak dikirim satu-satu
+                wait = last_sent + min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                version, payload = self.latest(version, timeout=KEEPALIVE_INTERVAL)
+                if payload is None:
+                    yield b": keepalive\n\n"
+                    continue
+                last_sent = time.monotonic()
+                yield payload
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self):
+        with self._cond:
+            return {'subscribers': self.subscribers, 'published': self.published, 'version': self._version}
@@ -0,0 +1,194 @@
+"""
+Klip bukti sebelum/sesudah trigger screenshot, dari ring buffer JPEG di memori
+
+FrameRing menyimpan JPEG frame terakhir (JPEG yang sudah di-encode untuk MJPEG, jadi tanpa
+encode tambahan di hot path), dibatasi durasi dan total byte. ClipRecorder mencatat trigger,
+menunggu sampai `after` detik lewat, lalu decode + encode video di thread background dan
+menyerahkan hasilnya ke `persist(clip_bytes, meta, ext, content_type)`.
+
+Codec default avc1 (H.264/MP4), fallback VP80 (VP8/WebM): keduanya bisa diputar browser,
+tidak seperti mp4v. Container dan content type mengikuti codec yang berhasil dibuka.
+
+    clips = ClipRecorder(persist)
+    clips.push(ctx.timestamp, jpeg)        # setiap frame
+    clips.trigger(ctx.timestamp, meta)     # saat screenshot diambil
+    clips.flush()                          # stream berhenti: klip yang tertunda dipotong
+
+Konfigurasi:
+    DETECTION_CLIP_BEFORE   detik sebelum trigger (default 5, BEFORE + AFTER = 0 menonaktifkan)
+    DETECTION_CLIP_AFTER    detik sesudah trigger (default 3)
+    DETECTION_CLIP_MAX_MB   batas memori ring buffer (default 64)
+    DETECTION_CLIP_CODEC    fourcc yang dicoba berurutan (default avc1,VP80)
+"""
+
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from metrics import get_logger, stage
+
+CLIP_BEFORE = float(os.getenv('DETECTION_CLIP_BEFORE', '5'))
+CLIP_AFTER = float(os.getenv('DETECTION_CLIP_AFTER', '3'))
+CLIP_MAX_BYTES = int(float(os.getenv('DETECTION_CLIP_MAX_MB', '64')) * 1024 * 1024)
+CLIP_CODECS = tuple(c.strip() for c in os.getenv('DETECTION_CLIP_CODEC', 'avc1,VP80').split(',') if c.strip())
+# fourcc -> (ekstensi, content type); VideoWriter memilih container dari ekstensi file
+CONTAINERS = {
+    'avc1': ('mp4', 'video/mp4'),
+    'H264': ('mp4', 'video/mp4'),
+    'mp4v': ('mp4', 'video/mp4'),
+    'VP80': ('webm', 'video/webm'),
+    'VP90': ('webm', 'video/webm'),
+}
+MAX_INFLIGHT = 4  # klip yang menunggu encode; lebih dari ini klip baru dibuang (encode tertinggal)
+
+log = get_logger('evidence_clip')
+
+
+class FrameRing:
+    """JPEG frame terakhir (timestamp, bytes), dibatasi `seconds` dan `max_bytes`"""
+
+    def __init__(self, seconds, max_bytes=CLIP_MAX_BYTES):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.frames = deque()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def push(self, t, jpeg):
+        with self._lock:
+            self.frames.append((t, jpeg))
+            self.nbytes += len(jpeg)
+            while self.frames and (t - self.frames[0][0] > self.seconds or self.nbytes > self.max_bytes):
+                self.nbytes -= len(self.frames.popleft()[1])
+
+    def window(self, start, end):
+        """Frame dengan start <= t <= end (list baru, bytes tidak di-copy)"""
+        with self._lock:
+            return [(t, jpeg) for t, jpeg in self.frames if start <= t <= end]
+
+    def clear(self):
+        with self._lock:
+            self.frames.clear()
+            self.nbytes = 0
+
+
+def encode_clip(frames, codecs=CLIP_CODECS):
+    """
+    List (timestamp, JPEG) -> (bytes video, ekstensi, content type)
+
+    fps diambil dari rentang timestamp, jadi durasi klip sama dengan rekaman aslinya.
+    """
+    span = frames[-1][0] - frames[0][0]
+    fps = (len(frames) - 1) / span if span > 0 else 10.0
+    first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+    if first is None:
+        raise ValueError("Frame pertama klip tidak bisa di-decode")
+    h, w = first.shape[:2]
+
+    for codec in codecs:
+        ext, content_type = CONTAINERS.get(codec, ('mp4', 'video/mp4'))
+        fd, path = tempfile.mkstemp(suffix=f'.{ext}')  # VideoWriter hanya bisa menulis ke file
+        os.close(fd)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, (w, h))
+        if writer.isOpened():
+            break
+        writer.release()
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"Tidak ada codec video yang tersedia ({', '.join(codecs)})")
+
+    try:
+        writer.write(first)
+        for _, jpeg in frames[1:]:
+            frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None and frame.shape[:2] == (h, w):
+                writer.write(frame)
+        writer.release()
+        with open(path, 'rb') as f:
+            return f.read(), ext, content_type
+    finally:
+        os.unlink(path)
+
+
+class ClipRecorder:
+    def __init__(self, persist, before=CLIP_BEFORE, after=CLIP_AFTER, max_bytes=CLIP_MAX_BYTES):
+        """
+        persist: callable(clip_bytes, meta, ext, content_type), dipanggil dari thread encode
+        before, after: detik sebelum / sesudah trigger
+        """
+        self.persist = persist
+        self.before = before
+        self.after = after
+        self.ring = FrameRing(before + after + 1.0, max_bytes)
+        self.pending = deque()  # (timestamp trigger, meta), urut waktu
+        self.inflight = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='clip-encode')
+
+    @property
+    def enabled(self):
+        return self.before + self.after > 0
+
+    def push(self, t, jpeg):
+        """Simpan frame; klip yang jendela `after`-nya sudah lewat dikirim ke encoder"""
+        if not self.enabled:
+            return
+        self.ring.push(t, jpeg)
+        self._submit(self._take(lambda trigger_t: t >= trigger_t + self.after))
+
+    def trigger(self, t, meta):
+        """Catat trigger pada timestamp `t`; meta diteruskan apa adanya ke persist"""
+        if self.enabled:
+            with self._lock:
+                self.pending.append((t, meta))
+
+    def flush(self):
+        """Kirim semua klip yang tertunda dengan frame yang sudah ada (stream berhenti)"""
+        self._submit(self._take(lambda trigger_t: True))
+
+    def drain(self):
+        """Tunggu semua klip yang sudah dikirim ke encoder selesai (benchmark / shutdown)"""
+        self._executor.submit(lambda: None).result()
+
+    def reset(self):
+        with self._lock:
+            self.pending.clear()
+        self.ring.clear()
+
+    def _take(self, due):
+        # push() dari thread stream, flush()/reset() bisa dari thread request /stop
+        with self._lock:
+            taken = []
+            while self.pending and due(self.pending[0][0]):
+                taken.append(self.pending.popleft())
+            return taken
+
+    def _submit(self, taken):
+        for t, meta in taken:
+            frames = self.ring.window(t - self.before, t + self.after)
+            if len(frames) < 2:
+                continue
+            with self._lock:
+                if self.inflight >= MAX_INFLIGHT:
+                    log.warning("Clip encoder tertinggal, klip %s dibuang", meta)
+                    continue
+                self.inflight += 1
+            self._executor.submit(self._encode_and_persist, frames, meta)
+
+    def _encode_and_persist(self, frames, meta):
+        try:
+            with stage('clip'):
+                clip, ext, content_type = encode_clip(frames)
+            with stage('persist'):
+                self.persist(clip, meta, ext, content_type)
+            log.info("Clip saved: %d frames, %d KB (%s)", len(frames), len(clip) // 1024, content_type)
+        except Exception as e:
+            log.error("Error saving clip: %s", e)
+        finally:
+            with self._lock:
+                self.inflight -= 1
@@ -0,0 +1,163 @@
+"""
+Per-frame context untuk detection services
+Satu frame BGR dari kamera/decode + turunannya (RGB, letterbox, preview, JPEG)
+dihitung lazy, sekali per frame, lalu dipakai bersama oleh YOLO, MediaPipe dan
+semua client stream tanpa copy tambahan.
+
+Semua array yang dikembalikan read-only (flags.writeable=False), jadi consumer
+tidak bisa mengubah data yang dipakai consumer lain. Untuk overlay (bbox, label)
+pakai canvas(): satu copy writable per frame. View "annotated" (preview/JPEG)
+dibuat dari canvas dan membekukannya, jadi gambar overlay dulu baru encode.
+
+    ctx = FrameContext(frame)
+    results = ctx.detect(model)          # YOLO (flip BGR->RGB di preprocessing model)
+    pose_result = pose.process(ctx.rgb)  # RGB dihitung sekali
+    cv2.rectangle(ctx.canvas(), ...)
+    jpeg = ctx.jpeg(quality=70, annotated=True)
+
+Frame dari reduced decode (image_decode.py) membawa `scale`: shape, detections()
+dan crop() memakai koordinat frame asli, view lain di resolusi hasil decode.
+"""
+
+import time
+import threading
+
+import cv2
+
+from inference_backend import result_arrays
+from metrics import observe_results
+from slim_runtime import letterbox, make_divisible
+
+
+def readonly(a):
+    """View read-only dari array (tanpa copy)"""
+    v = a.view()
+    v.flags.writeable = False
+    return v
+
+
+class FrameContext:
+    __slots__ = ('seq', 'timestamp', 'scale', '_bgr', '_canvas', '_cache', '_lock')
+
+    def __init__(self, bgr, seq=0, timestamp=None, scale=(1.0, 1.0)):
+        """
+        Frame diambil alih tanpa copy: pemilik tidak boleh menulis ke array `bgr` lagi
+
+        scale: (sx, sy) frame asli / frame `bgr`, dari image_decode.decode_image()
+        """
+        self.seq = seq
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.scale = scale
+        self._bgr = readonly(bgr)
+        self._canvas = None
+        self._cache = {}
+        self._lock = threading.RLock()  # jpeg() -> preview() bersarang
+
+    def _cached(self, key, fn):
+        value = self._cache.get(key)
+        if value is None:
+            with self._lock:
+                value = self._cache.get(key)
+                if value is None:
+                    value = self._cache[key] = fn()
+        return value
+
+    @property
+    def bgr(self):
+        return self._bgr
+
+    @property
+    def shape(self):
+        """Shape frame asli (sebelum reduced decode)"""
+        h, w, c = self._bgr.shape
+        return round(h * self.scale[1]), round(w * self.scale[0]), c
+
+    @property
+    def rgb(self):
+        return self._cached('rgb', lambda: readonly(cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB)))
+
+    def letterbox(self, size=640, stride=32):
+        """
+        Letterbox RGB ke shape inference seperti AutoShape (auto=False)
+
+        Returns:
+            (img, ratio, (dw, dh)), img read-only HWC RGB
+        """
+        def compute():
+            h, w = self._bgr.shape[:2]
+            g = size / max(h, w)
+            shape1 = [make_divisible(int(y * g), stride) for y in (h, w)]
+            img, ratio, pad = letterbox(self.rgb, shape1, auto=False)
+            return readonly(img), ratio, pad
+
+        return self._cached(('letterbox', size, stride), compute)
+
+    def canvas(self):
+        """Copy writable untuk menggambar overlay (dibuat sekali per frame)"""
+        if self._canvas is None:
+            with self._lock:
+                if self._canvas is None:
+                    self._canvas = self._bgr.copy()
+        return self._canvas
+
+    def _source(self, annotated):
+        if annotated and self._canvas is not None:
+            self._canvas.flags.writeable = False  # view turunan sudah dibuat, overlay selesai
+            return self._canvas
+        return self._bgr
+
+    def preview(self, max_side=640, annotated=False):
+        """Versi kecil (sisi terpanjang <= max_side), INTER_AREA"""
+        def compute():
+            src = self._source(annotated)
+            h, w = src.shape[:2]
+            r = max_side / max(h, w)
+            if r >= 1:
+                return src if annotated else self._bgr
+            return readonly(cv2.resize(src, (round(w * r), round(h * r)), interpolation=cv2.INTER_AREA))
+
+        return self._cached(('preview', max_side, annotated), compute)
+
+    def jpeg(self, quality=80, max_side=None, annotated=False):
+        """JPEG bytes, di-encode sekali per (quality, max_side) untuk semua client"""
+        def compute():
+            src = self.preview(max_side, annotated) if max_side else self._source(annotated)
+            ok, buffer = cv2.imencode('.jpg', src, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise ValueError("Gagal encode JPEG")
+            return buffer.tobytes()
+
+        return self._cached(('jpeg', quality, max_side, annotated), compute)
+
+    def crop(self, x1, y1, x2, y2, rgb=False):
+        """Crop read-only dari frame (atau RGB), view tanpa copy, koordinat frame asli"""
+        src = self.rgb if rgb else self._bgr
+        h, w = src.shape[:2]
+        sx, sy = self.scale
+        x1, x2 = int(x1 / sx), int(round(x2 / sx))
+        y1, y2 = int(y1 / sy), int(round(y2 / sy))
+        return src[max(0, y1):min(h, y2), max(0, x1):min(w, x2)]
+
+    def detect(self, model, **kwargs):
+        """Hasil model(...) untuk frame ini, di-cache per model"""
+        def compute():
+            if 'rgb' in self._cache:  # RGB sudah ada, pakai tanpa flip
+                results = model(self._cache['rgb'], **kwargs)
+            else:
+                results = model(self._bgr, bgr=True, **kwargs)
+            observe_results(results)  # preprocess / forward / nms ke /metrics
+            return results
+
+        return self._cached(('detect', id(model), tuple(sorted(kwargs.items()))), compute)
+
+    def detections(self, model, **kwargs):
+        """(boxes, keypoints) NumPy seperti result_arrays(), dalam koordinat frame asli"""
+        boxes, kpts = result_arrays(self.detect(model, **kwargs))
+        sx, sy = self.scale
+        if sx != 1.0 or sy != 1.0:
+            boxes, kpts = boxes.copy(), kpts.copy()
+            boxes[:, [0, 2]] *= sx
+            boxes[:, [1, 3]] *= sy
+            kpts[:, 0::2] *= sx
+            kpts[:, 1::2] *= sy
+        return boxes, kpts
@@ -0,0 +1,216 @@
+"""
+Sumber frame untuk stream services, pengganti cv2.VideoCapture(0)
+
+    DETECTION_SOURCE=0                   webcam index 0 (default)
+    DETECTION_SOURCE=clips/ujian.mp4     file video
+    DETECTION_SOURCE=frames/             folder gambar (urut nama)
+    DETECTION_SOURCE=synthetic           frame sintetis (bergerak) tanpa kamera
+
+Opsi setelah '?': fps (pacing, 0 = secepat mungkin, native = fps file video),
+loop (1 = ulang dari awal).
+    DETECTION_SOURCE=clips/ujian.mp4?fps=native&loop=1
+    DETECTION_SOURCE=synthetic?fps=15
+
+Interface sama dengan VideoCapture yang dipakai services (read, isOpened, release).
+Sumber yang di-pace meniru kamera: kalau consumer lebih lambat dari fps, frame yang
+terlewat dibuang (dihitung di `dropped`), bukan menumpuk. `timestamp` adalah waktu
+capture frame terakhir, untuk latency capture -> hasil.
+"""
+
+import os
+import time
+import glob
+from urllib.parse import parse_qsl
+
+import cv2
+import numpy as np
+
+IMAGE_EXTS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+class FrameSource:
+    """Basis sumber file/sintetis: pacing fps dan statistik frame"""
+
+    def __init__(self, fps=0.0, loop=False):
+        self.fps = fps
+        self.loop = loop
+        self.delivered = 0
+        self.dropped = 0
+        self.timestamp = None
+        self._start = None
+        self._opened = True
+
+    def _frame_count(self):
+        return None  # None = tidak terbatas
+
+    def _get(self, index):
+        raise NotImplementedError
+
+    def _next_index(self):
+        """Index frame berikutnya: berurutan, atau sesuai waktu kalau di-pace"""
+        if not self.fps:
+            return self.delivered + self.dropped
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        target = self.delivered + self.dropped
+        due = self._start + target / self.fps
+        if now < due:
+            time.sleep(due - now)  # lebih cepat dari fps: tunggu frame berikutnya
+            return target
+        index = int((now - self._start) * self.fps)  # terlambat: lompat ke frame sekarang
+        self.dropped += index - target
+        return index
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        index = self._next_index()
+        count = self._frame_count()
+        if count is not None and index >= count:
+            if not self.loop or count == 0:
+                return False, None
+            index %= count
+        frame = self._get(index)
+        if frame is None:
+            return False, None
+        self.delivered += 1
+        self.timestamp = time.time()
+        return True, frame
+
+    def isOpened(self):
+        return self._opened
+
+    def release(self):
+        self._opened = False
+
+    def set(self, prop, value):
+        return False  # kompatibel dengan VideoCapture.set
+
+    def stats(self):
+        total = self.delivered + self.dropped
+        return {'delivered': self.delivered, 'dropped': self.dropped,
+                'drop_rate': round(self.dropped / total, 4) if total else 0.0}
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, fps=0.0, loop=False):
+        super().__init__(fps, loop)
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Gagal membuka video {path}")
+        self.count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        self.native_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if fps is None:
+            self.fps = self.native_fps
+        self._pos = 0
+
+    def _frame_count(self):
+        return self.count
+
+    def _get(self, index):
+        if index != self._pos:
+            if index > self._pos and index - self._pos <= 8:
+                while self._pos < index and self.cap.grab():  # lompatan kecil: grab tanpa decode
+                    self._pos += 1
+            else:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                self._pos = index
+        ok, frame = self.cap.read()
+        if not ok and self.loop and self.count is None:  # count tidak diketahui: ulang saat EOF
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._pos = 0
+            ok, frame = self.cap.read()
+        self._pos += 1
+        return frame if ok else None
+
+    def release(self):
+        super().release()
+        self.cap.release()
+
+
+class ImageDirSource(FrameSource):
+    def __init__(self, path, fps=0.0, loop=False):
+        super().__init__(fps, loop)
+        self.paths = sorted(p for ext in IMAGE_EXTS for p in glob.glob(os.path.join(path, ext)))
+        if not self.paths:
+            raise RuntimeError(f"Tidak ada gambar di {path}")
+        self._cache = {}  # folder kecil: decode sekali, loop berikutnya tanpa I/O
+
+    def _frame_count(self):
+        return len(self.paths)
+
+    def _get(self, index):
+        frame = self._cache.get(index)
+        if frame is None:
+            frame = cv2.imread(self.paths[index])
+            if frame is not None and len(self._cache) < 256:
+                self._cache[index] = frame
+        return frame.copy() if frame is not None else None  # consumer memiliki frame (FrameContext)
+
+
+class SyntheticSource(FrameSource):
+    """Frame sintetis: background noise statis + kotak terang bergerak"""
+
+    def __init__(self, width=1280, height=720, fps=30.0, loop=True):
+        super().__init__(fps, loop)
+        self.background = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    def _get(self, index):
+        frame = self.background.copy()
+        h, w = frame.shape[:2]
+        x = int((index * 7) % max(1, w - w // 4))
+        y = h // 4
+        cv2.rectangle(frame, (x, y), (x + w // 4, y + h // 2), (200, 180, 160), -1)
+        return frame
+
+
+class CameraSource(FrameSource):
+    """Webcam lewat cv2.VideoCapture (kamera sendiri yang mengatur fps dan drop)"""
+
+    def __init__(self, index=0, width=1280, height=720):
+        super().__init__()
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        ok, frame = self.cap.read()
+        if ok:
+            self.delivered += 1
+            self.timestamp = time.time()
+        return ok, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+
+def parse_spec(spec):
+    """'clip.mp4?fps=30&loop=1' -> ('clip.mp4', {'fps': '30', 'loop': '1'})"""
+    path, _, query = spec.partition('?')
+    return path, dict(parse_qsl(query))
+
+
+def open_source(spec=None, width=1280, height=720):
+    """Buka sumber frame dari spec (default DETECTION_SOURCE, lalu webcam 0)"""
+    spec = spec if spec is not None else os.getenv('DETECTION_SOURCE', '0')
+    path, options = parse_spec(str(spec))
+    fps = options.get('fps', '0')
+    fps = None if fps == 'native' else float(fps)
+    loop = options.get('loop', '0') == '1'
+
+    if path.isdigit():
+        return CameraSource(int(path), width, height)
+    if path == 'synthetic':
+        return SyntheticSource(width, height, fps or 30.0)
+    if os.path.isdir(path):
+        return ImageDirSource(path, 30.0 if fps is None else fps, loop)
+    if os.path.isfile(path):
+        return VideoFileSource(path, fps, loop)
+    raise ValueError(f"DETECTION_SOURCE tidak valid: {spec}")
@@ -0,0 +1,160 @@
+"""
+Format weights pre-fused yang bisa di-memory-map (gaya safetensors)
+
+    [8 byte little-endian: panjang header N][N byte JSON header][data tensor, 64-byte aligned]
+
+Header JSON:
+    "__metadata__": {"yaml": model dict, "names": ..., "format": "yolov5-fused-v1"}
+    "<nama tensor>": {"dtype": "F32", "shape": [...], "data_offsets": [start, end]}
+
+Conv+BN sudah di-fuse saat export, jadi saat load tidak ada fuse lagi. Tensor
+di-map read-only dari file, sehingga page OS dipakai bersama oleh semua worker
+process di satu host (RSS agregat turun, cold start lebih cepat dari unpickle).
+
+Export:
+    python fused_weights.py --weights weights/best.pt --out weights/best.ytensors
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+import warnings
+
+import torch
+import torch.nn as nn
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+yolov5_dir = os.path.join(script_dir, 'yolov5')
+
+FORMAT = 'yolov5-fused-v1'
+ALIGN = 64
+
+DTYPES = {
+    torch.float32: 'F32',
+    torch.float16: 'F16',
+    torch.int64: 'I64',
+}
+DTYPES_INV = {v: k for k, v in DTYPES.items()}
+
+
+def _use_vendored_yolov5():
+    if yolov5_dir not in sys.path:
+        sys.path.insert(0, yolov5_dir)
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def export_fused(weights, out):
+    """Load .pt, fuse Conv+BN, tulis tensor flat + header ke `out`"""
+    _use_vendored_yolov5()
+    from models.experimental import attempt_load
+
+    model = attempt_load(weights, device='cpu', fuse=True)
+    tensors = {k: v.detach().contiguous() for k, v in model.state_dict().items()}
+
+    header, offset = {}, 0
+    for name, t in tensors.items():
+        nbytes = t.numel() * t.element_size()
+        header[name] = {'dtype': DTYPES[t.dtype], 'shape': list(t.shape), 'data_offsets': [offset, offset + nbytes]}
+        offset = _align(offset + nbytes)
+
+    names = model.names if isinstance(model.names, dict) else dict(enumerate(model.names))
+    header['__metadata__'] = {
+        'format': FORMAT,
+        'yaml': model.yaml,
+        'names': {str(k): v for k, v in names.items()},
+    }
+
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b' ' * (_align(8 + len(header_bytes)) - 8 - len(header_bytes))  # data mulai di batas ALIGN
+
+    with open(out, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        data_start = f.tell()
+        for name, t in tensors.items():
+            f.seek(data_start + header[name]['data_offsets'][0])
+            f.write(t.numpy().tobytes())
+
+    print(f"✅ Fused weights: {out} ({os.path.getsize(out) / 1e6:.1f} MB, {len(tensors)} tensors)")
+    return out
+
+
+def read_header(path):
+    """Return (header dict, data start offset)"""
+    with open(path, 'rb') as f:
+        n = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(n))
+    if header.get('__metadata__', {}).get('format') != FORMAT:
+        raise ValueError(f"{path} bukan file {FORMAT}")
+    return header, 8 + n
+
+
+def _fuse_structure(model):
+    """Ubah Conv/DWConv ke bentuk fused (conv dengan bias, tanpa bn) tanpa menghitung ulang weights"""
+    from models.common import Conv, DWConv
+
+    for m in model.modules():
+        if isinstance(m, (Conv, DWConv)) and hasattr(m, 'bn'):
+            c = m.conv
+            m.conv = nn.Conv2d(c.in_channels, c.out_channels, c.kernel_size, c.stride, c.padding,
+                               c.dilation, c.groups, bias=True, device='meta')
+            delattr(m, 'bn')
+            m.forward = m.forward_fuse
+
+
+def load_fused(path, device='cpu'):
+    """
+    Bangun DetectionModel dari header lalu pasang tensor yang di-mmap (read-only, zero-copy)
+
+    Tensor tidak boleh diubah in-place (AutoShape memakai Detect.inplace=False).
+    Pindah ke GPU atau half() membuat salinan, page sharing hanya berlaku untuk CPU fp32.
+    """
+    _use_vendored_yolov5()
+    from models.yolo import Detect, DetectionModel
+
+    header, data_start = read_header(path)
+    meta = header.pop('__metadata__')
+
+    model = DetectionModel(meta['yaml'])
+    _fuse_structure(model)
+
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # torch.frombuffer: buffer non-writable
+        for name, info in header.items():
+            start, end = info['data_offsets']
+            dtype = DTYPES_INV[info['dtype']]
+            count = (end - start) // torch.empty(0, dtype=dtype).element_size()
+            t = torch.frombuffer(mm, dtype=dtype, count=count, offset=data_start + start).view(info['shape'])
+
+            module_name, _, attr = name.rpartition('.')
+            module = model.get_submodule(module_name)
+            if attr in module._parameters:
+                module._parameters[attr] = nn.Parameter(t, requires_grad=False)
+            else:
+                module._buffers[attr] = t
+
+    model._mmap = mm  # mapping tetap hidup selama model dipakai
+    model.names = {int(k): v for k, v in meta['names'].items()}
+    for m in model.modules():
+        if isinstance(m, Detect):
+            m.inplace = False
+
+    model.eval()
+    return model.to(device) if device != 'cpu' else model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export weights pre-fused yang bisa di-mmap')
+    parser.add_argument('--weights', default=os.path.join(script_dir, 'weights', 'best.pt'))
+    parser.add_argument('--out', default=os.path.join(script_dir, 'weights', 'best.ytensors'))
+    args = parser.parse_args()
+    export_fused(args.weights, args.out)
@@ -0,0 +1,69 @@
+"""
+Head direction (yaw) helpers
+Dipakai bersama oleh detection services:
+- nose/ear ratio dari MediaPipe Pose (satu orang per frame)
+- 5 facial keypoints dari YOLO landmark head (semua wajah sekaligus, vectorized)
+"""
+
+import numpy as np
+
+# Urutan keypoints dari Detect landmark branch (lihat yolov5/models/hub/yolov5s-face.yaml)
+KEYPOINT_NAMES = ('left_eye', 'right_eye', 'nose', 'mouth_left', 'mouth_right')
+
+# Threshold sama seperti custom_detection.py (detection_api_v2 jalur MediaPipe tetap 0.2)
+YAW_THRESHOLD = 0.25
+
+
+def nose_ear_ratio(nose, l_ear, r_ear):
+    """
+    Yaw ratio dari landmark MediaPipe Pose (normalized x, y)
+
+    Ratio positif: right ear lebih jauh = looking LEFT
+    Ratio negatif: left ear lebih jauh = looking RIGHT
+    """
+    dist_l = np.hypot(nose.x - l_ear.x, nose.y - l_ear.y)
+    dist_r = np.hypot(nose.x - r_ear.x, nose.y - r_ear.y)
+    return (dist_r - dist_l) / (dist_r + dist_l + 1e-6)
+
+
+def keypoint_yaw_ratio(kpts):
+    """
+    Yaw ratio untuk semua wajah sekaligus dari facial keypoints
+
+    Args:
+        kpts: array (n, 10) xy pixels [left_eye, right_eye, nose, mouth_left, mouth_right]
+
+    Returns:
+        np.ndarray (n,): ratio dengan konvensi tanda sama seperti nose_ear_ratio
+    """
+    kpts = np.asarray(kpts, dtype=np.float32).reshape(-1, len(KEYPOINT_NAMES), 2)
+    nose = kpts[:, 2]
+    dist_l = np.linalg.norm(nose - kpts[:, 0], axis=1)
+    dist_r = np.linalg.norm(nose - kpts[:, 1], axis=1)
+    return (dist_r - dist_l) / (dist_r + dist_l + 1e-6)
+
+
+def classify_direction(ratio, threshold=YAW_THRESHOLD, inverse_front=True):
+    """
+    Ratio -> (direction, confidence), menerima scalar atau array
+
+    Args:
+        inverse_front: False = confidence DEPAN juga |ratio| (semantik lama detection_api_v2)
+
+    Returns:
+        direction: "KIRI" | "KANAN" | "DEPAN" (np.ndarray untuk input array)
+        confidence: |ratio| untuk KIRI/KANAN, 1 - |ratio| untuk DEPAN
+    """
+    ratio = np.asarray(ratio, dtype=np.float32)
+    a = np.abs(ratio)
+    direction = np.where(ratio > threshold, 'KIRI', np.where(ratio < -threshold, 'KANAN', 'DEPAN'))
+    confidence = np.where(a > threshold, np.minimum(a, 1.0), 1.0 - a) if inverse_front else np.minimum(a, 1.0)
+
+    if direction.ndim == 0:
+        return str(direction), float(confidence)
+    return direction, confidence
+
+
+def keypoint_directions(kpts, threshold=YAW_THRESHOLD):
+    """Direction + confidence per detected face dalam satu pass"""
+    return classify_direction(keypoint_yaw_ratio(kpts), threshold)
@@ -0,0 +1,113 @@
+"""
+Decode frame dari client (base64 / bytes) dengan reduced decode untuk JPEG besar
+
+Model inference di 640, jadi frame 1080p/4K tidak perlu di-decode full resolution.
+Dimensi dibaca dari header SOF JPEG, lalu dipilih IMREAD_REDUCED_COLOR_2/4/8
+(DCT scaling di libjpeg) selama sisi terpanjang hasil decode masih >= 2x target:
+frame webcam 720p/1080p tetap full decode (crop wajah untuk MediaPipe butuh detail),
+hanya upload yang jauh lebih besar yang dikecilkan.
+Koordinat dikembalikan ke frame asli lewat `scale` (lihat FrameContext).
+
+Konfigurasi:
+    DETECTION_DECODE_TARGET    size inference (default: 640, hasil decode minimal 2x ini, 0 = selalu full decode)
+"""
+
+import os
+import base64
+
+import cv2
+import numpy as np
+
+from metrics import stage
+
+DECODE_TARGET = int(os.getenv('DETECTION_DECODE_TARGET', '640'))
+DECODE_MARGIN = 2  # sisi terpanjang hasil reduced decode >= DECODE_MARGIN * target
+
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Marker SOFn (baseline, progressive, dll.), kecuali DHT (C4), JPG (C8), DAC (CC)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """(width, height) dari header SOF JPEG, None kalau bukan JPEG / header rusak"""
+    data = memoryview(data)
+    n = len(data)
+    if n < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # marker tanpa length
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / SOS sebelum SOF
+            return None
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in SOF_MARKERS:
+            if i + 9 > n:
+                return None
+            h = (data[i + 5] << 8) | data[i + 6]
+            w = (data[i + 7] << 8) | data[i + 8]
+            return (w, h) if w and h else None
+        i += 2 + length
+    return None
+
+
+def reduction_factor(size, target=DECODE_TARGET):
+    """Faktor 8/4/2 terbesar yang sisi terpanjangnya masih >= DECODE_MARGIN * target, 1 kalau tidak ada"""
+    if not size or target <= 0:
+        return 1
+    longest = max(size)
+    for factor, _ in REDUCED_FLAGS:
+        if longest / factor >= DECODE_MARGIN * target:
+            return factor
+    return 1
+
+
+def decode_image(data, target=DECODE_TARGET):
+    """
+    Decode bytes gambar ke BGR, reduced decode untuk JPEG yang jauh lebih besar dari target
+
+    Returns:
+        frame: np.ndarray BGR
+        scale: (sx, sy) koordinat frame asli = koordinat frame hasil decode * scale
+    """
+    buf = np.frombuffer(data, np.uint8)
+    size = jpeg_size(data)
+    factor = reduction_factor(size, target)
+
+    flag = dict(REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+    with stage('decode'):
+        frame = cv2.imdecode(buf, flag)
+        if frame is None and factor > 1:
+            frame = cv2.imdecode(buf, cv2.IMREAD_COLOR)  # fallback full decode
+            size = None
+    if frame is None:
+        raise ValueError("Gagal decode gambar")
+
+    if size and factor > 1:
+        h, w = frame.shape[:2]
+        # SOF tidak tahu EXIF orientation, imdecode menerapkannya: frame yang dirotasi
+        # 90/270 derajat punya width/height tertukar terhadap header
+        if abs(w * size[0] - h * size[1]) < abs(w * size[1] - h * size[0]):
+            size = (size[1], size[0])
+        return frame, (size[0] / w, size[1] / h)
+    return frame, (1.0, 1.0)
+
+
+def decode_base64_image(image_base64, target=DECODE_TARGET):
+    """Decode base64 (boleh dengan prefix data URL) -> (frame BGR, scale)"""
+    if ',' in image_base64:
+        image_base64 = image_base64.split(',')[1]
+    return decode_image(base64.b64decode(image_base64), target)
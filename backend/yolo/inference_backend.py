@@ -0,0 +1,202 @@
+"""
+Pilihan inference backend untuk detection services
+PyTorch (eager), TorchScript, ONNX Runtime, atau OpenVINO
+
+Konfigurasi lewat environment variables:
+    DETECTION_BACKEND          pytorch | fused | torchscript | onnx | openvino   (default: pytorch)
+    DETECTION_WEIGHTS          path model (default: weights/best.<ext sesuai backend>)
+    DETECTION_THREADS          intra-op threads (0 = default runtime)
+    DETECTION_INTEROP_THREADS  inter-op threads (0 = default runtime)
+    DETECTION_GRAPH_OPT        disable | basic | extended | all   (ONNX Runtime, default: all)
+    DETECTION_MODEL_CACHE      ONNX Runtime: file optimized model, OpenVINO: cache dir
+    DETECTION_OV_DEVICE        OpenVINO device (default: AUTO)
+    DETECTION_RUNTIME          slim | torch   (onnx/openvino saja, default: slim)
+
+Backend pytorch/torchscript (dan onnx/openvino dengan DETECTION_RUNTIME=torch)
+dibungkus AutoShape dari yolov5 yang di-vendor. Runtime slim memakai
+slim_runtime.SlimModel: pre/post-processing NumPy yang setara, tanpa import torch.
+
+Backend fused: weights Conv+BN pre-fused yang di-mmap read-only (fused_weights.py),
+page weights dipakai bersama oleh semua worker process di satu host.
+
+Export model:
+    python inference_backend.py --export onnx
+    python inference_backend.py --export fused
+"""
+
+import os
+import sys
+import argparse
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+yolov5_dir = os.path.join(script_dir, 'yolov5')
+
+BACKENDS = {
+    # backend: (default weights, export include name)
+    'pytorch': ('weights/best.pt', None),
+    'fused': ('weights/best.ytensors', 'fused'),
+    'torchscript': ('weights/best.torchscript', 'torchscript'),
+    'onnx': ('weights/best.onnx', 'onnx'),
+    'openvino': ('weights/best_openvino_model', 'openvino'),
+}
+
+
+def load_backend_config():
+    """Baca konfigurasi backend dari environment"""
+    backend = os.getenv('DETECTION_BACKEND', 'pytorch').lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown DETECTION_BACKEND '{backend}', pilih salah satu: {', '.join(BACKENDS)}")
+
+    weights = os.getenv('DETECTION_WEIGHTS') or os.path.join(script_dir, BACKENDS[backend][0])
+    cache = default_cache(backend, weights)
+
+    runtime = 'torch'
+    if backend in ('onnx', 'openvino'):
+        runtime = os.getenv('DETECTION_RUNTIME', 'slim').lower()
+
+    return {
+        'backend': backend,
+        'runtime': runtime,
+        'weights': weights,
+        'intra_op_threads': int(os.getenv('DETECTION_THREADS', '0')),
+        'inter_op_threads': int(os.getenv('DETECTION_INTEROP_THREADS', '0')),
+        'graph_opt': os.getenv('DETECTION_GRAPH_OPT', 'all').lower(),
+        'cache': cache,
+        'ov_device': os.getenv('DETECTION_OV_DEVICE', 'AUTO'),
+    }
+
+
+def default_cache(backend, weights):
+    """DETECTION_MODEL_CACHE, atau <weights>.optimized.onnx untuk backend onnx"""
+    cache = os.getenv('DETECTION_MODEL_CACHE')
+    if backend == 'onnx' and cache is None:
+        cache = os.path.splitext(weights)[0] + '.optimized.onnx'
+    return cache
+
+
+def with_weights(config, weights):
+    """Config yang sama dengan weights lain (hot reload), cache diturunkan dari weights baru"""
+    return {**config, 'weights': weights, 'cache': default_cache(config['backend'], weights)}
+
+
+def _use_vendored_yolov5():
+    """Pastikan `models` dan `utils` di-import dari backend/yolo/yolov5"""
+    if yolov5_dir not in sys.path:
+        sys.path.insert(0, yolov5_dir)
+
+
+def get_device(config=None):
+    """Device inference: 'cuda' atau 'cpu' (runtime slim tidak import torch)"""
+    config = config or load_backend_config()
+    if config['runtime'] == 'slim':
+        if config['backend'] == 'onnx':
+            import onnxruntime
+            return 'cuda' if 'CUDAExecutionProvider' in onnxruntime.get_available_providers() else 'cpu'
+        return 'cpu'
+
+    import torch
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def result_arrays(results, i=0):
+    """
+    Ambil hasil deteksi image ke-i sebagai NumPy, untuk Detections (torch) maupun SlimDetections
+
+    Returns:
+        boxes: (n, 6) [x1, y1, x2, y2, conf, cls], urut confidence tertinggi
+        keypoints: (n, 2*nk), (n, 0) kalau model tanpa landmark head
+    """
+    boxes, kpts = results.xyxy[i], results.keypoints[i]
+    if hasattr(boxes, 'cpu'):  # torch.Tensor
+        boxes, kpts = boxes.cpu().numpy(), kpts.cpu().numpy()
+    return boxes, kpts
+
+
+def load_model(device='cpu', conf=0.4, iou=0.45, config=None):
+    """
+    Load YOLO model sesuai backend yang dikonfigurasi
+
+    Returns:
+        model(rgb) -> Detections (AutoShape) atau SlimDetections (runtime slim)
+    """
+    config = config or load_backend_config()
+    backend = config['backend']
+    options = {k: config[k] for k in ('intra_op_threads', 'inter_op_threads', 'graph_opt', 'cache', 'ov_device')}
+
+    if config['runtime'] == 'slim':
+        from slim_runtime import SlimModel
+
+        model = SlimModel(config['weights'], backend=backend, options=options)
+        model.conf = conf
+        model.iou = iou
+        return model
+
+    import torch
+
+    if backend in ('pytorch', 'fused', 'torchscript'):
+        if config['intra_op_threads']:
+            torch.set_num_threads(config['intra_op_threads'])
+        if config['inter_op_threads']:
+            try:
+                torch.set_num_interop_threads(config['inter_op_threads'])
+            except RuntimeError:
+                pass  # sudah di-set sebelumnya (hanya bisa sekali per proses)
+
+    # Langsung dari yolov5 yang di-vendor, tanpa torch.hub (tanpa cek hub cache, git, atau network)
+    _use_vendored_yolov5()
+    from models.common import AutoShape, DetectMultiBackend
+
+    if backend == 'fused':
+        from fused_weights import load_fused
+
+        model = AutoShape(load_fused(config['weights'], device), verbose=False)
+    else:
+        # pytorch: attempt_load + fuse Conv+BN, sama seperti hubconf._create(autoshape=True)
+        dmb = DetectMultiBackend(config['weights'], device=torch.device(device), fuse=True, options=options)
+        model = AutoShape(dmb, verbose=False)
+
+    model.to(device)
+    model.eval()
+    model.conf = conf
+    model.iou = iou
+
+    # FP16 hanya untuk PyTorch di GPU
+    if device == 'cuda' and backend == 'pytorch':
+        model.half()
+
+    return model
+
+
+def export_model(backend, weights=None, imgsz=640):
+    """Export weights/best.pt ke format backend lain pakai yolov5/export.py"""
+    include = BACKENDS[backend][1]
+    if include is None:
+        raise ValueError("Backend pytorch tidak perlu export")
+
+    weights = weights or os.path.join(script_dir, 'weights', 'best.pt')
+    if include == 'fused':
+        from fused_weights import export_fused
+        return export_fused(weights, os.path.join(script_dir, BACKENDS['fused'][0]))
+
+    _use_vendored_yolov5()
+    import export
+
+    # dynamic axes: AutoShape/slim runtime mengirim input non-persegi (mis. 384x640 untuk frame 720p)
+    dynamic = include in ('onnx', 'openvino')
+    return export.run(
+        weights=weights, imgsz=(imgsz, imgsz), include=(include,), device='cpu', simplify=True, dynamic=dynamic
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detection inference backend tools')
+    parser.add_argument('--export', choices=[b for b in BACKENDS if BACKENDS[b][1]], help='export best.pt ke backend ini')
+    parser.add_argument('--weights', default=None, help='path .pt (default: weights/best.pt)')
+    parser.add_argument('--imgsz', type=int, default=640)
+    args = parser.parse_args()
+
+    if args.export:
+        print(f"📦 Exporting to {args.export}...")
+        print(f"✅ Exported: {export_model(args.export, args.weights, args.imgsz)}")
+    else:
+        print(f"🔧 Backend config: {load_backend_config()}")
@@ -0,0 +1,301 @@
+"""
+Load test untuk endpoint /detect (detection_api.py, detection_api_v2.py, custom_detection.py)
+
+Replay folder JPEG ke POST /detect (payload base64 seperti frontend), closed loop
+(`--concurrency` client, masing-masing kirim request berikutnya setelah response)
+atau open loop (`--rate` request/detik, latency dihitung dari waktu jadwal supaya
+antrean di server ikut terukur).
+
+Target:
+    --app detection_api_v2        in-process lewat Flask test client (tanpa network)
+    --url http://127.0.0.1:5001   server yang sedang jalan (koneksi keep-alive per client)
+
+Hasil: throughput, p50/p95/p99, error rate, status code, timing per stage dari
+server (header Server-Timing, ditambah delta histogram /metrics), ditulis ke JSON
+(`--out`) bersama commit git, supaya bisa dibandingkan antar commit.
+
+    python loadtest.py --app detection_api_v2 --frames frames/ --concurrency 4 --duration 30 --out load.json
+    python loadtest.py --url http://127.0.0.1:5001 --frames frames/ --rate 20 --duration 60
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import glob
+import base64
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+STAGE_RE = re.compile(r'detection_stage_seconds_(sum|count)\{stage="([^"]+)"[^}]*\} ([0-9.e+-]+)')
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def load_payloads(frames_dir, limit=None):
+    """JPEG di folder -> body JSON /detect (data URL base64), di-encode sekali sebelum test"""
+    paths = sorted(p for ext in ('*.jpg', '*.jpeg', '*.png') for p in glob.glob(os.path.join(frames_dir, ext)))
+    if not paths:
+        raise ValueError(f"Tidak ada frame JPEG/PNG di {frames_dir}")
+    payloads = []
+    for path in paths[:limit]:
+        with open(path, 'rb') as f:
+            mime = 'png' if path.endswith('.png') else 'jpeg'
+            payloads.append(f"data:image/{mime};base64,{base64.b64encode(f.read()).decode()}")
+    return payloads
+
+
+def parse_server_timing(header):
+    """'decode;dur=3.1, yolo;dur=20.2' -> {'decode': 3.1, 'yolo': 20.2}"""
+    timings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        m = re.search(r'dur=([0-9.]+)', params)
+        if name and m:
+            timings[name] = float(m.group(1))
+    return timings
+
+
+# =========================
+# Target
+# =========================
+
+class AppTarget:
+    """Flask test client in-process, satu client per thread"""
+
+    def __init__(self, module):
+        os.environ.setdefault('DETECTION_SERVER_TIMING', '1')  # dibaca metrics.py saat import
+        sys.path.insert(0, script_dir)
+        import importlib
+        self.app = importlib.import_module(module).app
+        self._local = threading.local()
+
+    def post(self, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        r = client.post('/detect', data=body, content_type='application/json')
+        return r.status_code, r.headers.get('Server-Timing'), r.get_data()
+
+    def get(self, path):
+        r = self.app.test_client().get(path)
+        return r.status_code, r.get_data(as_text=True)
+
+
+class HttpTarget:
+    """Server yang sedang jalan, koneksi HTTP/1.1 keep-alive per thread"""
+
+    def __init__(self, url, timeout=30):
+        u = urlsplit(url)
+        self.host, self.port, self.timeout = u.hostname, u.port or 80, timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def post(self, body):
+        conn = self._conn()
+        try:
+            conn.request('POST', '/detect', body=body, headers={'Content-Type': 'application/json'})
+            r = conn.getresponse()
+            return r.status, r.getheader('Server-Timing'), r.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def get(self, path):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request('GET', path)
+            r = conn.getresponse()
+            return r.status, r.read().decode()
+        finally:
+            conn.close()
+
+
+def scrape_stages(target):
+    """{stage: (sum detik, count)} dari /metrics (dijumlah semua pid), None kalau tidak ada"""
+    try:
+        status, text = target.get('/metrics')
+    except Exception:
+        return None
+    if status != 200:
+        return None
+    stages = {}
+    for kind, name, value in STAGE_RE.findall(text):
+        s, c = stages.get(name, (0.0, 0))
+        stages[name] = (s + float(value), c) if kind == 'sum' else (s, c + int(float(value)))
+    return stages
+
+
+# =========================
+# Runner
+# =========================
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.status = {}
+        self.errors = 0
+        self.stage_ms = {}
+
+    def add(self, latency_ms, status, server_timing):
+        with self.lock:
+            self.latencies.append(latency_ms)
+            self.status[status] = self.status.get(status, 0) + 1
+            if not (200 <= status < 300):
+                self.errors += 1
+            for name, ms in parse_server_timing(server_timing).items():
+                self.stage_ms.setdefault(name, []).append(ms)
+
+    def add_error(self, latency_ms, kind):
+        with self.lock:
+            self.latencies.append(latency_ms)
+            self.status[kind] = self.status.get(kind, 0) + 1
+            self.errors += 1
+
+
+def _session_body(payload, session):
+    return json.dumps({'image': payload, 'session_id': session})
+
+
+def _send(target, recorder, body, scheduled):
+    try:
+        status, timing, _ = target.post(body)
+        recorder.add((time.perf_counter() - scheduled) * 1000, status, timing)
+    except Exception as e:
+        recorder.add_error((time.perf_counter() - scheduled) * 1000, type(e).__name__)
+
+
+def run_closed(target, payloads, concurrency, duration, recorder):
+    """`concurrency` client, masing-masing satu request in-flight"""
+    stop = time.perf_counter() + duration
+
+    def client(i):
+        n = i
+        while time.perf_counter() < stop:
+            body = _session_body(payloads[n % len(payloads)], f"load-{i}")
+            n += concurrency
+            _send(target, recorder, body, time.perf_counter())
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_open(target, payloads, rate, duration, recorder, sessions=8, max_workers=256):
+    """Request dijadwalkan tiap 1/rate detik tanpa menunggu response (latency dari waktu jadwal)"""
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    total = int(duration * rate)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for n in range(total):
+            scheduled = start + n * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            body = _session_body(payloads[n % len(payloads)], f"load-{n % sessions}")
+            pool.submit(_send, target, recorder, body, scheduled)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=script_dir,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def summarize(recorder, elapsed, before=None, after=None):
+    lat = recorder.latencies
+    n = len(lat)
+    ok = n - recorder.errors
+    result = {
+        'requests': n,
+        'ok': ok,
+        'error_rate': round(recorder.errors / n, 4) if n else 0.0,
+        'throughput_rps': round(ok / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(_percentile(lat, 50), 1),
+        'p95_ms': round(_percentile(lat, 95), 1),
+        'p99_ms': round(_percentile(lat, 99), 1),
+        'max_ms': round(max(lat), 1) if lat else 0.0,
+        'status': {str(k): v for k, v in sorted(recorder.status.items(), key=lambda kv: str(kv[0]))},
+    }
+    if recorder.stage_ms:
+        result['server_timing_ms'] = {
+            name: {'p50': round(_percentile(v, 50), 2), 'p95': round(_percentile(v, 95), 2), 'n': len(v)}
+            for name, v in sorted(recorder.stage_ms.items())
+        }
+    if before is not None and after is not None:
+        result['metrics_stage_mean_ms'] = {
+            name: round((s - before.get(name, (0.0, 0))[0]) / (c - before.get(name, (0.0, 0))[1]) * 1000, 2)
+            for name, (s, c) in sorted(after.items()) if c > before.get(name, (0.0, 0))[1]
+        }
+    return result
+
+
+def run(target, payloads, concurrency=4, rate=None, duration=30.0, warmup=2.0):
+    if warmup:
+        run_closed(target, payloads, 1, warmup, Recorder())  # grid, buffer, koneksi
+
+    before = scrape_stages(target)
+    recorder = Recorder()
+    t0 = time.perf_counter()
+    if rate:
+        run_open(target, payloads, rate, duration, recorder)
+    else:
+        run_closed(target, payloads, concurrency, duration, recorder)
+    elapsed = time.perf_counter() - t0
+    return summarize(recorder, elapsed, before, scrape_stages(target))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test POST /detect')
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument('--app', help='module Flask (mis. detection_api_v2), via test client')
+    target_group.add_argument('--url', help='base URL server (mis. http://127.0.0.1:5001)')
+    parser.add_argument('--frames', required=True, help='folder JPEG/PNG yang di-replay')
+    parser.add_argument('--limit', type=int, default=None, help='maksimum jumlah frame')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--concurrency', type=int, default=4, help='closed loop: jumlah client')
+    mode.add_argument('--rate', type=float, default=None, help='open loop: request/detik')
+    parser.add_argument('--duration', type=float, default=30.0, help='detik')
+    parser.add_argument('--warmup', type=float, default=2.0, help='detik warmup (tidak dihitung)')
+    parser.add_argument('--out', default=None, help='tulis hasil JSON ke file ini')
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.frames, args.limit)
+    target = AppTarget(args.app) if args.app else HttpTarget(args.url)
+    result = run(target, payloads, args.concurrency, args.rate, args.duration, args.warmup)
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'target': args.app or args.url,
+        'mode': {'rate': args.rate} if args.rate else {'concurrency': args.concurrency},
+        'duration_s': args.duration,
+        'frames': len(payloads),
+        'env': {k: v for k, v in os.environ.items() if k.startswith('DETECTION_')},
+        **result,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Hasil disimpan: {args.out}")
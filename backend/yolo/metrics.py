@@ -0,0 +1,214 @@
+"""
+Instrumentasi detection services: histogram latency per stage, /metrics, Server-Timing, logger
+
+Stage yang dicatat (detik):
+    decode      base64/bytes -> frame BGR (image_decode)
+    preprocess  letterbox + normalisasi   \
+    forward     inference YOLO             > dari results.t (Profile di AutoShape / SlimModel)
+    nms         NMS + scale box            /
+    yolo, pose  per request (QoS, qos.py)
+    serialize   jsonify response
+    encode      JPEG screenshot / preview
+    clip        decode + encode klip bukti (evidence_clip, thread background)
+    persist     upload + insert Supabase
+
+Histogram lock-free di hot path: setiap thread menulis ke shard miliknya sendiri
+(satu writer per shard, tanpa lock), scrape menjumlahkan semua shard. Shard thread
+yang sudah selesai (werkzeug: satu thread per request) digabung ke total lewat
+weakref.finalize, jadi jumlah shard tidak tumbuh terus.
+
+    instrument(app)                 # /metrics + request histogram + Server-Timing
+    with stage('decode'):
+        frame, scale = decode_base64_image(...)
+
+Dengan prefork_server.py setiap worker punya registry sendiri (label pid).
+
+Konfigurasi:
+    DETECTION_SERVER_TIMING   1 = header Server-Timing di setiap response (default: 0)
+    DETECTION_LOG_LEVEL       DEBUG | INFO | WARNING | ERROR (default: WARNING, log per request = DEBUG)
+"""
+
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+
+# Bucket latency (detik), 1 ms .. 5 s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SERVER_TIMING = os.getenv('DETECTION_SERVER_TIMING', '0') == '1'
+
+RESULT_STAGES = ('preprocess', 'forward', 'nms')  # urutan results.t
+
+
+class _Anchor:
+    """Object per thread; di-garbage-collect saat thread selesai -> shard di-retire"""
+    __slots__ = ('__weakref__',)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._lock = threading.Lock()  # hanya untuk registrasi / retire shard, bukan observe
+        self._live = {}
+        self._retired = [0] * (len(buckets) + 1) + [0.0]  # counts per bucket (+Inf), sum
+
+    def _new_shard(self):
+        shard = [0] * (len(self.buckets) + 1) + [0.0]
+        anchor = _Anchor()
+        self._local.shard, self._local.anchor = shard, anchor
+        with self._lock:
+            self._live[id(shard)] = shard
+        weakref.finalize(anchor, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._live.pop(id(shard), None)
+            for i, v in enumerate(shard):
+                self._retired[i] += v
+
+    def observe(self, seconds):
+        shard = getattr(self._local, 'shard', None) or self._new_shard()
+        shard[bisect.bisect_left(self.buckets, seconds)] += 1
+        shard[-1] += seconds
+
+    def snapshot(self):
+        """(counts kumulatif per bucket termasuk +Inf, sum, count)"""
+        with self._lock:
+            total = list(self._retired)
+            for shard in list(self._live.values()):
+                for i, v in enumerate(shard):
+                    total[i] += v
+        counts, cumulative = [], 0
+        for c in total[:-1]:
+            cumulative += c
+            counts.append(cumulative)
+        return counts, total[-1], cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.families = {}  # name -> (help, {labels: Histogram})
+        self.gauges = {}  # name -> (help, fn)
+
+    def histogram(self, name, help_text, **labels):
+        key = tuple(sorted(labels.items()))
+        family = self.families.get(name)
+        hist = family[1].get(key) if family else None
+        if hist is None:
+            with self._lock:
+                family = self.families.setdefault(name, (help_text, {}))
+                hist = family[1].setdefault(key, Histogram())
+        return hist
+
+    def gauge(self, name, help_text, fn):
+        """fn() -> angka, atau dict {label value: angka} (label `key`)"""
+        self.gauges[name] = (help_text, fn)
+
+    def render(self):
+        """Format teks Prometheus (text/plain; version=0.0.4)"""
+        pid = os.getpid()
+        with self._lock:  # family / label baru bisa ditambahkan thread lain selama render
+            families = [(name, help_text, sorted(hists.items())) for name, (help_text, hists) in self.families.items()]
+        lines = []
+        for name, help_text, hists in sorted(families):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for key, hist in hists:
+                base = ','.join([f'{k}="{v}"' for k, v in key] + [f'pid="{pid}"'])
+                counts, total, count = hist.snapshot()
+                for le, c in zip((*(str(b) for b in hist.buckets), '+Inf'), counts):
+                    lines.append(f'{name}_bucket{{{base},le="{le}"}} {c}')
+                lines.append(f"{name}_sum{{{base}}} {total:.6f}")
+                lines.append(f"{name}_count{{{base}}} {count}")
+        for name, (help_text, fn) in sorted(self.gauges.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                lines += [f'{name}{{key="{k}",pid="{pid}"}} {float(v)}' for k, v in value.items()]
+            else:
+                lines.append(f'{name}{{pid="{pid}"}} {float(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+_stages = {}  # stage -> Histogram, tanpa lookup label di hot path
+
+
+def observe(name, seconds):
+    """Catat durasi satu stage, juga ke Server-Timing request yang sedang berjalan"""
+    hist = _stages.get(name)
+    if hist is None:
+        hist = _stages[name] = registry.histogram('detection_stage_seconds', 'Durasi per stage pipeline deteksi',
+                                                  stage=name)
+    hist.observe(seconds)
+    if SERVER_TIMING and has_request_context():
+        timings = g.setdefault('server_timing', {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t)
+
+
+def observe_results(results):
+    """preprocess / forward / nms dari results.t (ms per image, Detections atau SlimDetections)"""
+    t = getattr(results, 't', None)
+    if t:
+        for name, ms in zip(RESULT_STAGES, t):
+            observe(name, ms / 1000)
+
+
+def instrument(app, endpoint='/metrics'):
+    """Histogram per request (endpoint, status), header Server-Timing, dan route /metrics"""
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_end(response):
+        start = g.get('metrics_start')
+        if start is not None and request.endpoint != 'metrics':
+            elapsed = time.perf_counter() - start
+            registry.histogram('detection_request_seconds', 'Durasi request HTTP',
+                               endpoint=request.endpoint or 'unknown',
+                               status=str(response.status_code)).observe(elapsed)
+            if SERVER_TIMING:
+                parts = [f"{k};dur={v * 1000:.1f}" for k, v in g.get('server_timing', {}).items()]
+                response.headers['Server-Timing'] = ', '.join(parts + [f"total;dur={elapsed * 1000:.1f}"])
+        return response
+
+    @app.route(endpoint, methods=['GET'], endpoint='metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
+
+
+def get_logger(name):
+    """Logger `detection.<name>`, level dari DETECTION_LOG_LEVEL (log per request pakai DEBUG)"""
+    root = logging.getLogger('detection')
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root.addHandler(handler)
+        root.setLevel(os.getenv('DETECTION_LOG_LEVEL', 'WARNING').upper())
+        root.propagate = False
+    return root.getChild(name)
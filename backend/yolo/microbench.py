@@ -0,0 +1,264 @@
+"""
+Microbenchmark fungsi hot path inference, dibandingkan dengan baseline per fungsi
+
+Fixture deterministik (seed tetap, tanpa file/weights): frame 720p/1080p sintetis,
+JPEG base64, prediksi mentah Detect (nc=1, nk=5, 25200 baris = input 640) dengan
+jumlah kandidat di atas conf yang divariasikan, landmark MediaPipe dan keypoints.
+
+    decode_base64_image     image_decode.py (720p, 1080p dengan reduced decode)
+    letterbox               yolov5/utils/augmentations.py
+    autoshape_fast          AutoShape._preprocess_fast (satu frame uint8, tensor dari pool)
+    autoshape_generic       AutoShape._preprocess (jalur list / umum)
+    nms[k]                  non_max_suppression, k kandidat di atas conf
+    scale_boxes             yolov5/utils/general.py
+    detections              Detections(...) dan .pandas()
+    yaw                     head_pose.nose_ear_ratio dan keypoint_yaw_ratio
+
+Setiap fungsi diukur dengan timeit (autorange, lalu `--repeat` kali), dilaporkan
+median/min/IQR per panggilan. torch dikunci ke `--threads` thread supaya stabil.
+
+    python microbench.py --save microbench_baseline.json        # simpan baseline
+    python microbench.py --compare microbench_baseline.json     # exit 1 kalau ada regresi
+    python microbench.py --filter nms --compare microbench_baseline.json --threshold 0.15
+
+Baseline bergantung pada mesin: simpan dan bandingkan di mesin (dan image Docker) yang sama.
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import base64
+import argparse
+import platform
+from types import SimpleNamespace
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+yolov5_dir = os.path.join(script_dir, 'yolov5')
+sys.path.insert(0, script_dir)
+sys.path.insert(0, yolov5_dir)
+
+import cv2
+import numpy as np
+import torch
+
+from head_pose import keypoint_yaw_ratio, nose_ear_ratio
+from image_decode import decode_base64_image
+from loadtest import _percentile, git_commit
+from models.common import AutoShape, Detections
+from models.yolo import Model
+from utils.augmentations import letterbox
+from utils.general import Profile, non_max_suppression, scale_boxes
+
+FACE_CFG = os.path.join(yolov5_dir, 'models', 'hub', 'yolov5s-face.yaml')
+NC, NK = 1, 5
+ROWS_640 = 25200  # 3 anchor x (80² + 40² + 20²)
+NMS_CANDIDATES = (10, 100, 1000, 5000)
+
+
+# =========================
+# Fixtures
+# =========================
+
+def synthetic_frame(h, w, seed=0):
+    """Noise halus (di-upscale) + beberapa elips, lebih mirip frame kamera daripada noise murni"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (h // 16, w // 16, 3), dtype=np.uint8)
+    frame = cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+    for _ in range(6):
+        x, y = int(rng.integers(0, w - w // 5)), int(rng.integers(0, h - h // 4))
+        cv2.ellipse(frame, (x + w // 10, y + h // 8), (w // 12, h // 7), 0, 0, 360,
+                    tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    return frame
+
+
+def jpeg_base64(frame, quality=80):
+    ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return 'data:image/jpeg;base64,' + base64.b64encode(buf.tobytes()).decode()
+
+
+def raw_prediction(candidates, rows=ROWS_640, seed=0):
+    """
+    Output Detect mentah (1, rows, 5 + nc + nk*2), `candidates` baris dengan obj > conf
+
+    Kandidat dikelompokkan di sekitar beberapa wajah (box saling overlap) seperti output asli.
+    """
+    g = torch.Generator().manual_seed(seed)
+    p = torch.zeros(1, rows, 5 + NC + NK * 2)
+    p[0, :, :4] = torch.rand(rows, 4, generator=g) * torch.tensor([640, 640, 64, 64])
+    p[0, :, 4] = torch.rand(rows, generator=g) * 0.3  # di bawah conf 0.4
+    p[0, :, 5] = torch.rand(rows, generator=g)
+    idx = torch.randperm(rows, generator=g)[:candidates]
+    centers = torch.rand(max(1, candidates // 20), 2, generator=g) * 560 + 40
+    c = centers[torch.arange(candidates) % len(centers)]
+    p[0, idx, :2] = c + torch.randn(candidates, 2, generator=g) * 4
+    p[0, idx, 2:4] = 80 + torch.randn(candidates, 2, generator=g) * 6
+    p[0, idx, 4] = 0.4 + torch.rand(candidates, generator=g) * 0.6
+    p[0, idx, 5] = 0.9
+    p[0, :, 6:] = p[0, :, :2].repeat(1, NK)  # keypoints xy di pusat box
+    return p
+
+
+def detections_fixture(n_faces=3, shape=(720, 1280, 3)):
+    """(ims, pred, files, times, names, shape) seperti keluaran AutoShape.forward"""
+    im = synthetic_frame(*shape[:2])
+    g = torch.Generator().manual_seed(0)
+    pred = torch.rand(n_faces, 6 + NK * 2, generator=g) * 600
+    pred[:, 2:4] = pred[:, :2] + 120
+    pred[:, 4], pred[:, 5] = 0.8, 0
+    return [im[..., ::-1]], [pred], ['image0.jpg'], (Profile(), Profile(), Profile()), {0: 'face'}, (1, 3, 384, 640)
+
+
+def pose_landmarks():
+    """nose, left ear, right ear (atribut x, y seperti NormalizedLandmark MediaPipe), kepala sedikit menoleh"""
+    return SimpleNamespace(x=0.52, y=0.31), SimpleNamespace(x=0.58, y=0.30), SimpleNamespace(x=0.44, y=0.30)
+
+
+# =========================
+# Cases
+# =========================
+
+def build_cases(size=640):
+    """{nama: callable tanpa argumen}, fixture dibuat sekali di sini (di luar pengukuran)"""
+    cases = {}
+
+    for label, (h, w) in (('720p', (720, 1280)), ('1080p', (1080, 1920))):
+        payload = jpeg_base64(synthetic_frame(h, w))
+        cases[f'decode_base64_image[{label}]'] = lambda payload=payload: decode_base64_image(payload)
+        cases[f'decode_base64_image[{label},full]'] = lambda payload=payload: decode_base64_image(payload, target=0)
+
+    frame = synthetic_frame(720, 1280)
+    cases['letterbox[720p,auto]'] = lambda: letterbox(frame, size, auto=True)
+    cases['letterbox[720p,640x640]'] = lambda: letterbox(frame, size, auto=False)
+
+    torch.manual_seed(0)
+    autoshape = AutoShape(Model(FACE_CFG, ch=3, nc=NC).eval(), verbose=False)  # weights acak, preprocessing saja
+    p = next(autoshape.model.parameters())
+
+    def autoshape_fast():
+        _, _, pooled = autoshape._preprocess_fast(frame, (size, size), True, p)
+        autoshape._release_input(pooled)
+
+    cases['autoshape_fast[720p]'] = autoshape_fast
+    cases['autoshape_generic[720p]'] = lambda: autoshape._preprocess([frame], (size, size), True, p)
+
+    for k in NMS_CANDIDATES:
+        pred = raw_prediction(k)
+        cases[f'nms[{k}]'] = lambda pred=pred: non_max_suppression(pred, 0.4, 0.45, max_det=1000, nk=NK)
+
+    boxes = raw_prediction(100)[0, :100, :4].clone()
+    cases['scale_boxes[100]'] = lambda: scale_boxes((384, 640), boxes, (720, 1280))  # in-place, nilai di-clip
+
+    fixture = detections_fixture()
+    results = Detections(*fixture)
+    cases['detections[3]'] = lambda: Detections(*fixture)
+    try:
+        import pandas  # noqa: F401
+        cases['detections.pandas[3]'] = results.pandas
+    except ImportError:
+        pass
+
+    nose, l_ear, r_ear = pose_landmarks()
+    kpts = np.random.default_rng(0).uniform(0, 640, (8, NK * 2)).astype(np.float32)
+    cases['yaw.nose_ear_ratio'] = lambda: nose_ear_ratio(nose, l_ear, r_ear)
+    cases['yaw.keypoint_yaw_ratio[8]'] = lambda: keypoint_yaw_ratio(kpts)
+    return cases
+
+
+# =========================
+# Runner
+# =========================
+
+def measure(fn, repeat=7, min_time=0.2):
+    """Per panggilan (mikrodetik): median, min, IQR dari `repeat` sampel timeit"""
+    timer = timeit.Timer(fn)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(loops, int(loops * min_time / max(elapsed, 1e-9)))
+    samples = [t / loops * 1e6 for t in timer.repeat(repeat, loops)]
+    return {
+        'median_us': round(_percentile(samples, 50), 3),
+        'min_us': round(min(samples), 3),
+        'iqr_us': round(_percentile(samples, 75) - _percentile(samples, 25), 3),
+        'loops': loops,
+        'repeat': repeat,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Rasio median terhadap baseline per fungsi, regresi kalau > 1 + threshold"""
+    rows = []
+    for name, r in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            rows.append({'name': name, 'status': 'new', 'median_us': r['median_us']})
+            continue
+        ratio = r['median_us'] / base['median_us'] if base['median_us'] else float('inf')
+        status = 'REGRESSION' if ratio > 1 + threshold else 'faster' if ratio < 1 - threshold else 'ok'
+        rows.append({'name': name, 'status': status, 'median_us': r['median_us'],
+                     'baseline_us': base['median_us'], 'ratio': round(ratio, 3)})
+    return rows
+
+
+def environment(threads):
+    return {
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'torch_threads': threads,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Microbenchmark fungsi hot path inference')
+    parser.add_argument('--filter', default=None, help='hanya case yang namanya mengandung string ini')
+    parser.add_argument('--repeat', type=int, default=7, help='jumlah sampel per case')
+    parser.add_argument('--min-time', type=float, default=0.2, help='durasi minimum per sampel (detik)')
+    parser.add_argument('--threads', type=int, default=1, help='torch.set_num_threads (dan cv2)')
+    parser.add_argument('--save', default=None, help='tulis hasil JSON (baseline) ke file ini')
+    parser.add_argument('--compare', default=None, help='baseline JSON untuk dibandingkan')
+    parser.add_argument('--threshold', type=float, default=0.10, help='toleransi regresi (0.10 = +10%%)')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    cv2.setNumThreads(args.threads)
+
+    cases = build_cases()
+    if args.filter:
+        cases = {k: v for k, v in cases.items() if args.filter in k}
+
+    results = {}
+    for name, fn in cases.items():
+        fn()  # warmup (cache geometry, pool tensor, lazy import)
+        results[name] = measure(fn, args.repeat, args.min_time)
+        r = results[name]
+        print(f"{name:<36} {r['median_us']:>12.1f} us  (min {r['min_us']:.1f}, iqr {r['iqr_us']:.1f})")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'env': environment(args.threads),
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Hasil disimpan: {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nBaseline {args.compare} (commit {baseline.get('commit')}), threshold {args.threshold:.0%}")
+        for row in rows:
+            detail = f"{row['baseline_us']:.1f} -> {row['median_us']:.1f} us  x{row['ratio']:.2f}" \
+                if 'ratio' in row else f"{row['median_us']:.1f} us"
+            print(f"  {row['status']:<10} {row['name']:<36} {detail}")
+        if baseline.get('env', {}) != report['env']:
+            print("⚠️ Environment berbeda dari baseline, perbandingan bisa tidak valid")
+        if any(row['status'] == 'REGRESSION' for row in rows):
+            sys.exit(1)
@@ -0,0 +1,97 @@
+"""
+Startup loader untuk detection services
+YOLO (dari yolov5 yang di-vendor, tanpa torch.hub) dan MediaPipe Pose di-load
+paralel saat boot, dengan waktu per phase dicatat untuk /health.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_backend import load_backend_config, get_device, load_model
+from thread_budget import ThreadBudget
+
+DEFAULT_POSE_OPTIONS = {
+    'static_image_mode': True,
+    'model_complexity': 0,  # Lightweight model
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+}
+
+
+def _timed(fn, *args, **kwargs):
+    """Jalankan fn, return (hasil, durasi ms)"""
+    t = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - t) * 1000
+
+
+def _load_yolo(device, conf, iou, config, warmup_shape, budget):
+    if budget:
+        budget.pin('yolo')  # pool OpenMP warmup dibuat di core YOLO
+    model, load_ms = _timed(load_model, device, conf=conf, iou=iou, config=config)
+
+    # Warmup: inference pertama (grid Detect, alokasi runtime) jangan kena request pertama
+    warmup_ms = 0.0
+    if warmup_shape:
+        import numpy as np
+        _, warmup_ms = _timed(model, np.zeros(warmup_shape, dtype=np.uint8))
+    if budget:
+        model = budget.wrap_model(model)
+    return model, load_ms, warmup_ms
+
+
+def _load_pose(pose_options, budget):
+    import mediapipe as mp
+
+    if budget:
+        budget.pin('pose')  # thread graph MediaPipe mewarisi affinity thread ini
+
+    mp_pose = mp.solutions.pose
+    pose = mp_pose.Pose(**pose_options)
+    return mp_pose, pose
+
+
+def load_models(conf=0.4, iou=0.45, config=None, pose_options=None, warmup_shape=(720, 1280, 3), budget=None):
+    """
+    Load YOLO + MediaPipe Pose secara paralel
+
+    Thread budget (DETECTION_THREAD_BUDGET, lihat thread_budget.py) diterapkan sebelum load.
+
+    Returns:
+        dict: model, pose, mp_pose, pose_options, device, config, budget, timings (ms per phase)
+    """
+    t0 = time.perf_counter()
+    config = config or load_backend_config()
+    budget = budget or ThreadBudget.from_env()
+    if budget:
+        budget.apply(torch_runtime=config['runtime'] == 'torch')
+        config = {**config, **budget.backend_overrides()}
+    pose_options = {**DEFAULT_POSE_OPTIONS, **(pose_options or {})}
+    device, device_ms = _timed(get_device, config)
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='boot') as pool:
+        yolo_future = pool.submit(_timed, _load_yolo, device, conf, iou, config, warmup_shape, budget)
+        pose_future = pool.submit(_timed, _load_pose, pose_options, budget)
+        (model, yolo_ms, warmup_ms), yolo_total_ms = yolo_future.result()
+        (mp_pose, pose), pose_ms = pose_future.result()
+
+    timings = {
+        'device': round(device_ms, 1),
+        'yolo_load': round(yolo_ms, 1),
+        'yolo_warmup': round(warmup_ms, 1),
+        'yolo_total': round(yolo_total_ms, 1),
+        'pose_load': round(pose_ms, 1),
+        'total': round((time.perf_counter() - t0) * 1000, 1),
+    }
+    print(f"⏱️ Startup ({config['backend']}/{device}): " + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items()))
+
+    return {
+        'model': model,
+        'pose': pose,
+        'mp_pose': mp_pose,
+        'pose_options': pose_options,
+        'device': device,
+        'config': config,
+        'budget': budget,
+        'timings': timings,
+    }
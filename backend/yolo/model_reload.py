@@ -0,0 +1,257 @@
+"""
+Hot reload model YOLO tanpa restart proses
+
+Model baru di-load dan di-warmup di background thread sementara request tetap
+dilayani model lama. Setelah siap, referensi diganti secara atomik: request baru
+memakai model baru, request yang sedang berjalan selesai di model lama, dan model
+lama baru dilepas setelah semua request itu selesai.
+
+    hot = HotModel(boot['model'])
+    reloader = ModelReloader.from_boot(hot, boot, warmup=qos.warm)
+    reloader.watch()                         # DETECTION_RELOAD_WATCH=1
+    register_reload_routes(app, reloader)    # POST /admin/reload, GET /admin/reload
+
+Konfigurasi:
+    DETECTION_RELOAD_WATCH     1 = reload otomatis saat file weights berubah (default: 0)
+    DETECTION_RELOAD_INTERVAL  interval cek file weights, detik (default: 2)
+    DETECTION_RELOAD_DRAIN_S   batas tunggu request lama selesai (default: 30)
+
+Di bawah prefork_server, reload() diteruskan ke master lewat `delegate`: master yang
+load + swap, lalu worker di-restart bergiliran supaya semua worker memakai model baru.
+"""
+
+import os
+import time
+import threading
+
+from flask import jsonify, request
+
+from admin import admin_allowed
+from inference_backend import load_model, with_weights
+from slim_runtime import make_divisible
+
+DRAIN_TIMEOUT = float(os.getenv('DETECTION_RELOAD_DRAIN_S', '30'))
+
+
+class ReloadBusy(Exception):
+    pass
+
+
+class _Generation:
+    __slots__ = ('model', 'version', 'weights', 'loaded_at', 'inflight')
+
+    def __init__(self, model, version, weights):
+        self.model = model
+        self.version = version
+        self.weights = weights
+        self.loaded_at = time.time()
+        self.inflight = 0
+
+
+class HotModel:
+    """Proxy model yang bisa diganti atomik; setiap panggilan memegang lease pada model aktif"""
+
+    def __init__(self, model, weights=None):
+        object.__setattr__(self, '_cond', threading.Condition())
+        object.__setattr__(self, '_active', _Generation(model, 1, weights))
+
+    def __call__(self, *args, **kwargs):
+        with self._cond:
+            gen = self._active
+            gen.inflight += 1
+        try:
+            return gen.model(*args, **kwargs)
+        finally:
+            with self._cond:
+                gen.inflight -= 1
+                if gen.inflight == 0 and gen is not self._active:
+                    self._cond.notify_all()
+
+    def swap(self, model, weights=None, timeout=DRAIN_TIMEOUT):
+        """
+        Ganti model aktif, tunggu request di model lama selesai
+
+        Returns:
+            (model lama, True kalau semua request lama selesai sebelum timeout)
+        """
+        with self._cond:
+            old = self._active
+            object.__setattr__(self, '_active', _Generation(model, old.version + 1, weights or old.weights))
+            drained = self._cond.wait_for(lambda: old.inflight == 0, timeout)
+        return old.model, drained
+
+    @property
+    def current(self):
+        return self._active.model
+
+    def info(self):
+        gen = self._active
+        return {'version': gen.version, 'weights': gen.weights, 'loaded_at': gen.loaded_at, 'inflight': gen.inflight}
+
+    def __getattr__(self, name):
+        return getattr(self._active.model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._active.model, name, value)
+
+
+def _file_signature(path):
+    """(mtime, size) file weights, untuk direktori (OpenVINO) mtime terbaru isinya"""
+    try:
+        if os.path.isdir(path):
+            stats = [os.stat(os.path.join(path, f)) for f in os.listdir(path)]
+            return max((s.st_mtime for s in stats), default=0), sum(s.st_size for s in stats)
+        st = os.stat(path)
+        return st.st_mtime, st.st_size
+    except OSError:
+        return None
+
+
+def warmup_model(model, shapes=((720, 1280, 3),), sizes=(640,)):
+    """Warmup DetectMultiBackend (GPU) lalu inference penuh per shape dan size"""
+    import numpy as np
+
+    dmb = getattr(getattr(model, 'model', None), 'warmup', None)  # AutoShape -> DetectMultiBackend
+    stride = int(getattr(model, 'stride', 32))
+    for shape in shapes:
+        im = np.zeros(shape, dtype=np.uint8)
+        for size in sizes:
+            if dmb:
+                g = size / max(shape[:2])
+                dmb(imgsz=(1, 3, *(make_divisible(int(d * g), stride) for d in shape[:2])))
+            model(im, size=size, bgr=True)
+
+
+class ModelReloader:
+    def __init__(self, hot, loader, warmup=None, weights=None, interval=2.0):
+        """
+        Args:
+            hot: HotModel yang dipakai services
+            loader: fn(weights) -> model baru (belum di-warmup)
+            warmup: fn(model), default warmup_model
+            weights: path weights yang diawasi watch()
+        """
+        self.hot = hot
+        self.loader = loader
+        self.warmup = warmup or warmup_model
+        self.weights = weights
+        self.interval = interval
+        self._lock = threading.Lock()  # satu reload dalam satu waktu
+        self.watching = False
+        self.delegate = None  # fn(weights) -> dict, diisi prefork_server (reload lewat master)
+        self.state = {'status': 'idle', 'reloads': 0, 'failures': 0, 'last_error': None, 'last_ms': None}
+
+    @classmethod
+    def from_boot(cls, hot, boot, conf=0.4, iou=0.45, warmup=None):
+        """Loader dengan backend, device, dan thread budget yang sama seperti saat boot"""
+        config, budget = boot['config'], boot.get('budget')
+
+        def loader(weights):
+            model = load_model(boot['device'], conf=conf, iou=iou, config=with_weights(config, weights))
+            return budget.wrap_model(model) if budget else model
+
+        return cls(hot, loader, warmup, weights=config['weights'],
+                   interval=float(os.getenv('DETECTION_RELOAD_INTERVAL', '2')))
+
+    def reload(self, weights=None):
+        """Load + warmup + swap (blocking); raise ReloadBusy kalau reload lain sedang jalan"""
+        if self.delegate is not None:
+            return self.delegate(weights or self.weights)
+        return self.load_and_swap(weights)
+
+    def load_and_swap(self, weights=None):
+        """Reload di proses ini saja (reload() tanpa delegate)"""
+        if not self._lock.acquire(blocking=False):
+            raise ReloadBusy("Reload lain sedang berjalan")
+        try:
+            weights = weights or self.weights
+            self.state['status'] = 'loading'
+            t = time.perf_counter()
+            model = self.loader(weights)
+            self.state['status'] = 'warming'
+            self.warmup(model)
+            self.state['status'] = 'draining'
+            _, drained = self.hot.swap(model, weights)
+            elapsed = (time.perf_counter() - t) * 1000
+            self.state.update(status='idle', last_error=None, last_ms=round(elapsed, 1), drained=drained)
+            self.state['reloads'] += 1
+            print(f"🔄 Model reloaded: {weights} (v{self.hot.info()['version']}, {elapsed:.0f}ms, drained={drained})")
+            return self.hot.info()
+        except Exception as e:
+            self.state.update(status='idle', last_error=str(e))
+            self.state['failures'] += 1
+            print(f"❌ Reload gagal, model lama tetap dipakai: {e}")
+            raise
+        finally:
+            self._lock.release()
+
+    def reload_async(self, weights=None):
+        """Reload di background thread, False kalau reload lain sedang berjalan"""
+        if self._lock.locked():
+            return False
+
+        def run():
+            try:
+                self.reload(weights)
+            except Exception:
+                pass  # dicatat di state
+
+        threading.Thread(target=run, name='model-reload', daemon=True).start()
+        return True
+
+    def watch(self):
+        """Reload otomatis saat file weights berubah (setelah stabil satu interval, file selesai ditulis)"""
+        def loop():
+            last = _file_signature(self.weights)
+            pending = None
+            while True:
+                time.sleep(self.interval)
+                sig = _file_signature(self.weights)
+                if sig is None or sig == last:
+                    pending = None
+                    continue
+                if sig != pending:  # masih ditulis, tunggu satu interval lagi
+                    pending = sig
+                    continue
+                last, pending = sig, None
+                try:
+                    self.reload()
+                except Exception:
+                    pass  # dicatat di state, model lama tetap dipakai
+
+        self.watching = True  # prefork_server memanggil watch() lagi di worker (thread tidak ikut fork)
+        threading.Thread(target=loop, name='model-watch', daemon=True).start()
+        print(f"👀 Watching {self.weights} (interval {self.interval}s)")
+
+    def status(self):
+        return {**self.state, 'model': self.hot.info(), 'watch_path': self.weights}
+
+
+def register_reload_routes(app, reloader):
+    """POST /admin/reload {"weights": opsional, "wait": false}, GET /admin/reload untuk status"""
+
+    @app.route('/admin/reload', methods=['GET', 'POST'])
+    def admin_reload():
+        if not admin_allowed(request):
+            return jsonify({'success': False, 'message': 'Forbidden'}), 403
+        if request.method == 'GET':
+            return jsonify(reloader.status()), 200
+
+        data = request.get_json(silent=True) or {}
+        weights = data.get('weights')
+        if weights and not os.path.exists(weights):
+            return jsonify({'success': False, 'message': f"Weights tidak ditemukan: {weights}"}), 400
+
+        if data.get('wait'):
+            try:
+                return jsonify({'success': True, 'model': reloader.reload(weights)}), 200
+            except ReloadBusy as e:
+                return jsonify({'success': False, 'message': str(e)}), 409
+            except Exception as e:
+                return jsonify({'success': False, 'message': str(e)}), 500
+
+        if not reloader.reload_async(weights):
+            return jsonify({'success': False, 'message': 'Reload lain sedang berjalan'}), 409
+        return jsonify({'success': True, 'status': 'started', 'model': reloader.hot.info()}), 202
+
+    return admin_reload
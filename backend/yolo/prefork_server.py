@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Pre-fork server untuk detection services (Linux)
+
+Master import modul app sekali (YOLO + MediaPipe di-load sekali), lalu fork N
+worker. Worker mewarisi weights copy-on-write, memakai listening socket yang
+sama (kernel membagi koneksi), di-pin ke core set sendiri, dan intra-op threads
+disesuaikan dengan jumlah core tersebut.
+
+    python prefork_server.py detection_api_v2 --workers 4 --port 5001
+
+Signals ke master:
+    SIGHUP           rolling restart worker satu per satu (N-1 tetap melayani)
+    SIGUSR1          hot reload model (POST /admin/reload di worker mana pun): master
+                     load + swap, lalu rolling restart supaya semua worker memakai model baru
+    SIGTERM/SIGINT   stop semua worker secara graceful
+
+Health per worker (shared memory, bisa dijawab worker mana pun):
+    GET /health/workers
+
+Catatan:
+- Worker yang heartbeat-nya berhenti, request-nya macet lebih dari --timeout,
+  atau exit tak terduga otomatis di-restart oleh master.
+- MediaPipe Pose dan session ONNX Runtime/OpenVINO punya thread internal yang
+  tidak ikut ter-fork, jadi dibuat ulang di setiap worker. Weights PyTorch
+  (dan backend fused via mmap) tetap dipakai bersama.
+- Watcher DETECTION_RELOAD_WATCH hanya berjalan di master, reload-nya juga lewat SIGUSR1.
+- QoS (qos.py) per worker: setiap worker menurunkan/menaikkan level dari latency dan
+  antrean admission-nya sendiri. Level tiap worker terlihat di /health/workers.
+- Dengan DETECTION_THREAD_BUDGET, role yolo/pose/http dihitung ulang di dalam core
+  set masing-masing worker (ThreadBudget.rebase), bukan core id global.
+"""
+
+import os
+import gc
+import sys
+import time
+import socket
+import signal
+import argparse
+import importlib
+import threading
+import traceback
+from multiprocessing import RawArray
+
+from thread_budget import available_cores
+
+# Field shared state per worker slot
+FIELDS = ('pid', 'started', 'heartbeat', 'requests', 'inflight', 'busy_since', 'restarts', 'qos_level')
+F = {name: i for i, name in enumerate(FIELDS)}
+
+HEARTBEAT_INTERVAL = 1.0
+
+
+def partition_cores(n_workers, cores=None):
+    """Bagi core yang tersedia ke n_workers core set yang berurutan (sisa dibagi rata ke depan)"""
+    cores = sorted(cores if cores is not None else os.sched_getaffinity(0))
+    n_workers = max(1, min(n_workers, len(cores)))
+    size, extra = divmod(len(cores), n_workers)
+    layout, start = [], 0
+    for i in range(n_workers):
+        end = start + size + (1 if i < extra else 0)
+        layout.append(cores[start:end])
+        start = end
+    return layout
+
+
+class WorkerTable:
+    """Tabel status worker di shared memory (dibuat sebelum fork, satu writer per slot)"""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.data = RawArray('d', len(layout) * len(FIELDS))
+
+    def get(self, slot, field):
+        return self.data[slot * len(FIELDS) + F[field]]
+
+    def set(self, slot, field, value):
+        self.data[slot * len(FIELDS) + F[field]] = value
+
+    def snapshot(self):
+        now = time.time()
+        workers = []
+        for slot, cores in enumerate(self.layout):
+            pid = int(self.get(slot, 'pid'))
+            busy_since = self.get(slot, 'busy_since')
+            workers.append({
+                'slot': slot,
+                'pid': pid,
+                'alive': pid > 0 and now - self.get(slot, 'heartbeat') < 5 * HEARTBEAT_INTERVAL,
+                'cores': cores,
+                'uptime_s': round(now - self.get(slot, 'started'), 1) if pid else 0.0,
+                'heartbeat_age_s': round(now - self.get(slot, 'heartbeat'), 2) if pid else None,
+                'requests': int(self.get(slot, 'requests')),
+                'inflight': int(self.get(slot, 'inflight')),
+                'busy_s': round(now - busy_since, 2) if busy_since else 0.0,
+                'restarts': int(self.get(slot, 'restarts')),
+                'qos_level': int(self.get(slot, 'qos_level')),
+            })
+        return workers
+
+
+class PreforkServer:
+    def __init__(self, app_module, host='127.0.0.1', port=5001, workers=None, threaded=True,
+                 timeout=60.0, graceful_timeout=30.0):
+        # Core set dibaca sebelum import: ThreadBudget.apply() saat load_models() mem-pin
+        # thread utama ke core http, jadi sched_getaffinity setelahnya hanya 1-2 core
+        cores = available_cores()
+        self.module = importlib.import_module(app_module)  # models di-load di sini, sekali
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cores)  # worker di-fork dari thread ini
+        self.app = self.module.app
+        self.host, self.port = host, port
+        self.threaded = threaded
+        self.timeout = timeout
+        self.graceful_timeout = graceful_timeout
+
+        self.layout = partition_cores(workers or len(cores), cores)
+        self.table = WorkerTable(self.layout)
+        self.pids = [0] * len(self.layout)
+        self.slot = None  # diisi di proses worker
+        self._lock = threading.Lock()
+        self._reload = False
+        self._model_reload = False
+        self._stopping = False
+
+        # POST /admin/reload di worker -> weights ke shared memory + SIGUSR1 ke master
+        self.master_pid = os.getpid()
+        self._reload_weights = RawArray('c', 4096)
+        reloader = getattr(self.module, 'reloader', None)
+        if reloader is not None:
+            reloader.delegate = self._request_reload
+
+        self._install_hooks()
+
+    def _request_reload(self, weights):
+        data = os.fsencode(weights)[:len(self._reload_weights) - 1]
+        self._reload_weights.value = data
+        os.kill(self.master_pid, signal.SIGUSR1)
+        return {**self.module.reloader.hot.info(), 'status': 'rolling', 'weights': weights}
+
+    def _reload_model(self, sock):
+        """Load + swap di master (worker baru mewarisi model baru), lalu rolling restart"""
+        weights = os.fsdecode(self._reload_weights.value)
+        try:
+            self.module.reloader.load_and_swap(weights or None)
+        except Exception:
+            return  # dicatat di reloader.state, worker lama tetap melayani model lama
+        for slot in range(len(self.layout)):
+            if self._stopping:
+                break
+            self._restart(slot, sock, 'reload')
+
+    # =========================
+    # Flask hooks (didaftarkan di master sebelum fork)
+    # =========================
+
+    def _install_hooks(self):
+        from flask import jsonify
+
+        table = self.table
+
+        @self.app.before_request
+        def _prefork_begin():
+            if self.slot is None:
+                return
+            with self._lock:
+                if table.get(self.slot, 'inflight') == 0:
+                    table.set(self.slot, 'busy_since', time.time())
+                table.set(self.slot, 'inflight', table.get(self.slot, 'inflight') + 1)
+
+        @self.app.teardown_request
+        def _prefork_end(exc=None):
+            if self.slot is None:
+                return
+            with self._lock:
+                inflight = max(0, table.get(self.slot, 'inflight') - 1)
+                table.set(self.slot, 'inflight', inflight)
+                table.set(self.slot, 'requests', table.get(self.slot, 'requests') + 1)
+                if inflight == 0:
+                    table.set(self.slot, 'busy_since', 0)
+
+        @self.app.route('/health/workers', methods=['GET'])
+        def prefork_health():
+            workers = table.snapshot()
+            return jsonify({
+                'status': 'ok' if all(w['alive'] for w in workers) else 'degraded',
+                'master_pid': os.getppid() if self.slot is not None else os.getpid(),
+                'served_by': self.slot,
+                'workers': workers,
+            }), 200
+
+    # =========================
+    # Worker
+    # =========================
+
+    def _size_threads(self, n_threads, budget=None):
+        """Intra-op threads = jumlah core worker (atau core YOLO dari thread budget worker)"""
+        config = getattr(self.module, 'backend_config', None)
+        if config is None:
+            return
+
+        if config['runtime'] == 'torch':
+            import torch
+            torch.set_num_threads(n_threads)
+
+        # Session ONNX Runtime/OpenVINO dan graph MediaPipe tidak fork-safe: buat ulang.
+        # Object lama sengaja tetap direferensikan, destructor-nya akan menunggu thread
+        # milik master yang tidak ada di proses ini.
+        boot = getattr(self.module, 'boot', None)
+        self._stale = []
+        if config['backend'] in ('onnx', 'openvino'):
+            from inference_backend import load_model, with_weights
+
+            config = {**config, 'intra_op_threads': n_threads}
+            old = self.module.model
+            weights = old.info()['weights'] if hasattr(old, 'info') else None
+            if weights and weights != config['weights']:  # sudah di-hot reload di master
+                config = with_weights(config, weights)
+            model = load_model(self.module.device, conf=old.conf, iou=old.iou, config=config)
+            if budget is not None:
+                model = budget.wrap_model(model)
+            if hasattr(old, 'swap'):  # HotModel (model_reload.py): isi proxy diganti, referensi lain tetap valid
+                self._stale.append(old.swap(model, timeout=0)[0])
+            else:
+                self._stale.append(old)
+                self.module.model = model
+                if boot is not None:
+                    boot['model'] = model
+
+        if boot is not None and getattr(self.module, 'pose', None) is not None:
+            self._stale.append(self.module.pose)
+            if budget is not None:
+                with budget.pinned('pose'):  # thread graph MediaPipe mewarisi affinity ini
+                    self.module.pose = boot['mp_pose'].Pose(**boot['pose_options'])
+            else:
+                self.module.pose = boot['mp_pose'].Pose(**boot['pose_options'])
+            boot['pose'] = self.module.pose
+
+        # Hot reload (model_reload.py): lock bisa tertahan reload di master saat fork.
+        # Watcher tetap di master saja, reload-nya di-broadcast lewat SIGUSR1.
+        reloader = getattr(self.module, 'reloader', None)
+        if reloader is not None:
+            reloader._lock = threading.Lock()
+
+    def _heartbeat(self):
+        qos = getattr(self.module, 'qos', None)
+        while True:
+            self.table.set(self.slot, 'heartbeat', time.time())
+            if qos is not None:
+                self.table.set(self.slot, 'qos_level', qos.index)
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    def _run_worker(self, slot, sock):
+        from werkzeug.serving import make_server
+
+        self.slot = slot
+        now = time.time()
+        for field, value in (('pid', os.getpid()), ('started', now), ('heartbeat', now),
+                             ('requests', 0), ('inflight', 0), ('busy_since', 0), ('qos_level', 0)):
+            self.table.set(slot, field, value)
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+
+        cores = self.layout[slot]
+        os.sched_setaffinity(0, cores)
+        # Thread budget (yolo/pose/http) dihitung ulang di dalam core set worker ini
+        boot = getattr(self.module, 'boot', None)
+        budget = boot.get('budget') if boot is not None else None
+        if budget is not None:
+            budget.rebase(cores)
+        self._size_threads((budget and budget.yolo_threads) or len(cores), budget)
+        if budget is not None:
+            budget.pin('http')  # thread request werkzeug mewarisi core http
+
+        server = make_server(self.host, self.port, self.app, threaded=self.threaded, fd=sock.fileno())
+
+        def stop(signum, frame):
+            # shutdown() menunggu serve_forever selesai, jadi jangan dipanggil dari thread yang sama
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C ditangani master
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+        print(f"👷 Worker {slot} (pid {os.getpid()}) cores={cores}")
+        server.serve_forever()
+
+        # Selesaikan request yang sedang berjalan sebelum exit
+        deadline = time.time() + self.graceful_timeout
+        while self.table.get(slot, 'inflight') > 0 and time.time() < deadline:
+            time.sleep(0.05)
+        os._exit(0)  # lewati finalizer object warisan master
+
+    # =========================
+    # Master
+    # =========================
+
+    def _spawn(self, slot, sock):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._run_worker(slot, sock)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+        self.pids[slot] = pid
+        self.table.set(slot, 'pid', pid)
+        self.table.set(slot, 'heartbeat', time.time())
+        return pid
+
+    def _stop_worker(self, slot, sig=signal.SIGTERM):
+        pid = self.pids[slot]
+        if not pid:
+            return
+        try:
+            os.kill(pid, sig)
+            deadline = time.time() + self.graceful_timeout + 5
+            while time.time() < deadline:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    break
+                time.sleep(0.05)
+            else:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.pids[slot] = 0
+        self.table.set(slot, 'pid', 0)
+
+    def _restart(self, slot, sock, reason):
+        print(f"♻️ Restart worker {slot} (pid {self.pids[slot]}): {reason}")
+        self._stop_worker(slot, signal.SIGKILL if reason != 'reload' else signal.SIGTERM)
+        self.table.set(slot, 'restarts', self.table.get(slot, 'restarts') + 1)
+        self._spawn(slot, sock)
+
+    def _check_workers(self, sock):
+        now = time.time()
+        for slot, pid in enumerate(self.pids):
+            if not pid:  # slot kosong: jangan waitpid(0), itu me-reap child sembarang
+                self._spawn(slot, sock)
+                continue
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.pids[slot] = 0
+                self._restart(slot, sock, 'exited')
+            elif now - self.table.get(slot, 'heartbeat') > 10 * HEARTBEAT_INTERVAL:
+                self._restart(slot, sock, 'heartbeat timeout')
+            elif self.timeout and self.table.get(slot, 'busy_since') and \
+                    now - self.table.get(slot, 'busy_since') > self.timeout:
+                self._restart(slot, sock, f'request > {self.timeout:.0f}s')
+
+    def serve_forever(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(128)
+
+        def on_hup(signum, frame):
+            self._reload = True
+
+        def on_usr1(signum, frame):
+            self._model_reload = True
+
+        def on_term(signum, frame):
+            self._stopping = True
+
+        signal.signal(signal.SIGHUP, on_hup)
+        signal.signal(signal.SIGUSR1, on_usr1)
+        signal.signal(signal.SIGTERM, on_term)
+        signal.signal(signal.SIGINT, on_term)
+
+        # Object yang sudah ada tidak disentuh GC lagi, page-nya tetap shared setelah fork
+        gc.collect()
+        gc.freeze()
+
+        print(f"🚀 Pre-fork master pid {os.getpid()}: {len(self.layout)} workers di http://{self.host}:{self.port}")
+        for slot in range(len(self.layout)):
+            self._spawn(slot, sock)
+
+        try:
+            while not self._stopping:
+                if self._model_reload:
+                    self._model_reload = False
+                    self._reload_model(sock)
+                if self._reload:
+                    self._reload = False
+                    for slot in range(len(self.layout)):
+                        if self._stopping:
+                            break
+                        self._restart(slot, sock, 'reload')
+                self._check_workers(sock)
+                time.sleep(HEARTBEAT_INTERVAL)
+        finally:
+            print("🛑 Stopping workers...")
+            for slot in range(len(self.layout)):
+                self._stop_worker(slot)
+            sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-fork multi-process detection server')
+    parser.add_argument('app', nargs='?', default='detection_api_v2', help='modul Flask app (default: detection_api_v2)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('DETECTION_WORKERS', '0')),
+                        help='jumlah worker (default: satu per core)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='restart worker jika satu request lebih lama (detik)')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--no-threaded', action='store_true', help='satu request sekaligus per worker')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    PreforkServer(
+        args.app, host=args.host, port=args.port, workers=args.workers or None, threaded=not args.no_threaded,
+        timeout=args.timeout, graceful_timeout=args.graceful_timeout,
+    ).serve_forever()
@@ -0,0 +1,231 @@
+"""
+Profiling on-demand di proses yang sedang jalan (tanpa restart)
+
+torch.profiler:
+    POST /admin/profile {"seconds": 5}            profil semua request selama 5 detik
+    POST /admin/profile {"requests": 20}          profil 20 request berikutnya
+        opsional: "timeout" (detik, default 60), "record_shapes", "profile_memory", "with_stack"
+    -> Chrome trace JSON (buka di chrome://tracing atau ui.perfetto.dev)
+
+    Setiap request yang diprofil berjalan di dalam torch.profiler.profile() miliknya
+    sendiri (profiler tidak melihat thread lain), trace semua request digabung jadi
+    satu file. Selama armed, request diprofil satu per satu; request paralel lain
+    tetap jalan tanpa profiler.
+
+tracemalloc (leak alokasi per frame di stream loop, semua thread):
+    POST /admin/tracemalloc {"action": "start", "frames": 10}
+    POST /admin/tracemalloc {"action": "snapshot", "top": 20}   top alokasi + diff dengan snapshot sebelumnya
+    POST /admin/tracemalloc {"action": "stop"}
+    GET  /admin/tracemalloc                                      status
+
+Saat tidak armed biayanya nol: satu cek atribut per request untuk profiler,
+tracemalloc tidak aktif sama sekali sampai di-start.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import tracemalloc
+
+from flask import Response, g, jsonify, request
+
+from admin import admin_allowed
+
+
+class _ProfileSession:
+    def __init__(self, seconds=None, requests=None, options=None):
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.remaining = requests
+        self.options = options or {}
+        self.lock = threading.Lock()  # satu request diprofil dalam satu waktu
+        self.events = []
+        self.spans = 0
+        self.error = None
+        self.done = threading.Event()
+
+    def expired(self):
+        return (self.deadline is not None and time.monotonic() >= self.deadline) or self.remaining == 0
+
+
+class ProfilerCapture:
+    def __init__(self):
+        self.session = None  # None = disarmed, hot path hanya membaca atribut ini
+
+    def arm(self, seconds=None, requests=None, options=None):
+        if self.session is not None:
+            raise RuntimeError("Profiler sudah armed")
+        self.session = _ProfileSession(seconds, requests, options)
+        return self.session
+
+    def collect(self, session, timeout):
+        """Tunggu sesi selesai (atau timeout), disarm, return Chrome trace"""
+        wait = timeout if session.deadline is None else min(timeout, session.deadline - time.monotonic())
+        session.done.wait(max(wait, 0))
+        session.done.set()  # tidak ada span baru setelah ini
+        self.session = None
+        with session.lock:  # tunggu span yang sedang berjalan selesai
+            events = list(session.events)
+        return {'traceEvents': events, 'otherData': {'spans': session.spans, 'pid': os.getpid(), 'error': session.error}}
+
+    def start_span(self):
+        """Mulai profil satu request kalau armed, return profiler atau None"""
+        session = self.session
+        if session is None or session.done.is_set():
+            return None
+        if session.expired():
+            session.done.set()
+            return None
+        if not session.lock.acquire(blocking=False):  # request lain sedang diprofil
+            return None
+        try:
+            import torch.profiler
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            prof = torch.profiler.profile(activities=activities, **session.options)
+            prof.__enter__()
+        except Exception as e:  # jangan gagalkan request karena profiler
+            session.error = str(e)
+            session.lock.release()
+            return None
+        if session.remaining is not None:
+            session.remaining -= 1
+        return session, prof
+
+    def end_span(self, span):
+        session, prof = span
+        try:
+            prof.__exit__(None, None, None)
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+                path = f.name
+            try:
+                prof.export_chrome_trace(path)
+                with open(path) as f:
+                    trace = json.load(f)
+            finally:
+                os.unlink(path)
+            events = trace.get('traceEvents', trace) if isinstance(trace, dict) else trace
+            session.events.extend(events)
+            session.spans += 1
+        finally:
+            session.lock.release()
+            if session.expired():
+                session.done.set()
+
+
+class MemoryTracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.previous = None
+        self.started_at = None
+
+    def start(self, frames=10):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.previous, self.started_at = None, time.time()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self.previous = self.started_at = None
+
+    def snapshot(self, top=20, key='lineno'):
+        """Top alokasi sekarang dan diff terhadap snapshot sebelumnya"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc belum di-start")
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        with self._lock:
+            previous, self.previous = self.previous, snap
+
+        result = {
+            'top': [{'where': str(s.traceback), 'size_kb': round(s.size / 1024, 1), 'count': s.count}
+                    for s in snap.statistics(key)[:top]],
+        }
+        if previous is not None:
+            result['diff'] = [{'where': str(s.traceback), 'size_diff_kb': round(s.size_diff / 1024, 1),
+                               'count_diff': s.count_diff, 'size_kb': round(s.size / 1024, 1)}
+                              for s in snap.compare_to(previous, key)[:top]]
+        return result
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'frames': tracemalloc.get_traceback_limit(),
+            'started_at': self.started_at,
+            'traced_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'has_baseline': self.previous is not None,
+        }
+
+
+profiler = ProfilerCapture()
+memory = MemoryTracer()
+
+
+def register_profiling_routes(app):
+    """Hook request untuk profiler + route /admin/profile dan /admin/tracemalloc"""
+
+    @app.before_request
+    def _profile_start():
+        if profiler.session is not None:  # disarmed: hanya cek ini
+            g.profile_span = profiler.start_span()
+
+    @app.teardown_request
+    def _profile_end(exc=None):
+        span = g.pop('profile_span', None)
+        if span is not None:
+            profiler.end_span(span)
+
+    @app.route('/admin/profile', methods=['POST'])
+    def admin_profile():
+        if not admin_allowed(request):
+            return jsonify({'success': False, 'message': 'Forbidden'}), 403
+        try:
+            import torch.profiler  # noqa: F401
+        except ImportError:
+            return jsonify({'success': False, 'message': 'torch tidak tersedia di runtime ini'}), 400
+
+        data = request.get_json(silent=True) or {}
+        seconds, requests = data.get('seconds'), data.get('requests')
+        if not seconds and not requests:
+            return jsonify({'success': False, 'message': "Isi 'seconds' atau 'requests'"}), 400
+        options = {k: bool(data[k]) for k in ('record_shapes', 'profile_memory', 'with_stack') if k in data}
+
+        try:
+            session = profiler.arm(float(seconds) if seconds else None, int(requests) if requests else None, options)
+        except RuntimeError as e:
+            return jsonify({'success': False, 'message': str(e)}), 409
+        trace = profiler.collect(session, float(data.get('timeout', 60)))
+        return Response(json.dumps(trace), mimetype='application/json',
+                        headers={'Content-Disposition': f'attachment; filename=trace-{os.getpid()}.json'})
+
+    @app.route('/admin/tracemalloc', methods=['GET', 'POST'])
+    def admin_tracemalloc():
+        if not admin_allowed(request):
+            return jsonify({'success': False, 'message': 'Forbidden'}), 403
+        if request.method == 'GET':
+            return jsonify(memory.status()), 200
+
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        if action == 'start':
+            memory.start(int(data.get('frames', 10)))
+        elif action == 'stop':
+            memory.stop()
+        elif action == 'snapshot':
+            try:
+                return jsonify({**memory.snapshot(int(data.get('top', 20)), data.get('key', 'lineno')),
+                                'status': memory.status()}), 200
+            except RuntimeError as e:
+                return jsonify({'success': False, 'message': str(e)}), 409
+        else:
+            return jsonify({'success': False, 'message': "action: start | snapshot | stop"}), 400
+        return jsonify(memory.status()), 200
@@ -0,0 +1,209 @@
+"""
+Latency-SLO controller: turunkan kualitas inference saat beban tinggi
+
+Controller melihat latency per stage (yolo, pose) dari request terakhir
+dan kedalaman antrean admission, lalu turun satu anak tangga kalau p99 melewati
+SLO atau antrean menumpuk, dan naik lagi kalau beban sudah reda:
+
+    640 -> 480 -> 320            (size inference AutoShape / SlimModel)
+    -> model kecil               (DETECTION_QOS_SMALL_WEIGHTS, mis. face model yolov5n)
+    -> pose dilewati             (hanya kalau model punya landmark head: head direction
+                                  dari keypoint YOLO; tanpa keypoint ladder berhenti di atas,
+                                  supaya deteksi arah kepala tidak pernah mati karena beban)
+
+Semua size di ladder di-warmup untuk setiap model saat boot (grid Detect, geometry
+letterbox, buffer input), jadi pindah level tidak membayar cold start.
+
+    qos = QosController.from_env(boot, admission)
+    level = qos.level()
+    with qos.stage('yolo'):
+        ctx.detections(qos.model(level), size=level.size)
+    qos.observe()
+
+Konfigurasi:
+    DETECTION_QOS_SLO_MS          target p99 per request (default: 300, 0 = QoS mati)
+    DETECTION_QOS_SIZES           size ladder (default: 640,480,320)
+    DETECTION_QOS_SMALL_WEIGHTS   weights model kecil, backend sama dengan DETECTION_BACKEND
+"""
+
+import os
+import time
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+from inference_backend import load_model
+from metrics import observe
+from model_reload import warmup_model
+
+Level = namedtuple('Level', 'size variant pose')
+
+WINDOW = 64  # jumlah request terakhir untuk p99
+MIN_SAMPLES = 8  # sample minimum sebelum memutuskan
+DOWN_COOLDOWN = 1.0  # detik antar langkah turun
+UP_HOLD = 5.0  # detik beban rendah sebelum naik satu level
+UP_RATIO = 0.6  # naik hanya kalau p99 < SLO * UP_RATIO
+QUEUE_HIGH = 2  # request menunggu di admission yang dianggap overload
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def build_ladder(sizes, small=False, keypoints=False):
+    """Urutan level dari kualitas tertinggi: size turun, lalu model kecil, lalu tanpa pose (keypoints saja)"""
+    ladder = [Level(s, 'primary', True) for s in sizes]
+    if small:
+        ladder.append(Level(sizes[-1], 'small', True))
+    if keypoints:
+        ladder.append(Level(sizes[-1], ladder[-1].variant, False))
+    return ladder
+
+
+class QosController:
+    def __init__(self, models, slo_ms=300, sizes=(640, 480, 320), queue_depth=None):
+        """
+        Args:
+            models: {'primary': model, 'small': model opsional}
+            queue_depth: fn() -> jumlah request menunggu (AdmissionController.queue_depth)
+        """
+        self.models = models
+        self.slo_ms = slo_ms
+        # Level tanpa pose hanya kalau semua model di ladder punya landmark head
+        keypoints = all(getattr(m, 'nk', 0) > 0 for m in models.values())
+        self.ladder = build_ladder(list(sizes), small='small' in models, keypoints=keypoints)
+        self.queue_depth = queue_depth or (lambda: 0)
+        self.index = 0
+        self.changes = 0
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=WINDOW)  # (total_ms, {stage: ms})
+        self._local = threading.local()  # stage timing request yang sedang berjalan
+        self._changed_at = time.monotonic()
+        self._calm_since = None
+
+    @classmethod
+    def from_env(cls, boot, admission=None, conf=0.4, iou=0.45, warmup_shape=(720, 1280, 3)):
+        """Buat controller dari hasil load_models(), load model kecil dan warmup semua size"""
+        slo_ms = float(os.getenv('DETECTION_QOS_SLO_MS', '300'))
+        sizes = [int(s) for s in os.getenv('DETECTION_QOS_SIZES', '640,480,320').split(',') if s.strip()]
+        models = {'primary': boot['model']}
+
+        if slo_ms <= 0:
+            sizes = sizes[:1]  # QoS mati: selalu level teratas
+        elif getattr(boot['model'], 'static_shape', None):
+            print("⚠️ QoS: model input statis, ladder size dilewati (export ulang dengan --dynamic)")
+            sizes = sizes[:1]
+
+        small_weights = os.getenv('DETECTION_QOS_SMALL_WEIGHTS')
+        if slo_ms > 0 and small_weights:
+            config = {**boot['config'], 'weights': small_weights}
+            small = load_model(boot['device'], conf=conf, iou=iou, config=config)
+            models['small'] = boot['budget'].wrap_model(small) if boot.get('budget') else small
+
+        qos = cls(models, slo_ms, sizes, queue_depth=admission and (lambda: admission.queue_depth))
+        if slo_ms > 0:
+            qos.warmup(warmup_shape)
+        return qos
+
+    @property
+    def enabled(self):
+        return self.slo_ms > 0
+
+    def sizes(self, variant='primary'):
+        return sorted({l.size for l in self.ladder if l.variant == variant}, reverse=True)
+
+    def warm(self, model, variant='primary', shape=(720, 1280, 3)):
+        """Warmup satu model di semua size ladder-nya (juga dipakai hot reload sebelum swap)"""
+        warmup_model(model, (shape,), self.sizes(variant))
+
+    def warmup(self, shape=(720, 1280, 3)):
+        """Jalankan setiap model di setiap size sekali (grid Detect, geometry, buffer input)"""
+        t = time.perf_counter()
+        for variant, model in self.models.items():
+            self.warm(model, variant, shape)
+        print(f"🔥 QoS warmup {[(v, self.sizes(v)) for v in self.models]} in {(time.perf_counter() - t) * 1000:.0f}ms")
+
+    def level(self):
+        """Level yang dipakai request ini (mulai timing stage)"""
+        self._local.stages = {}
+        self._local.start = time.perf_counter()
+        return self.ladder[self.index]
+
+    def model(self, level):
+        return self.models[level.variant]
+
+    @contextmanager
+    def stage(self, name):
+        """Catat durasi satu stage request yang sedang berjalan (juga ke /metrics)"""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t
+            observe(name, elapsed)
+            stages = getattr(self._local, 'stages', None)
+            if stages is not None:
+                stages[name] = stages.get(name, 0.0) + elapsed * 1000
+
+    def observe(self):
+        """Akhiri request yang sedang berjalan, lalu evaluasi level"""
+        start = getattr(self._local, 'start', None)
+        if start is None:
+            return
+        total = (time.perf_counter() - start) * 1000
+        stages, self._local.start = self._local.stages, None
+        with self._lock:
+            self._window.append((total, stages))
+            if self.enabled:
+                self._evaluate()
+
+    def _evaluate(self):
+        """Turun saat p99 > SLO atau antrean menumpuk, naik setelah UP_HOLD detik tenang"""
+        if len(self._window) < MIN_SAMPLES:
+            return
+        now = time.monotonic()
+        p99 = _percentile([t for t, _ in self._window], 99)
+        queued = self.queue_depth()
+
+        if p99 > self.slo_ms or queued >= QUEUE_HIGH:
+            self._calm_since = None
+            if self.index < len(self.ladder) - 1 and now - self._changed_at >= DOWN_COOLDOWN:
+                self._set(self.index + 1, now, f"p99={p99:.0f}ms queue={queued}")
+        elif p99 < self.slo_ms * UP_RATIO and queued == 0:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif self.index > 0 and now - self._calm_since >= UP_HOLD:
+                self._set(self.index - 1, now, f"p99={p99:.0f}ms")
+        else:
+            self._calm_since = None
+
+    def _set(self, index, now, reason):
+        old, new = self.ladder[self.index], self.ladder[index]
+        self.index = index
+        self.changes += 1
+        self._changed_at = now
+        self._calm_since = None
+        self._window.clear()  # latency level lama tidak relevan lagi
+        print(f"🎚️ QoS {old.size}/{old.variant}/pose={old.pose} -> {new.size}/{new.variant}/pose={new.pose} ({reason})")
+
+    def stats(self):
+        with self._lock:
+            window = list(self._window)
+        level = self.ladder[self.index]
+        stats = {
+            'enabled': self.enabled,
+            'slo_ms': self.slo_ms,
+            'level': self.index,
+            'size': level.size,
+            'variant': level.variant,
+            'pose': level.pose,
+            'ladder': [list(l) for l in self.ladder],
+            'changes': self.changes,
+        }
+        if window:
+            stats['p50_ms'] = round(_percentile([t for t, _ in window], 50), 1)
+            stats['p99_ms'] = round(_percentile([t for t, _ in window], 99), 1)
+            names = {n for _, s in window for n in s}
+            stats['stages_ms'] = {n: round(sum(s.get(n, 0.0) for _, s in window) / len(window), 1) for n in sorted(names)}
+        return stats
@@ -0,0 +1,54 @@
+"""
+Rendisi screenshot untuk halaman history: thumbnail dan medium (JPEG) + original (PNG)
+
+Satu pass per screenshot: original di-encode apa adanya, medium di-resize dari original dan
+thumbnail dari medium (INTER_AREA, tiap langkah memproses gambar yang sudah kecil).
+Gambar yang sudah lebih kecil dari target tidak di-upscale.
+
+    for name, data, ext, content_type in make_renditions(frame): ...
+
+Konfigurasi:
+    DETECTION_THUMB_WIDTH    lebar thumbnail (default 320)
+    DETECTION_MEDIUM_WIDTH   lebar medium (default 960)
+    DETECTION_RENDITION_QUALITY  kualitas JPEG thumbnail / medium (default 80)
+"""
+
+import os
+
+import cv2
+
+THUMB_WIDTH = int(os.getenv('DETECTION_THUMB_WIDTH', '320'))
+MEDIUM_WIDTH = int(os.getenv('DETECTION_MEDIUM_WIDTH', '960'))
+QUALITY = int(os.getenv('DETECTION_RENDITION_QUALITY', '80'))
+
+# (nama, lebar), dari besar ke kecil: setiap rendisi di-resize dari rendisi sebelumnya
+RENDITIONS = (('medium', MEDIUM_WIDTH), ('thumb', THUMB_WIDTH))
+
+
+def resize_width(image, width):
+    h, w = image.shape[:2]
+    if w <= width:
+        return image
+    return cv2.resize(image, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+
+
+def make_renditions(frame, quality=QUALITY):
+    """
+    Frame BGR -> list (nama, bytes, ekstensi, content type): original, medium, thumb
+
+    Raises:
+        ValueError: encode gagal
+    """
+    ok, buffer = cv2.imencode('.png', frame)
+    if not ok:
+        raise ValueError("Failed to encode frame")
+    out = [('original', buffer.tobytes(), 'png', 'image/png')]
+
+    image = frame
+    for name, width in RENDITIONS:
+        image = resize_width(image, width)
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError(f"Failed to encode {name}")
+        out.append((name, buffer.tobytes(), 'jpg', 'image/jpeg'))
+    return out
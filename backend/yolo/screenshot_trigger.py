@@ -0,0 +1,69 @@
+"""
+Logika kapan screenshot diambil, dipakai bersama stream live (detection_stream.py)
+dan analisis offline (batch_analysis.py) supaya hasil keduanya sama
+
+Screenshot diambil saat arah KIRI/KANAN bertahan minimal `delay` detik, dengan
+cooldown per arah. Waktu bisa wall clock (live) atau timestamp video (offline).
+"""
+
+import time
+
+SCREENSHOT_DELAY = 3.5  # 3-4 seconds
+SCREENSHOT_COOLDOWN = 5  # seconds between screenshots for same direction
+
+
+class ScreenshotTrigger:
+    def __init__(self, delay=SCREENSHOT_DELAY, cooldown=SCREENSHOT_COOLDOWN):
+        self.delay = delay
+        self.cooldown = cooldown
+        self.reset()
+
+    def reset(self):
+        self.current_direction = 'DEPAN'
+        self.direction_start_time = None
+        self.last_screenshot_direction = None
+        self.last_screenshot_time = None
+
+    def update(self, direction, now=None):
+        """
+        Determine if a screenshot should be captured based on direction persistence
+
+        Args:
+            direction: Current detected direction (KIRI, KANAN, or DEPAN)
+            now: timestamp (detik), default time.time()
+
+        Returns:
+            bool: True if screenshot should be captured
+        """
+        current_time = time.time() if now is None else now
+
+        # Only capture for KIRI or KANAN
+        if direction not in ('KIRI', 'KANAN'):
+            self.current_direction = direction
+            self.direction_start_time = None
+            return False
+
+        # Check if direction changed
+        if direction != self.current_direction:
+            self.current_direction = direction
+            self.direction_start_time = current_time
+            return False
+
+        # Direction hasn't changed - check duration
+        if self.direction_start_time is None:
+            self.direction_start_time = current_time
+            return False
+
+        if current_time - self.direction_start_time < self.delay:
+            return False
+
+        # Check cooldown to prevent duplicate screenshots
+        if self.last_screenshot_direction == direction and self.last_screenshot_time is not None:
+            if current_time - self.last_screenshot_time < self.cooldown:
+                return False
+
+        # All checks passed - capture screenshot
+        self.last_screenshot_direction = direction
+        self.last_screenshot_time = current_time
+        self.direction_start_time = None  # Reset for next detection
+        return True
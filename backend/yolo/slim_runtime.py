@@ -0,0 +1,457 @@
+"""
+Slim serving runtime: ONNX Runtime / OpenVINO tanpa torch, torchvision dan pandas
+Pre/post-processing NumPy-only, hasil setara dengan jalur torch di yolov5/:
+    letterbox          -> utils/augmentations.py letterbox
+    non_max_suppression-> utils/general.py non_max_suppression (+ torchvision.ops.nms)
+    scale_boxes        -> utils/general.py scale_boxes
+    SlimModel          -> models/common.py AutoShape (+ DetectMultiBackend)
+    SlimDetections     -> models/common.py Detections (versi ringkas)
+
+Dipakai otomatis oleh inference_backend.load_model() untuk backend onnx/openvino
+(DETECTION_RUNTIME=slim, default untuk kedua backend tersebut).
+"""
+
+import ast
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+# =========================
+# PRE-PROCESSING
+# =========================
+
+def make_divisible(x, divisor):
+    """Bulatkan ke atas ke kelipatan divisor (sama seperti utils.general.make_divisible)"""
+    return math.ceil(x / divisor) * divisor
+
+
+def letterbox(im, new_shape=(640, 640), color=(114, 114, 114), auto=False, scaleup=True, stride=32):
+    """Resize + pad ke new_shape, return (image, ratio, (dw, dh))"""
+    shape = im.shape[:2]  # [height, width]
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    if not scaleup:
+        r = min(r, 1.0)
+
+    ratio = r, r
+    new_unpad = round(shape[1] * r), round(shape[0] * r)
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+
+    dw /= 2
+    dh /= 2
+
+    if shape[::-1] != new_unpad:
+        im = cv2.resize(im, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(dh - 0.1), round(dh + 0.1)
+    left, right = round(dw - 0.1), round(dw + 0.1)
+    im = cv2.copyMakeBorder(im, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return im, ratio, (dw, dh)
+
+# =========================
+# POST-PROCESSING
+# =========================
+
+def xywh2xyxy(x):
+    """(n, 4) center xywh -> xyxy"""
+    y = np.empty_like(x)
+    y[:, 0] = x[:, 0] - x[:, 2] / 2
+    y[:, 1] = x[:, 1] - x[:, 3] / 2
+    y[:, 2] = x[:, 0] + x[:, 2] / 2
+    y[:, 3] = x[:, 1] + x[:, 3] / 2
+    return y
+
+
+def nms(boxes, scores, iou_thres):
+    """Greedy NMS, sama seperti torchvision.ops.nms (buang IoU > iou_thres)"""
+    order = np.argsort(-scores, kind='stable')
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_thres]
+    return np.array(keep, dtype=np.int64)
+
+
+def non_max_suppression(
+    prediction,
+    conf_thres=0.25,
+    iou_thres=0.45,
+    classes=None,
+    agnostic=False,
+    multi_label=False,
+    max_det=300,
+    nk=0,
+):
+    """
+    NMS pada output model (bs, anchors, 5 + nc + 2*nk)
+
+    Returns:
+        list (n, 6 + 2*nk) float32 per image [xyxy, conf, cls, keypoints]
+    """
+    assert 0 <= conf_thres <= 1, f"Invalid Confidence threshold {conf_thres}"
+    assert 0 <= iou_thres <= 1, f"Invalid IoU {iou_thres}"
+    if isinstance(prediction, (list, tuple)):
+        prediction = prediction[0]
+
+    bs = prediction.shape[0]
+    nc = prediction.shape[2] - nk * 2 - 5  # number of classes
+    xc = prediction[..., 4] > conf_thres  # candidates
+
+    max_wh = 7680  # (pixels) maximum box width and height
+    max_nms = 30000  # maximum number of boxes into nms()
+    multi_label &= nc > 1
+    mi = 5 + nc  # keypoint start index
+
+    output = [np.zeros((0, 6 + nk * 2), dtype=np.float32)] * bs
+    for xi, x in enumerate(prediction):
+        x = x[xc[xi]].astype(np.float32)  # copy, prediction tidak diubah
+        if not x.shape[0]:
+            continue
+
+        x[:, 5:mi] *= x[:, 4:5]  # conf = obj_conf * cls_conf
+        box = xywh2xyxy(x[:, :4])
+        kpt = x[:, mi:]
+
+        if multi_label:
+            i, j = (x[:, 5:mi] > conf_thres).nonzero()
+            x = np.concatenate((box[i], x[i, 5 + j, None], j[:, None].astype(np.float32), kpt[i]), 1)
+        else:
+            j = x[:, 5:mi].argmax(1)
+            conf = x[:, 5:mi][np.arange(len(j)), j]
+            x = np.concatenate((box, conf[:, None], j[:, None].astype(np.float32), kpt), 1)[conf > conf_thres]
+
+        if classes is not None:
+            x = x[(x[:, 5:6] == np.array(classes, dtype=np.float32)).any(1)]
+
+        if not x.shape[0]:
+            continue
+        x = x[np.argsort(-x[:, 4], kind='stable')[:max_nms]]
+
+        c = x[:, 5:6] * (0 if agnostic else max_wh)  # class offset
+        i = nms(x[:, :4] + c, x[:, 4], iou_thres)[:max_det]
+        output[xi] = x[i]
+
+    return output
+
+
+def clip_boxes(boxes, shape):
+    """Clip xyxy ke (height, width)"""
+    boxes[..., [0, 2]] = boxes[..., [0, 2]].clip(0, shape[1])
+    boxes[..., [1, 3]] = boxes[..., [1, 3]].clip(0, shape[0])
+
+
+def scale_boxes(img1_shape, boxes, img0_shape, ratio_pad=None):
+    """Rescale xyxy dari img1_shape (inference) ke img0_shape (original)"""
+    if ratio_pad is None:
+        gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])
+        pad = (img1_shape[1] - img0_shape[1] * gain) / 2, (img1_shape[0] - img0_shape[0] * gain) / 2
+    else:
+        gain = ratio_pad[0][0]
+        pad = ratio_pad[1]
+
+    boxes[..., [0, 2]] -= pad[0]
+    boxes[..., [1, 3]] -= pad[1]
+    boxes[..., :4] /= gain
+    clip_boxes(boxes, img0_shape)
+    return boxes
+
+
+def scale_keypoints(img1_shape, keypoints, img0_shape):
+    """Rescale keypoints (n, nk*2) dari img1_shape ke img0_shape"""
+    gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])
+    pad = (img1_shape[1] - img0_shape[1] * gain) / 2, (img1_shape[0] - img0_shape[0] * gain) / 2
+
+    keypoints[..., 0::2] -= pad[0]
+    keypoints[..., 1::2] -= pad[1]
+    keypoints /= gain
+    keypoints[..., 0::2] = keypoints[..., 0::2].clip(0, img0_shape[1])
+    keypoints[..., 1::2] = keypoints[..., 1::2].clip(0, img0_shape[0])
+    return keypoints
+
+# =========================
+# RESULT TYPE
+# =========================
+
+class SlimDetections:
+    """
+    Hasil deteksi ringkas, interface mengikuti Detections dari yolov5:
+        xyxy[i]      (n, 6) np.ndarray [xmin, ymin, xmax, ymax, confidence, class]
+        keypoints[i] (n, 2*nk) np.ndarray, (n, 0) kalau model tanpa landmark head
+        t            (pre-process, inference, NMS) ms per image
+    """
+
+    __slots__ = ('xyxy', 'keypoints', 'names', 'shapes', 't', 's', 'n')
+
+    def __init__(self, pred, names, shapes, times, shape):
+        self.xyxy = [x[:, :6] for x in pred]
+        self.keypoints = [x[:, 6:] for x in pred]
+        self.names = names
+        self.shapes = shapes  # original (h, w) per image
+        self.n = len(pred)
+        self.t = tuple(x / self.n * 1e3 for x in times)
+        self.s = tuple(shape)  # inference BCHW shape
+
+    @property
+    def xyxyn(self):
+        """xyxy ternormalisasi ke ukuran gambar original"""
+        return [x / np.array([w, h, w, h, 1, 1], dtype=np.float32) for x, (h, w) in zip(self.xyxy, self.shapes)]
+
+    def to_dicts(self, i=0):
+        """Baris deteksi sebagai dict, kolom sama dengan results.pandas().xyxy[i]"""
+        return [
+            {'xmin': x1, 'ymin': y1, 'xmax': x2, 'ymax': y2, 'confidence': conf,
+             'class': int(cls), 'name': self.names[int(cls)]}
+            for x1, y1, x2, y2, conf, cls in self.xyxy[i].tolist()
+        ]
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return (f"SlimDetections(n={self.n}, detections={[len(x) for x in self.xyxy]}, "
+                f"speed=%.1fms pre-process, %.1fms inference, %.1fms NMS)" % self.t)
+
+# =========================
+# MODEL
+# =========================
+
+class SlimModel:
+    """
+    Pengganti AutoShape(DetectMultiBackend(...)) untuk ONNX Runtime / OpenVINO
+
+    model = SlimModel('weights/best.onnx')
+    results = model(rgb)  # HWC RGB uint8, atau list of images
+    """
+
+    conf = 0.25  # NMS confidence threshold
+    iou = 0.45  # NMS IoU threshold
+    agnostic = False
+    multi_label = False
+    classes = None
+    max_det = 1000
+
+    def __init__(self, weights, backend='onnx', options=None):
+        options = options or {}
+        self.backend = backend
+        self.stride, self.names, self.nk = 32, None, 0
+        self.static_shape = None  # (h, w) kalau input model tidak dynamic
+        self._geometry = {}  # geometry letterbox per (shape input, size)
+        self._input_pool = {}  # buffer input bebas per (shape input, size)
+
+        if backend == 'onnx':
+            self._load_onnx(weights, options)
+        elif backend == 'openvino':
+            self._load_openvino(weights, options)
+        else:
+            raise ValueError(f"SlimModel tidak mendukung backend '{backend}'")
+
+        if self.names is None:
+            self.names = {i: f"class{i}" for i in range(999)}
+        self.device = 'cuda' if 'CUDAExecutionProvider' in getattr(self, 'providers', ()) else 'cpu'
+
+    def _load_onnx(self, w, options):
+        import onnxruntime
+
+        so = onnxruntime.SessionOptions()
+        if options.get('intra_op_threads'):
+            so.intra_op_num_threads = int(options['intra_op_threads'])
+        if options.get('inter_op_threads'):
+            so.inter_op_num_threads = int(options['inter_op_threads'])
+            so.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+        so.graph_optimization_level = {
+            'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[options.get('graph_opt', 'all')]
+
+        # Metadata dibaca dari model asli (optimized cache bisa kehilangan metadata)
+        # Cache yang lebih tua dari model asli (model di-overwrite / reload) dibuat ulang
+        cache = options.get('cache')
+        meta_session = None
+        if cache and os.path.isfile(cache) and os.path.getmtime(cache) >= os.path.getmtime(w):
+            meta_session = onnxruntime.InferenceSession(w, providers=['CPUExecutionProvider'])
+            w, so.graph_optimization_level = cache, onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        elif cache:
+            so.optimized_model_filepath = cache
+
+        available = onnxruntime.get_available_providers()
+        self.providers = [p for p in ('CUDAExecutionProvider', 'CPUExecutionProvider') if p in available]
+        self.session = onnxruntime.InferenceSession(w, sess_options=so, providers=self.providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_names = [x.name for x in self.session.get_outputs()]
+
+        shape = self.session.get_inputs()[0].shape  # [b, 3, h, w], dim dynamic berupa string
+        if all(isinstance(d, int) for d in shape[2:]):
+            self.static_shape = tuple(shape[2:])
+
+        meta = (meta_session or self.session).get_modelmeta().custom_metadata_map
+        if 'stride' in meta:
+            self.stride, self.names = int(meta['stride']), ast.literal_eval(meta['names'])
+        self.nk = int(meta.get('nk', 0))
+        self._infer = lambda x: self.session.run(self.output_names, {self.input_name: x})[0]
+
+    def _load_openvino(self, w, options):
+        import yaml
+        from openvino.runtime import Core, Layout
+
+        core = Core()
+        if not os.path.isfile(w):  # *_openvino_model dir
+            w = next(os.path.join(w, f) for f in os.listdir(w) if f.endswith('.xml'))
+        ov_model = core.read_model(model=w, weights=os.path.splitext(w)[0] + '.bin')
+        if ov_model.get_parameters()[0].get_layout().empty:
+            ov_model.get_parameters()[0].set_layout(Layout('NCHW'))
+        shape = ov_model.get_parameters()[0].get_partial_shape()
+        if shape[2].is_static and shape[3].is_static:
+            self.static_shape = (shape[2].get_length(), shape[3].get_length())
+
+        if options.get('cache'):
+            core.set_property({'CACHE_DIR': str(options['cache'])})
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if options.get('intra_op_threads'):
+            config['INFERENCE_NUM_THREADS'] = int(options['intra_op_threads'])
+        self.compiled = core.compile_model(ov_model, device_name=options.get('ov_device', 'AUTO'), config=config)
+
+        meta_file = os.path.splitext(w)[0] + '.yaml'
+        if os.path.exists(meta_file):
+            with open(meta_file, errors='ignore') as f:
+                meta = yaml.safe_load(f)
+            self.stride, self.names = int(meta['stride']), meta['names']
+            self.nk = int(meta.get('nk', 0))
+        self._infer = lambda x: next(iter(self.compiled(x).values()))
+
+    # Kompatibel dengan pemanggilan model.to(device).eval().half() di services
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+    def half(self):
+        return self
+
+    def _letterbox_geometry(self, s, size):
+        """(shape inference, wh setelah resize, top, left) untuk shape input s, di-cache"""
+        key = (s, size)
+        g = self._geometry.get(key)
+        if g is None:
+            if self.static_shape:
+                shape1 = list(self.static_shape)
+            else:
+                gain = max(size) / max(s)
+                shape1 = [make_divisible(int(y * gain), self.stride) for y in s]
+            r = min(shape1[0] / s[0], shape1[1] / s[1])
+            new_unpad = round(s[1] * r), round(s[0] * r)
+            dw, dh = (shape1[1] - new_unpad[0]) / 2, (shape1[0] - new_unpad[1]) / 2
+            if len(self._geometry) >= 16:
+                self._geometry.clear()
+            g = self._geometry[key] = shape1, new_unpad, round(dh - 0.1), round(dw - 0.1)
+        return g
+
+    def _preprocess_fast(self, im, size, bgr):
+        """
+        Satu frame uint8 HWC -> input (1, 3, h, w) float32 yang dipakai ulang
+
+        Buffer diambil dari pool dan dikembalikan setelah inference (request paralel
+        tidak berbagi buffer). Padding ditulis sekali saat buffer dibuat; flip channel
+        (bgr=True) dan /255 digabung dalam satu copy per channel ke bagian dalam buffer.
+        """
+        s = im.shape[:2]
+        shape1, new_unpad, top, left = self._letterbox_geometry(s, size)
+        key = (s, size)
+        try:
+            buf = self._input_pool[key].pop()
+        except (KeyError, IndexError):
+            x = np.full((1, 3, *shape1), 114 / 255, dtype=np.float32)
+            resized = None if s[::-1] == new_unpad else np.empty((new_unpad[1], new_unpad[0], 3), dtype=np.uint8)
+            buf = x, resized
+        x, resized = buf
+
+        if resized is not None:
+            im = cv2.resize(im, new_unpad, dst=resized, interpolation=cv2.INTER_LINEAR)
+        roi = x[0, :, top:top + new_unpad[1], left:left + new_unpad[0]]
+        for c, sc in enumerate((2, 1, 0) if bgr else (0, 1, 2)):
+            np.divide(im[..., sc], 255, out=roi[c], dtype=np.float32)
+        return x, shape1, (key, buf)
+
+    def _release_input(self, pooled):
+        key, buf = pooled
+        if key not in self._input_pool and len(self._input_pool) >= 16:
+            self._input_pool.clear()
+        self._input_pool.setdefault(key, []).append(buf)
+
+    def __call__(self, ims, size=640, bgr=False):
+        """
+        Inference pada HWC uint8 image(s), sama seperti AutoShape.forward
+
+        bgr=True untuk frame OpenCV (tanpa cvtColor terpisah). Satu frame numpy
+        uint8 memakai jalur cepat dengan buffer input yang dialokasikan sekali.
+        """
+        t0 = time.perf_counter()
+        if isinstance(size, int):
+            size = (size, size)
+
+        if (isinstance(ims, np.ndarray) and ims.dtype == np.uint8 and ims.ndim == 3 and ims.shape[2] == 3
+                and min(ims.strides) > 0):
+            x, shape1, pooled = self._preprocess_fast(ims, size, bgr)
+            shape0 = [ims.shape[:2]]
+        else:
+            x, shape0, shape1 = self._preprocess(ims, size, bgr)
+            pooled = None
+        t1 = time.perf_counter()
+
+        y = self._infer(x)
+        if pooled:
+            self._release_input(pooled)
+        t2 = time.perf_counter()
+
+        y = non_max_suppression(
+            y, self.conf, self.iou, self.classes, self.agnostic, self.multi_label, max_det=self.max_det, nk=self.nk
+        )
+        for i in range(len(shape0)):
+            scale_boxes(shape1, y[i][:, :4], shape0[i])
+            if self.nk:
+                scale_keypoints(shape1, y[i][:, 6:], shape0[i])
+        t3 = time.perf_counter()
+
+        return SlimDetections(y, self.names, shape0, (t1 - t0, t2 - t1, t3 - t2), x.shape)
+
+    def _preprocess(self, ims, size, bgr):
+        """List image sembarang -> input (b, 3, h, w) float32"""
+        ims = list(ims) if isinstance(ims, (list, tuple)) else [ims]
+        shape0, shape1 = [], []
+        for i, im in enumerate(ims):
+            if im.shape[0] < 5:  # CHW
+                im = im.transpose((1, 2, 0))
+            im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)
+            if bgr:
+                im = im[..., ::-1]
+            s = im.shape[:2]
+            shape0.append(s)
+            g = max(size) / max(s)
+            shape1.append([int(y * g) for y in s])
+            ims[i] = im if im.data.contiguous else np.ascontiguousarray(im)
+
+        if self.static_shape:
+            shape1 = list(self.static_shape)
+        else:
+            shape1 = [make_divisible(x, self.stride) for x in np.array(shape1).max(0)]
+        x = np.stack([letterbox(im, shape1, auto=False)[0] for im in ims])
+        x = np.ascontiguousarray(x.transpose((0, 3, 1, 2)), dtype=np.float32)
+        x /= 255
+        return x, shape0, shape1
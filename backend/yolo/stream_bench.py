@@ -0,0 +1,184 @@
+"""
+Benchmark end-to-end stream pipeline (detection_stream.py) pada clip rekaman
+
+Menjalankan loop generate_frames() yang sama dengan /stream: capture -> YOLO -> pose
+-> trigger screenshot -> encode -> persist -> JPEG MJPEG (+ klip bukti di thread background), dengan frame_source sebagai
+pengganti webcam. Sumber di-pace ke fps clip (default), jadi kalau pipeline lebih
+lambat dari real-time frame terlewat dan drop rate naik seperti di kamera asli.
+
+Persist default ke folder lokal (`--persist-dir`) supaya benchmark tidak mengisi
+Supabase; `--supabase USER_ID` memakai upload + insert asli dengan session baru.
+
+Hasil: FPS sustained, drop rate, latency capture -> hasil (p50/p95/p99), CPU per
+frame, jumlah screenshot, rata-rata per stage (metrics), ditulis ke JSON (`--out`).
+
+    python stream_bench.py --source clips/ujian.mp4 --frames 600 --out stream.json
+    python stream_bench.py --source clips/ujian.mp4 --fps 0          # secepat mungkin (throughput)
+    python stream_bench.py --source synthetic --fps 30 --frames 300
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from loadtest import _percentile, git_commit
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class LocalSink:
+    """Pengganti upload/insert Supabase: tulis PNG / klip ke folder, catat record di memori"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.records = []
+        self.clips = []
+        os.makedirs(directory, exist_ok=True)
+
+    def upload_screenshot(self, user_id, session_id, image_bytes, filename, content_type='image/png'):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'wb') as f:
+            f.write(image_bytes)
+        return path
+
+    def upload_renditions(self, user_id, session_id, renditions, stem):
+        urls = {}
+        for name, data, ext, content_type in renditions:
+            suffix = '' if name == 'original' else f"_{name}"
+            urls[name] = self.upload_screenshot(user_id, session_id, data, f"{stem}{suffix}.{ext}", content_type)
+        return urls
+
+    def save_screenshot_record(self, session_id, image_url, direction, thumb_url=None, medium_url=None):
+        record = {'id': f"bench-{len(self.records)}", 'session_id': session_id, 'image_url': image_url,
+                  'direction': direction, 'thumb_url': thumb_url, 'medium_url': medium_url}
+        self.records.append(record)
+        return record
+
+    def attach_clip(self, screenshot_id, clip_url):
+        self.clips.append({'id': screenshot_id, 'clip_url': clip_url})
+        return self.clips[-1]
+
+    def update_preview_image(self, session_id, image_url, thumb_url=None):
+        return {'id': session_id, 'preview_image': image_url, 'preview_thumb': thumb_url}
+
+
+def stage_totals():
+    """{stage: (sum detik, count)} dari histogram metrics di proses ini"""
+    import metrics
+    totals = {}
+    for name, hist in list(metrics._stages.items()):
+        _, total, count = hist.snapshot()
+        totals[name] = (total, count)
+    return totals
+
+
+def run(stream, frames, warmup):
+    """Iterasi generate_frames(), ukur frame setelah `warmup` frame pertama"""
+    latencies = []
+    gen = stream.generate_frames()
+    source = None
+    n = 0
+    t0 = cpu0 = before = None
+    try:
+        for _ in gen:
+            now = time.time()
+            source = source or stream.cap
+            n += 1
+            if n == warmup:
+                t0, cpu0, before = time.perf_counter(), time.process_time(), stage_totals()
+                base = dict(source.stats()) if hasattr(source, 'stats') else {}
+            elif n > warmup:
+                latencies.append((now - source.timestamp) * 1000)
+            if n >= warmup + frames:
+                break
+    finally:
+        elapsed = time.perf_counter() - t0 if t0 is not None else 0.0
+        cpu = time.process_time() - cpu0 if cpu0 is not None else 0.0
+        stats = source.stats() if source is not None and hasattr(source, 'stats') else {}
+        stream.active_stream = False
+        gen.close()  # finally generate_frames -> cleanup_camera
+
+    measured = len(latencies)
+    if t0 is None or not measured:
+        raise RuntimeError(f"Clip habis sebelum pengukuran ({n} frame, warmup {warmup})")
+    delivered = stats.get('delivered', 0) - base.get('delivered', 0)
+    dropped = stats.get('dropped', 0) - base.get('dropped', 0)
+    after = stage_totals()
+    return {
+        'frames': measured,
+        'elapsed_s': round(elapsed, 2),
+        'sustained_fps': round(measured / elapsed, 2) if elapsed else 0.0,
+        'source_fps': getattr(source, 'fps', None) or None,
+        'dropped': dropped,
+        'drop_rate': round(dropped / (delivered + dropped), 4) if delivered + dropped else 0.0,
+        'latency_p50_ms': round(_percentile(latencies, 50), 1),
+        'latency_p95_ms': round(_percentile(latencies, 95), 1),
+        'latency_p99_ms': round(_percentile(latencies, 99), 1),
+        'latency_max_ms': round(max(latencies), 1),
+        'cpu_ms_per_frame': round(cpu / measured * 1000, 2),
+        'cpu_utilization': round(cpu / elapsed, 2) if elapsed else 0.0,  # >1 = lebih dari satu core
+        'stage_mean_ms': {
+            name: round((s - before.get(name, (0.0, 0))[0]) / (c - before.get(name, (0.0, 0))[1]) * 1000, 2)
+            for name, (s, c) in sorted(after.items()) if c > before.get(name, (0.0, 0))[1]
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark end-to-end detection_stream pada clip')
+    parser.add_argument('--source', required=True, help='file video, folder gambar, atau synthetic')
+    parser.add_argument('--fps', default='native', help="pacing: native (fps clip), angka, atau 0 = secepat mungkin")
+    parser.add_argument('--frames', type=int, default=300, help='jumlah frame yang diukur')
+    parser.add_argument('--warmup', type=int, default=30, help='frame warmup (tidak dihitung)')
+    parser.add_argument('--loop', action='store_true', help='ulang clip kalau frame belum cukup')
+    parser.add_argument('--persist-dir', default=os.path.join(tempfile.gettempdir(), 'stream_bench'),
+                        help='folder screenshot (default persist lokal)')
+    parser.add_argument('--supabase', metavar='USER_ID', default=None, help='persist ke Supabase dengan user ini')
+    parser.add_argument('--out', default=None, help='tulis hasil JSON ke file ini')
+    args = parser.parse_args()
+
+    os.environ['DETECTION_SOURCE'] = f"{args.source}?fps={args.fps}&loop={int(args.loop)}"
+    sys.path.insert(0, script_dir)
+    import detection_stream as stream  # load model + pose
+
+    sink = None
+    if args.supabase:
+        stream.current_session_id = stream.create_session(args.supabase)['id']
+        stream.current_user_id = args.supabase
+    else:
+        sink = LocalSink(args.persist_dir)
+        stream.upload_screenshot = sink.upload_screenshot
+        stream.upload_renditions = sink.upload_renditions
+        stream.save_screenshot_record = sink.save_screenshot_record
+        stream.update_preview_image = sink.update_preview_image
+        stream.attach_clip = sink.attach_clip
+        stream.current_session_id = stream.current_user_id = 'bench'
+    stream.reset_direction_tracker()
+    stream.active_stream = True
+
+    try:
+        result = run(stream, args.frames, max(1, args.warmup))
+        stream.screenshot_worker.submit(lambda: None).result()  # screenshot antrean selesai dulu
+        stream.clips.drain()  # klip terakhir selesai di-encode + persist sebelum dihitung
+    finally:
+        if args.supabase:
+            stream.finish_session(stream.current_session_id)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': os.environ['DETECTION_SOURCE'],
+        'persist': 'supabase' if args.supabase else args.persist_dir,
+        'screenshots': len(sink.records) if sink else None,
+        'clips': len(sink.clips) if sink else None,
+        'env': {k: v for k, v in os.environ.items() if k.startswith('DETECTION_')},
+        **result,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Hasil disimpan: {args.out}")
@@ -1,5 +1,6 @@
 # Supabase Python Client for Detection System
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from supabase import create_client, Client
 from dotenv import load_dotenv
@@ -66,15 +67,17 @@ def finish_session(session_id: str) -> dict:
         print(f"❌ Error finishing session: {e}")
         raise
 
-def upload_screenshot(user_id: str, session_id: str, image_bytes: bytes, filename: str) -> str:
+def upload_screenshot(user_id: str, session_id: str, image_bytes: bytes, filename: str,
+                      content_type: str = "image/png") -> str:
     """
-    Upload screenshot to Supabase Storage
+    Upload screenshot (or evidence clip) to Supabase Storage
     
     Args:
         user_id: UUID of the user
         session_id: UUID of the session
         image_bytes: Screenshot image data
         filename: Name for the file
+        content_type: MIME type, e.g. "video/mp4" or "video/webm" for evidence clips
         
     Returns:
         str: Public URL of the uploaded image
@@ -87,7 +90,7 @@ def upload_screenshot(user_id: str, session_id: str, image_bytes: bytes, filenam
         response = supabase.storage.from_('detection-screenshots').upload(
             file_path,
             image_bytes,
-            file_options={"content-type": "image/png"}
+            file_options={"content-type": content_type}
         )
         
         # Get public URL
@@ -100,7 +103,42 @@ def upload_screenshot(user_id: str, session_id: str, image_bytes: bytes, filenam
         print(f"❌ Error uploading screenshot: {e}")
         raise
 
-def save_screenshot_record(session_id: str, image_url: str, direction: str) -> dict:
+def upload_renditions(user_id: str, session_id: str, renditions: list, stem: str) -> dict:
+    """
+    Upload the original, then the smaller renditions in parallel (best-effort)
+    
+    Args:
+        user_id: UUID of the user
+        session_id: UUID of the session
+        renditions: (name, bytes, ext, content_type) from renditions.make_renditions, original first
+        stem: Filename without extension, e.g. KIRI_20250101_120000_000
+        
+    Returns:
+        dict: Public URL per rendition name (original, medium, thumb); None for a failed thumb/medium
+    
+    Raises:
+        Exception: if the original upload fails
+    """
+    def upload(rendition):
+        name, data, ext, content_type = rendition
+        suffix = '' if name == 'original' else f"_{name}"
+        return upload_screenshot(user_id, session_id, data, f"{stem}{suffix}.{ext}", content_type)
+    
+    def try_upload(rendition):
+        try:
+            return rendition[0], upload(rendition)
+        except Exception:
+            return rendition[0], None  # record tetap disimpan dengan URL NULL
+    
+    original, rest = renditions[0], renditions[1:]
+    urls = {original[0]: upload(original)}
+    if rest:
+        with ThreadPoolExecutor(len(rest)) as pool:
+            urls.update(pool.map(try_upload, rest))
+    return urls
+
+def save_screenshot_record(session_id: str, image_url: str, direction: str,
+                           thumb_url: str = None, medium_url: str = None) -> dict:
     """
     Save screenshot record to database
     
@@ -108,17 +146,24 @@ def save_screenshot_record(session_id: str, image_url: str, direction: str) -> d
         session_id: UUID of the session
         image_url: URL of the uploaded screenshot
         direction: Direction detected (KIRI or KANAN)
+        thumb_url: URL of the thumbnail rendition (optional)
+        medium_url: URL of the medium rendition (optional)
         
     Returns:
         dict: Created screenshot record
     """
     try:
-        response = supabase.table('session_screenshots').insert({
+        record = {
             'session_id': session_id,
             'image_url': image_url,
             'direction': direction,
             'captured_at': datetime.utcnow().isoformat()
-        }).execute()
+        }
+        if thumb_url:
+            record['thumb_url'] = thumb_url
+        if medium_url:
+            record['medium_url'] = medium_url
+        response = supabase.table('session_screenshots').insert(record).execute()
         
         if response.data and len(response.data) > 0:
             print(f"✅ Screenshot record saved: {direction}")
@@ -130,22 +175,50 @@ def save_screenshot_record(session_id: str, image_url: str, direction: str) -> d
         print(f"❌ Error saving screenshot record: {e}")
         raise
 
-def update_preview_image(session_id: str, image_url: str) -> dict:
+def attach_clip(screenshot_id: str, clip_url: str) -> dict:
+    """
+    Attach evidence clip URL to a screenshot record
+    
+    Args:
+        screenshot_id: UUID of the screenshot record
+        clip_url: URL of the uploaded clip
+        
+    Returns:
+        dict: Updated screenshot record
+    """
+    try:
+        response = supabase.table('session_screenshots').update({
+            'clip_url': clip_url
+        }).eq('id', screenshot_id).execute()
+        
+        if response.data and len(response.data) > 0:
+            print(f"✅ Clip attached to screenshot: {screenshot_id}")
+            return response.data[0]
+        else:
+            raise Exception("Screenshot record not found")
+            
+    except Exception as e:
+        print(f"❌ Error attaching clip: {e}")
+        raise
+
+def update_preview_image(session_id: str, image_url: str, thumb_url: str = None) -> dict:
     """
     Update session preview image (if not already set)
     
     Args:
         session_id: UUID of the session
         image_url: URL of the image
+        thumb_url: URL of the thumbnail rendition, used by the history list (optional)
         
     Returns:
         dict: Updated session data
     """
     try:
+        preview = {'preview_image': image_url}
+        if thumb_url:
+            preview['preview_thumb'] = thumb_url
         # Only update if preview_image is null
-        response = supabase.table('sessions').update({
-            'preview_image': image_url
-        }).eq('id', session_id).is_('preview_image', 'null').execute()
+        response = supabase.table('sessions').update(preview).eq('id', session_id).is_('preview_image', 'null').execute()
         
         if response.data and len(response.data) > 0:
             print(f"✅ Preview image set for session: {session_id}")
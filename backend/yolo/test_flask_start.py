@@ -90,16 +90,13 @@ except Exception as e:
     traceback.print_exc()
 
 # Test 9: Check YOLOv5 model loading
-print("\n[TEST 9] Testing YOLOv5 model loading (may take time)...")
+print("\n[TEST 9] Testing YOLOv5 + MediaPipe loading (may take time)...")
 try:
-    print("   Loading model - please wait...")
-    model = torch.hub.load(
-        'ultralytics/yolov5',
-        'custom',
-        path='weights/best.pt',
-        force_reload=False
-    )
-    print(f"✅ YOLOv5 model loaded successfully")
+    print("   Loading models - please wait...")
+    from model_loader import load_models
+    boot = load_models()
+    print(f"✅ YOLOv5 model loaded successfully ({boot['config']['backend']})")
+    print(f"   Startup: {boot['timings']}")
 except Exception as e:
     print(f"❌ YOLOv5 model loading FAILED: {e}")
     traceback.print_exc()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Thread budget untuk detection services
+Pembagian core antara YOLO, MediaPipe Pose, OpenCV dan thread request Flask
+dari satu config, supaya tidak saling rebutan core (oversubscription).
+
+Konfigurasi lewat DETECTION_THREAD_BUDGET:
+    (tidak di-set)      default runtime, layout efektif tetap dilaporkan di /health
+    auto                dibagi otomatis dari core yang tersedia (auto_budget)
+    {...}               JSON inline
+    path/ke/file.json   JSON file
+
+Format JSON (cores: "0-3,6" atau list CPU id):
+    {
+        "yolo": {"cores": "0-5", "threads": 6, "interop_threads": 1, "concurrency": 1},
+        "pose": {"cores": "6"},
+        "http": {"cores": "7"},
+        "cv2_threads": 1
+    }
+
+Affinity di Linux berlaku per thread dan diwarisi thread yang dibuat setelahnya:
+- http: thread utama, thread request werkzeug mewarisi core ini
+- pose: thread boot yang membuat graph MediaPipe, worker thread graph mewarisinya
+- yolo: thread pemanggil di-pin selama model(...) berjalan, sehingga pool OpenMP
+  (per thread pemanggil) juga berjalan di core YOLO. concurrency membatasi
+  jumlah inference YOLO paralel.
+
+Sweep (cari pembagian terbaik untuk host ini):
+    python thread_budget.py --sweep --image sample.jpg --clients 4 --out thread_budget.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import itertools
+import subprocess
+from contextlib import contextmanager
+
+ROLES = ('yolo', 'pose', 'http')
+
+
+def parse_cores(spec):
+    """'0-3,6' / [0, 1] / 3 -> sorted list CPU id"""
+    if spec is None:
+        return []
+    if isinstance(spec, int):
+        return [spec]
+    if isinstance(spec, str):
+        cores = []
+        for part in filter(None, (p.strip() for p in spec.split(','))):
+            lo, _, hi = part.partition('-')
+            cores.extend(range(int(lo), int(hi or lo) + 1))
+        spec = cores
+    return sorted(set(int(c) for c in spec))
+
+
+def format_cores(cores):
+    """[0, 1, 2, 5] -> '0-2,5'"""
+    parts = []
+    for _, group in itertools.groupby(enumerate(cores), lambda x: x[1] - x[0]):
+        group = [c for _, c in group]
+        parts.append(f"{group[0]}-{group[-1]}" if len(group) > 1 else str(group[0]))
+    return ','.join(parts)
+
+
+def available_cores():
+    return sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+
+
+def auto_budget(cores=None, pose_cores=None, http_cores=None, concurrency=1):
+    """
+    Pembagian default: 1-2 core untuk request handling, 1-2 untuk MediaPipe, sisanya YOLO
+    Host <= 2 core tidak di-pin (hanya jumlah thread yang dibatasi).
+    """
+    cores = cores or available_cores()
+    n = len(cores)
+    if n <= 2:
+        return {'yolo': {'threads': n, 'interop_threads': 1, 'concurrency': concurrency}, 'cv2_threads': 1}
+
+    big = n >= 8
+    http_n = http_cores or (2 if big else 1)
+    pose_n = pose_cores or (2 if big else 1)
+    if http_n + pose_n >= n:
+        raise ValueError(f"Tidak ada core tersisa untuk YOLO ({n} core, http={http_n}, pose={pose_n})")
+
+    yolo = cores[:n - http_n - pose_n]
+    pose = cores[len(yolo):len(yolo) + pose_n]
+    http = cores[len(yolo) + pose_n:]
+    return {
+        'yolo': {'cores': format_cores(yolo), 'threads': len(yolo), 'interop_threads': 1, 'concurrency': concurrency},
+        'pose': {'cores': format_cores(pose)},
+        'http': {'cores': format_cores(http)},
+        'cv2_threads': 1,
+    }
+
+
+class ThreadBudget:
+    def __init__(self, spec, auto=False):
+        self.auto = auto  # dibuat dari auto_budget(): dihitung ulang saat rebase()
+        self._configure(spec)
+
+    def _configure(self, spec):
+        self.spec = spec
+        allowed = set(available_cores())
+        self.cores = {}
+        for role in ROLES:
+            cores = parse_cores(spec.get(role, {}).get('cores'))
+            missing = set(cores) - allowed
+            if missing:
+                raise ValueError(f"Thread budget '{role}': core {sorted(missing)} tidak tersedia (allowed: {format_cores(sorted(allowed))})")
+            self.cores[role] = cores
+
+        yolo = spec.get('yolo', {})
+        self.yolo_threads = int(yolo.get('threads') or len(self.cores['yolo']) or 0)
+        self.yolo_interop = int(yolo.get('interop_threads') or 0)
+        self.cv2_threads = spec.get('cv2_threads')
+        concurrency = int(yolo.get('concurrency') or 0)
+        self._yolo_slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.concurrency = concurrency
+
+    @classmethod
+    def from_env(cls):
+        """ThreadBudget dari DETECTION_THREAD_BUDGET, None kalau tidak di-set"""
+        value = os.getenv('DETECTION_THREAD_BUDGET', '').strip()
+        if not value:
+            return None
+        if value.lower() == 'auto':
+            return cls(auto_budget(), auto=True)
+        if value.startswith('{'):
+            return cls(json.loads(value))
+        with open(value) as f:
+            return cls(json.load(f))
+
+    def apply(self, torch_runtime=True):
+        """Set thread pool torch/OpenCV dan pin thread pemanggil (thread utama) ke core http"""
+        if self.cv2_threads is not None:
+            import cv2
+            cv2.setNumThreads(int(self.cv2_threads))
+
+        if torch_runtime:  # runtime slim tidak import torch
+            import torch
+            if self.yolo_threads:
+                torch.set_num_threads(self.yolo_threads)
+            if self.yolo_interop:
+                try:
+                    torch.set_num_interop_threads(self.yolo_interop)
+                except RuntimeError:
+                    pass  # sudah di-set sebelumnya (hanya bisa sekali per proses)
+
+        self.pin('http')
+        return self
+
+    def rebase(self, cores):
+        """
+        Batasi budget ke core set worker prefork (dipanggil di worker setelah affinity di-set)
+
+        Budget auto dihitung ulang dari core worker. Budget eksplisit diiris dengan core
+        worker; role yang irisannya kosong tidak di-pin (memakai semua core worker).
+        Role dari budget ini tidak pernah keluar dari core set worker.
+        """
+        cores = sorted(cores)
+        if self.auto:
+            spec = auto_budget(cores, concurrency=self.concurrency or 1)
+        else:
+            spec = json.loads(json.dumps(self.spec))
+            for role in ROLES:
+                section = spec.get(role)
+                if not section or 'cores' not in section:
+                    continue
+                kept = [c for c in parse_cores(section['cores']) if c in cores]
+                if kept:
+                    section['cores'] = format_cores(kept)
+                else:
+                    del section['cores']
+            yolo = spec.get('yolo', {})
+            if yolo.get('threads'):
+                yolo['threads'] = min(int(yolo['threads']), len(parse_cores(yolo.get('cores'))) or len(cores))
+        self._configure(spec)
+        return self
+
+    def backend_overrides(self):
+        """Override untuk inference_backend config (juga dipakai session ONNX Runtime/OpenVINO)"""
+        overrides = {}
+        if self.yolo_threads:
+            overrides['intra_op_threads'] = self.yolo_threads
+        if self.yolo_interop:
+            overrides['inter_op_threads'] = self.yolo_interop
+        return overrides
+
+    def pin(self, role):
+        """Pin thread yang sedang berjalan ke core role (no-op kalau role tanpa core)"""
+        cores = self.cores.get(role)
+        if cores and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(threading.get_native_id(), cores)
+
+    @contextmanager
+    def pinned(self, role):
+        """Pin sementara, kembalikan affinity thread sebelumnya setelah selesai"""
+        if not self.cores.get(role) or not hasattr(os, 'sched_setaffinity'):
+            yield
+            return
+        tid = threading.get_native_id()
+        previous = os.sched_getaffinity(tid)
+        os.sched_setaffinity(tid, self.cores[role])
+        try:
+            yield
+        finally:
+            os.sched_setaffinity(tid, previous)
+
+    def wrap_model(self, model):
+        if not self.cores['yolo'] and not self._yolo_slots:
+            return model
+        return PinnedModel(model, self)
+
+    def layout(self):
+        return {
+            'config': self.spec,
+            'yolo': {'cores': self.cores['yolo'], 'threads': self.yolo_threads,
+                     'interop_threads': self.yolo_interop, 'concurrency': self.concurrency},
+            'pose': {'cores': self.cores['pose']},
+            'http': {'cores': self.cores['http']},
+        }
+
+
+class PinnedModel:
+    """model(...) dijalankan di core YOLO, maksimal `concurrency` panggilan paralel"""
+
+    def __init__(self, model, budget):
+        object.__setattr__(self, 'model', model)
+        object.__setattr__(self, 'budget', budget)
+
+    def __call__(self, *args, **kwargs):
+        slots = self.budget._yolo_slots
+        if slots:
+            slots.acquire()
+        try:
+            with self.budget.pinned('yolo'):
+                return self.model(*args, **kwargs)
+        finally:
+            if slots:
+                slots.release()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.model, name, value)
+
+
+def thread_layout(budget=None):
+    """Layout thread efektif proses ini (untuk /health)"""
+    layout = {
+        'cpu_count': os.cpu_count(),
+        'process_cores': available_cores(),
+        'budget': budget.layout() if budget else None,
+    }
+    if 'torch' in sys.modules:
+        torch = sys.modules['torch']
+        layout['torch_threads'] = torch.get_num_threads()
+        layout['torch_interop_threads'] = torch.get_num_interop_threads()
+    if 'cv2' in sys.modules:
+        layout['cv2_threads'] = sys.modules['cv2'].getNumThreads()
+    return layout
+
+
+# =========================
+# Sweep
+# =========================
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def bench(spec, image=None, clients=4, iters=30, shape=(720, 1280, 3)):
+    """Jalankan workload seperti /detect (cvtColor + YOLO + pose) dengan `clients` request thread paralel"""
+    import cv2
+    import numpy as np
+
+    if spec is not None:
+        os.environ['DETECTION_THREAD_BUDGET'] = json.dumps(spec)
+    from model_loader import load_models
+
+    frame = cv2.imread(image) if image else np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    if frame is None:
+        raise ValueError(f"Gagal membaca image {image}")
+    boot = load_models(warmup_shape=frame.shape)
+    model, pose = boot['model'], boot['pose']
+    pose_lock = threading.Lock()  # graph MediaPipe tidak thread-safe
+    latencies = []
+
+    def client():
+        for _ in range(iters):
+            t = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            model(rgb)
+            with pose_lock:
+                pose.process(rgb)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    return {
+        'spec': spec,
+        'fps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(_percentile(latencies, 50), 1),
+        'p95_ms': round(_percentile(latencies, 95), 1),
+        'p99_ms': round(_percentile(latencies, 99), 1),
+    }
+
+
+def candidates(cores=None):
+    """Default runtime + variasi pembagian http/pose/yolo dan concurrency YOLO"""
+    cores = cores or available_cores()
+    specs, seen = [None], set()
+    for http_n, pose_n, concurrency in itertools.product((1, 2), (1, 2), (1, 2)):
+        try:
+            spec = auto_budget(cores, pose_cores=pose_n, http_cores=http_n, concurrency=concurrency)
+        except ValueError:
+            continue
+        key = json.dumps(spec, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            specs.append(spec)
+    return specs
+
+
+def sweep(image=None, clients=4, iters=30, objective='p95_ms'):
+    """Benchmark tiap kandidat di proses terpisah (interop threads dan pool OpenMP/MediaPipe tidak bisa diubah setelah dibuat)"""
+    results = []
+    for spec in candidates():
+        cmd = [sys.executable, os.path.abspath(__file__), '--bench', json.dumps(spec),
+               '--clients', str(clients), '--iters', str(iters)]
+        if image:
+            cmd += ['--image', image]
+        env = {k: v for k, v in os.environ.items() if k != 'DETECTION_THREAD_BUDGET'}
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            print(f"⚠️ Gagal: {spec}\n{proc.stderr.strip()[-500:]}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        label = 'default' if spec is None else json.dumps({k: v.get('cores', v) if isinstance(v, dict) else v for k, v in spec.items()})
+        print(f"  {result['fps']:7.2f} fps  p50={result['p50_ms']:7.1f}  p95={result['p95_ms']:7.1f}  p99={result['p99_ms']:7.1f}  {label}")
+
+    if not results:
+        raise RuntimeError("Semua kandidat gagal")
+    key = (lambda r: -r['fps']) if objective == 'fps' else (lambda r: r[objective])
+    return sorted(results, key=key)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Thread budget untuk detection services')
+    parser.add_argument('--sweep', action='store_true', help='cari pembagian core terbaik untuk host ini')
+    parser.add_argument('--bench', default=None, help=argparse.SUPPRESS)  # satu kandidat (dipakai sweep)
+    parser.add_argument('--image', default=None, help='frame untuk benchmark (default: noise 720p)')
+    parser.add_argument('--clients', type=int, default=4, help='request thread paralel')
+    parser.add_argument('--iters', type=int, default=30, help='request per client')
+    parser.add_argument('--objective', default='p95_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'fps'])
+    parser.add_argument('--out', default=None, help='tulis config terbaik ke file JSON')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.bench is not None:
+        spec = json.loads(args.bench)
+        print(json.dumps(bench(spec, args.image, args.clients, args.iters)))
+    elif args.sweep:
+        print(f"🔍 Sweep thread budget ({len(available_cores())} core, {args.clients} clients x {args.iters} iters)")
+        best = sweep(args.image, args.clients, args.iters, args.objective)[0]
+        print(f"✅ Terbaik ({args.objective}): {json.dumps(best['spec'])}")
+        if args.out and best['spec'] is not None:
+            with open(args.out, 'w') as f:
+                json.dump(best['spec'], f, indent=2)
+            print(f"💾 Disimpan ke {args.out}, pakai dengan DETECTION_THREAD_BUDGET={args.out}")
+    else:
+        budget = ThreadBudget.from_env() or ThreadBudget(auto_budget())
+        print(json.dumps(budget.layout(), indent=2))
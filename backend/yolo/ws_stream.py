@@ -0,0 +1,159 @@
+"""
+WebSocket frame streaming untuk client kontinu (flask-sock)
+
+Satu koneksi persisten menggantikan satu HTTP POST base64 per frame.
+
+Client -> server:
+    binary: [uint32 big-endian seq][bytes JPEG/PNG/WebP]
+    text:   {"seq": 12, "image": "<base64>"}   (fallback untuk client tanpa binary)
+
+Server -> client (text JSON ringkas, satu per frame yang diproses):
+    {"seq": 12, ..., "ms": 41.2, "drop": 3}
+    {"seq": 12, "error": "..."}
+    {"seq": 12, "error": "overloaded", "retry_ms": 120}   (admission control menolak frame)
+
+Latest frame wins: kalau client mengirim lebih cepat dari inference, frame yang
+belum diproses ditimpa frame terbaru (jumlahnya dilaporkan di "drop"), jadi
+latency tidak menumpuk. Setiap hasil membawa seq frame yang diproses.
+"""
+
+import json
+import time
+import struct
+import base64
+import threading
+
+from admission import Rejected
+from frame_context import FrameContext
+from image_decode import decode_image
+
+SEQ_HEADER = struct.Struct('>I')
+
+
+class LatestSlot:
+    """Slot satu item: put() menimpa item yang belum diambil (latest wins)"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def take(self, timeout=None):
+        """Ambil item terbaru (blocking), None kalau slot ditutup atau timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def parse_message(message):
+    """
+    Pesan WebSocket -> (seq, image bytes)
+
+    Raises:
+        ValueError: frame / JSON tidak valid atau bentuknya salah (bukan object, image bukan string)
+    """
+    if isinstance(message, (bytes, bytearray)):
+        if len(message) <= SEQ_HEADER.size:
+            raise ValueError("Frame biner terlalu pendek")
+        seq, = SEQ_HEADER.unpack_from(message)
+        return seq, memoryview(message)[SEQ_HEADER.size:]
+
+    data = json.loads(message)
+    if not isinstance(data, dict):
+        raise ValueError("Pesan JSON harus object")
+    image = data.get('image')
+    if not isinstance(image, str):
+        raise ValueError("Field 'image' harus string base64")
+    seq = data.get('seq', 0)
+    if isinstance(seq, bool) or not isinstance(seq, (int, float, str)):
+        raise ValueError("Field 'seq' harus angka")
+    if ',' in image:
+        image = image.split(',')[1]
+    return int(seq), base64.b64decode(image)
+
+
+def _send(ws, lock, payload):
+    with lock:  # worker (hasil) dan handler (error parse) sama-sama mengirim
+        ws.send(json.dumps(payload, separators=(',', ':')))
+
+
+def _analyze(data, seq, received, analyze):
+    frame, scale = decode_image(data)
+    return analyze(FrameContext(frame, seq, received, scale=scale))
+
+
+def _inference_loop(ws, lock, slot, analyze, admission=None):
+    """Proses frame terbaru dari slot sampai koneksi ditutup"""
+    session = f"ws:{id(ws)}"
+    while True:
+        item = slot.take()
+        if item is None:
+            return
+        seq, data, received = item
+        try:
+            if admission is None:
+                result = _analyze(data, seq, received, analyze)
+            else:
+                with admission.admit(session):
+                    result = _analyze(data, seq, received, analyze)
+            result['seq'] = seq
+            result['ms'] = round((time.time() - received) * 1000, 1)
+            result['drop'] = slot.dropped
+        except Rejected as e:  # server penuh: frame dibuang, client boleh kirim frame berikutnya
+            slot.dropped += 1
+            result = {'seq': seq, 'error': e.reason, 'retry_ms': round(e.retry_after * 1000)}
+        except Exception as e:
+            result = {'seq': seq, 'error': str(e)}
+        try:
+            _send(ws, lock, result)
+        except Exception:  # koneksi sudah ditutup client
+            slot.close()
+            return
+
+
+def register_ws_detect(sock, path, analyze, admission=None):
+    """
+    Daftarkan endpoint WebSocket di `path`
+
+    Args:
+        sock: flask_sock.Sock
+        analyze: fn(FrameContext) -> dict hasil (seq/ms/drop ditambahkan di sini)
+        admission: AdmissionController opsional, dibagi dengan endpoint HTTP
+    """
+    @sock.route(path)
+    def ws_detect(ws):
+        slot, lock = LatestSlot(), threading.Lock()
+        worker = threading.Thread(target=_inference_loop, args=(ws, lock, slot, analyze, admission), daemon=True)
+        worker.start()
+        try:
+            while ws.connected:
+                message = ws.receive(timeout=1)
+                if message is None:
+                    if not worker.is_alive():
+                        break
+                    continue
+                try:
+                    seq, data = parse_message(message)
+                except (ValueError, TypeError, OverflowError) as e:  # mis. seq Infinity
+                    _send(ws, lock, {'seq': None, 'error': f"Pesan tidak valid: {e}"})
+                    continue
+                slot.put((seq, data, time.time()))
+        finally:
+            slot.close()
+            worker.join(timeout=5)
+
+    return ws_detect
@@ -23,13 +23,27 @@ Requirements:
 
 Usage:
     $ python benchmarks.py --weights yolov5s.pt --img 640
+    $ python benchmarks.py --weights ../weights/best.pt --data data/face.yaml --img 640  # face model mAP + speed
+
+Latency mode (CPU serving configuration, no dataset needed):
+    $ python benchmarks.py --latency --weights ../weights/best.pt --include - torchscript onnx openvino \
+        --sweep-imgsz 320 480 640 --sweep-batch 1 2 4 --sweep-threads 1 2 4 --json bench.json --csv bench.csv
+
+    Each (format, thread count) runs in a fresh process, so model load time and peak RSS are per format. For every
+    (input size, batch size) it reports cold latency (first call), warm p50/p95/p99/mean over --iters calls and
+    throughput at saturation (--concurrency callers for --saturation seconds).
 """
 
 import argparse
+import json
+import multiprocessing
+import os
 import platform
 import sys
+import threading
 import time
 from pathlib import Path
+from queue import Empty
 
 import pandas as pd
 
@@ -48,12 +62,16 @@ from utils.general import LOGGER, check_yaml, file_size, print_args
 from utils.torch_utils import select_device
 from val import run as val_det
 
+FACE_WEIGHTS = ROOT.parent / "weights" / "best.pt"  # backend/yolo/weights/best.pt
+DEFAULT_WEIGHTS = FACE_WEIGHTS if FACE_WEIGHTS.exists() else ROOT / "yolov5s.pt"
+DEFAULT_DATA = ROOT / "data/face.yaml" if FACE_WEIGHTS.exists() else ROOT / "data/coco128.yaml"
+
 
 def run(
-    weights=ROOT / "yolov5s.pt",  # weights path
+    weights=DEFAULT_WEIGHTS,  # weights path
     imgsz=640,  # inference size (pixels)
     batch_size=1,  # batch size
-    data=ROOT / "data/coco128.yaml",  # dataset.yaml path
+    data=DEFAULT_DATA,  # dataset.yaml path
     device="",  # cuda device, i.e. 0 or 0,1,2,3 or cpu
     half=False,  # use FP16 half-precision inference
     test=False,  # test exports only
@@ -148,10 +166,10 @@ def run(
 
 
 def test(
-    weights=ROOT / "yolov5s.pt",  # weights path
+    weights=DEFAULT_WEIGHTS,  # weights path
     imgsz=640,  # inference size (pixels)
     batch_size=1,  # batch size
-    data=ROOT / "data/coco128.yaml",  # dataset.yaml path
+    data=DEFAULT_DATA,  # dataset.yaml path
     device="",  # cuda device, i.e. 0 or 0,1,2,3 or cpu
     half=False,  # use FP16 half-precision inference
     test=False,  # test exports only
@@ -216,6 +234,232 @@ def test(
     return py
 
 
+def peak_rss_mb():
+    """Returns the peak resident set size of the current process in MB (ru_maxrss, or psutil peak_wset on Windows)."""
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / (1 << 20 if platform.system() == "Darwin" else 1 << 10), 1)  # bytes on macOS, KB on Linux
+    except ImportError:
+        import psutil
+
+        mem = psutil.Process().memory_info()
+        return round(getattr(mem, "peak_wset", mem.rss) / (1 << 20), 1)
+
+
+def _percentiles(times):
+    """Returns p50/p95/p99/mean (ms) of a list of latencies in seconds."""
+    t = sorted(times)
+    pick = lambda q: t[min(len(t) - 1, int(round(q / 100 * (len(t) - 1))))] * 1e3  # noqa: E731
+    return {"p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99), "mean_ms": sum(t) / len(t) * 1e3}
+
+
+def _saturate(model, im, seconds, concurrency, sync):
+    """Calls `model(im)` from `concurrency` threads for `seconds` and returns images/s."""
+    stop, calls, lock = time.perf_counter() + seconds, [0], threading.Lock()
+
+    def worker():
+        n = 0
+        while time.perf_counter() < stop:
+            model(im)
+            sync()
+            n += 1
+        with lock:
+            calls[0] += n
+
+    t = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for x in threads:
+        x.start()
+    for x in threads:
+        x.join()
+    return calls[0] * im.shape[0] / (time.perf_counter() - t)
+
+
+def _latency_worker(name, w, device, half, threads, imgsz, batch_sizes, warmup, iters, saturation, concurrency, queue):
+    """Loads one exported model in a fresh process and measures every (input size, batch size) configuration.
+
+    Puts a list of result rows on `queue`. Runs in a spawned process so load time, peak RSS and thread pools are
+    isolated per (format, thread count).
+    """
+    import psutil
+    import torch
+
+    from models.common import DetectMultiBackend
+
+    rows = []
+    try:
+        if threads:
+            torch.set_num_threads(threads)
+        device = select_device(device)
+        sync = torch.cuda.synchronize if device.type == "cuda" else (lambda: None)
+        rss_before = round(psutil.Process().memory_info().rss / (1 << 20), 1)
+        t = time.perf_counter()
+        options = {"intra_op_threads": threads} if threads else None
+        model = DetectMultiBackend(w, device=device, fp16=half, options=options)
+        load_ms = (time.perf_counter() - t) * 1e3
+        base = {"format": name, "weights": str(w), "threads": threads or torch.get_num_threads(), "load_ms": load_ms,
+                "rss_before_load_mb": rss_before}
+
+        for size in imgsz:
+            for bs in batch_sizes:
+                row = {**base, "imgsz": size, "batch": bs}
+                try:
+                    im = torch.rand(bs, 3, size, size, device=device)
+                    im = im.half() if model.fp16 else im.float()
+                    t = time.perf_counter()
+                    model(im)  # cold: first call at this shape (graph build, allocator, kernel selection)
+                    sync()
+                    row["cold_ms"] = (time.perf_counter() - t) * 1e3
+                    for _ in range(warmup):
+                        model(im)
+                    sync()
+                    times = []
+                    for _ in range(iters):
+                        t = time.perf_counter()
+                        model(im)
+                        sync()
+                        times.append(time.perf_counter() - t)
+                    row.update(_percentiles(times))
+                    row["ms_per_image"] = row["mean_ms"] / bs
+                    if saturation:
+                        row["saturation_ips"] = _saturate(model, im, saturation, concurrency, sync)
+                except Exception as e:  # e.g. static-shape exports at other sizes
+                    row["error"] = str(e).splitlines()[0][:200]
+                rows.append(row)
+        peak = peak_rss_mb()
+        for row in rows:
+            row["peak_rss_mb"] = peak
+    except Exception as e:
+        rows.append({"format": name, "weights": str(w), "threads": threads, "error": str(e).splitlines()[0][:200]})
+    queue.put(rows)
+
+
+def run_latency(
+    weights=DEFAULT_WEIGHTS,  # weights path
+    include=("-", "torchscript", "onnx", "openvino"),  # export formats to measure ('-' = PyTorch)
+    sweep_imgsz=(640,),  # input sizes (pixels)
+    sweep_batch=(1,),  # batch sizes
+    sweep_threads=(0,),  # intra-op threads, 0 = runtime default
+    device="cpu",  # cuda device, i.e. 0 or 0,1,2,3 or cpu
+    half=False,  # use FP16 half-precision inference
+    warmup=10,  # warm-up calls before timing
+    iters=100,  # timed calls per configuration
+    saturation=5.0,  # seconds of saturated load per configuration, 0 = skip
+    concurrency=2,  # concurrent callers during saturation
+    json_path=None,  # write rows as JSON
+    csv_path=None,  # write rows as CSV
+    hard_fail=False,  # throw error on benchmark failure
+):
+    """Measure latency distributions, memory and load time per export format over input size, batch and thread sweeps.
+
+    Args:
+        weights (Path | str): PyTorch weights to export and measure. Default is the face model if present.
+        include (tuple[str]): `export.py --include` formats, '-' for the PyTorch weights themselves.
+        sweep_imgsz (tuple[int]): Square input sizes to measure.
+        sweep_batch (tuple[int]): Batch sizes to measure.
+        sweep_threads (tuple[int]): Intra-op thread counts (torch, ONNX Runtime, OpenVINO), 0 for the runtime default.
+        device (str): Inference device. Default is 'cpu'.
+        half (bool): FP16 inference (GPU only).
+        warmup (int): Untimed calls after the cold call.
+        iters (int): Timed calls used for the p50/p95/p99/mean latency.
+        saturation (float): Seconds of back-to-back calls from `concurrency` threads for throughput, 0 to skip.
+        concurrency (int): Concurrent callers while measuring throughput at saturation.
+        json_path (str | None): Output JSON path.
+        csv_path (str | None): Output CSV path.
+        hard_fail (bool): Raise on the first failing format instead of recording the error.
+
+    Returns:
+        pd.DataFrame: One row per (format, threads, imgsz, batch) with load_ms, peak_rss_mb, cold_ms, p50_ms, p95_ms,
+            p99_ms, mean_ms, ms_per_image, saturation_ips and error.
+
+    Examples:
+        ```python
+        $ python benchmarks.py --latency --weights ../weights/best.pt --sweep-threads 1 2 4 --json bench.json
+        ```
+
+    Notes:
+        Exports use dynamic axes when more than one input or batch size is swept; formats that only support static
+        shapes record an error for the other configurations.
+    """
+    t = time.time()
+    dynamic = len(sweep_imgsz) > 1 or len(sweep_batch) > 1
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for _, (name, f, suffix, cpu, gpu) in export.export_formats().iterrows():
+        if f not in include:
+            continue
+        try:
+            if f == "-":
+                w = weights
+            else:
+                w = export.run(
+                    weights=weights,
+                    imgsz=[max(sweep_imgsz)],
+                    include=[f],
+                    batch_size=max(sweep_batch),
+                    device=device,
+                    half=half,
+                    dynamic=dynamic and f in ("onnx", "openvino", "engine"),
+                )[-1]
+            assert suffix in str(w), "export failed"
+        except Exception as e:
+            if hard_fail:
+                raise
+            LOGGER.warning(f"WARNING ⚠️ Export failure for {name}: {e}")
+            rows.append({"format": name, "error": f"export: {e}"})
+            continue
+
+        for threads in sweep_threads:
+            queue = ctx.Queue()
+            args = (name, w, device, half, threads, sweep_imgsz, sweep_batch, warmup, iters, saturation, concurrency)
+            p = ctx.Process(target=_latency_worker, args=(*args, queue))
+            p.start()
+            while True:  # get() before join(), large results would otherwise block the child
+                try:
+                    result = queue.get(timeout=1)
+                    break
+                except Empty:
+                    if not p.is_alive():  # crashed (e.g. out of memory) without putting a result
+                        result = [{"format": name, "threads": threads, "error": f"worker exit code {p.exitcode}"}]
+                        break
+            p.join()
+            if hard_fail and any("error" in r for r in result):
+                raise RuntimeError(f"Benchmark --hard-fail for {name}: {result[0]['error']}")
+            rows.extend(result)
+            for r in result:
+                LOGGER.info(
+                    f"{name} threads={r.get('threads')} imgsz={r.get('imgsz')} batch={r.get('batch')}: "
+                    + (r["error"] if "error" in r else f"p50 {r['p50_ms']:.1f}ms p99 {r['p99_ms']:.1f}ms")
+                )
+
+    columns = ["format", "threads", "imgsz", "batch", "load_ms", "peak_rss_mb", "cold_ms", "p50_ms", "p95_ms",
+               "p99_ms", "mean_ms", "ms_per_image", "saturation_ips", "rss_before_load_mb", "weights", "error"]
+    py = pd.DataFrame(rows).reindex(columns=columns).round(2)
+    LOGGER.info(f"\nLatency benchmarks complete ({time.time() - t:.2f}s)")
+    LOGGER.info(str(py.drop(columns=["weights", "rss_before_load_mb"])))
+
+    meta = {
+        "weights": str(weights),
+        "device": device,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "warmup": warmup,
+        "iters": iters,
+        "saturation_s": saturation,
+        "concurrency": concurrency,
+    }
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"meta": meta, "results": json.loads(py.to_json(orient="records"))}, f, indent=2)
+        LOGGER.info(f"Results saved to {json_path}")
+    if csv_path:
+        py.to_csv(csv_path, index=False)
+        LOGGER.info(f"Results saved to {csv_path}")
+    return py
+
+
 def parse_opt():
     """Parses command-line arguments for YOLOv5 model inference configuration.
 
@@ -239,17 +483,29 @@ def parse_opt():
         The parsed arguments are printed for reference using 'print_args()'.
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument("--weights", type=str, default=ROOT / "yolov5s.pt", help="weights path")
+    parser.add_argument("--weights", type=str, default=DEFAULT_WEIGHTS, help="weights path")
     parser.add_argument("--imgsz", "--img", "--img-size", type=int, default=640, help="inference size (pixels)")
     parser.add_argument("--batch-size", type=int, default=1, help="batch size")
-    parser.add_argument("--data", type=str, default=ROOT / "data/coco128.yaml", help="dataset.yaml path")
+    parser.add_argument("--data", type=str, default=DEFAULT_DATA, help="dataset.yaml path")
     parser.add_argument("--device", default="", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
     parser.add_argument("--half", action="store_true", help="use FP16 half-precision inference")
     parser.add_argument("--test", action="store_true", help="test exports only")
     parser.add_argument("--pt-only", action="store_true", help="test PyTorch only")
     parser.add_argument("--hard-fail", nargs="?", const=True, default=False, help="Exception on error or < min metric")
+    parser.add_argument("--latency", action="store_true", help="latency/memory/throughput sweeps instead of mAP")
+    parser.add_argument("--include", nargs="+", default=["-", "torchscript", "onnx", "openvino"], help="--latency formats")
+    parser.add_argument("--sweep-imgsz", nargs="+", type=int, default=None, help="--latency input sizes (default --img)")
+    parser.add_argument("--sweep-batch", nargs="+", type=int, default=None, help="--latency batch sizes (default --batch)")
+    parser.add_argument("--sweep-threads", nargs="+", type=int, default=[0], help="--latency threads, 0 = default")
+    parser.add_argument("--warmup", type=int, default=10, help="--latency warm-up calls")
+    parser.add_argument("--iters", type=int, default=100, help="--latency timed calls per configuration")
+    parser.add_argument("--saturation", type=float, default=5.0, help="--latency saturation seconds, 0 = skip")
+    parser.add_argument("--concurrency", type=int, default=2, help="--latency callers at saturation")
+    parser.add_argument("--json", type=str, default=None, help="--latency JSON output path")
+    parser.add_argument("--csv", type=str, default=None, help="--latency CSV output path")
     opt = parser.parse_args()
-    opt.data = check_yaml(opt.data)  # check YAML
+    if not opt.latency:
+        opt.data = check_yaml(opt.data)  # check YAML
     print_args(vars(opt))
     return opt
 
@@ -282,7 +538,25 @@ def main(opt):
         $ python benchmarks.py --weights yolov5s.pt --img 640
         ```
     """
-    test(**vars(opt)) if opt.test else run(**vars(opt))
+    if opt.latency:
+        return run_latency(
+            weights=opt.weights,
+            include=tuple(opt.include),
+            sweep_imgsz=tuple(opt.sweep_imgsz or [opt.imgsz]),
+            sweep_batch=tuple(opt.sweep_batch or [opt.batch_size]),
+            sweep_threads=tuple(opt.sweep_threads),
+            device=opt.device or "cpu",
+            half=opt.half,
+            warmup=opt.warmup,
+            iters=opt.iters,
+            saturation=opt.saturation,
+            concurrency=opt.concurrency,
+            json_path=opt.json,
+            csv_path=opt.csv,
+            hard_fail=bool(opt.hard_fail),
+        )
+    args = {k: v for k, v in vars(opt).items() if k in run.__code__.co_varnames[: run.__code__.co_argcount]}
+    test(**args) if opt.test else run(**args)
 
 
 if __name__ == "__main__":
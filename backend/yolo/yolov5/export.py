@@ -268,6 +268,8 @@ def export_torchscript(model, im, file, optimize, prefix=colorstr("TorchScript:"
 
     ts = torch.jit.trace(model, im, strict=False)
     d = {"shape": im.shape, "stride": int(max(model.stride)), "names": model.names}
+    if getattr(model.model[-1], "nk", 0):
+        d["nk"] = model.model[-1].nk  # keypoints per box (Detect landmark branch)
     extra_files = {"config.txt": json.dumps(d)}  # torch._C.ExtraFilesMap()
     if optimize:  # https://pytorch.org/tutorials/recipes/mobile_interpreter.html
         optimize_for_mobile(ts)._save_for_lite_interpreter(str(f), _extra_files=extra_files)
@@ -355,6 +357,8 @@ def export_onnx(model, im, file, opset, dynamic, simplify, prefix=colorstr("ONNX
 
     # Metadata
     d = {"stride": int(max(model.stride)), "names": model.names}
+    if getattr(model.model[-1], "nk", 0):
+        d["nk"] = model.model[-1].nk  # keypoints per box (Detect landmark branch)
     for k, v in d.items():
         meta = model_onnx.metadata_props.add()
         meta.key, meta.value = k, str(v)
@@ -1389,6 +1393,8 @@ def run(
         im, model = im.half(), model.half()  # to FP16
     shape = tuple((y[0] if isinstance(y, tuple) else y).shape)  # model output shape
     metadata = {"stride": int(max(model.stride)), "names": model.names}  # model metadata
+    if getattr(model.model[-1], "nk", 0):
+        metadata["nk"] = model.model[-1].nk  # keypoints per box, read back by DetectMultiBackend / SlimModel
     LOGGER.info(f"\n{colorstr('PyTorch:')} starting from {file} with output shape {shape} ({file_size(file):.1f} MB)")
 
     # Exports
@@ -50,6 +50,7 @@ from utils.general import (
     make_divisible,
     non_max_suppression,
     scale_boxes,
+    scale_keypoints,
     xywh2xyxy,
     xyxy2xywh,
     yaml_load,
@@ -454,8 +455,15 @@ class Concat(nn.Module):
 class DetectMultiBackend(nn.Module):
     """YOLOv5 MultiBackend class for inference on various backends including PyTorch, ONNX, TensorRT, and more."""
 
-    def __init__(self, weights="yolov5s.pt", device=torch.device("cpu"), dnn=False, data=None, fp16=False, fuse=True):
-        """Initializes DetectMultiBackend with support for various inference backends, including PyTorch and ONNX."""
+    def __init__(
+        self, weights="yolov5s.pt", device=torch.device("cpu"), dnn=False, data=None, fp16=False, fuse=True, options=None
+    ):
+        """Initializes DetectMultiBackend with support for various inference backends, including PyTorch and ONNX.
+
+        `options` is an optional dict of runtime tuning knobs, currently read by ONNX Runtime and OpenVINO:
+        intra_op_threads, inter_op_threads, graph_opt ('disable', 'basic', 'extended', 'all'), cache (optimized model
+        file for ONNX Runtime, cache directory for OpenVINO) and ov_device (OpenVINO device name, default 'AUTO').
+        """
         #   PyTorch:              weights = *.pt
         #   TorchScript:                    *.torchscript
         #   ONNX Runtime:                   *.onnx
@@ -471,11 +479,13 @@ class DetectMultiBackend(nn.Module):
         from models.experimental import attempt_download, attempt_load  # scoped to avoid circular import
 
         super().__init__()
+        options = options or {}
         w = str(weights[0] if isinstance(weights, list) else weights)
         pt, jit, onnx, xml, engine, coreml, saved_model, pb, tflite, edgetpu, tfjs, paddle, triton = self._model_type(w)
         fp16 &= pt or jit or onnx or engine or triton  # FP16
         nhwc = coreml or saved_model or pb or tflite or edgetpu  # BHWC formats (vs torch BCWH)
         stride = 32  # default stride
+        nk = 0  # keypoints per box (landmark models, from export metadata)
         cuda = torch.cuda.is_available() and device.type != "cpu"  # use CUDA
         if not (pt or triton):
             w = attempt_download(w)  # download if not local
@@ -497,6 +507,7 @@ class DetectMultiBackend(nn.Module):
                     object_hook=lambda d: {int(k) if k.isdigit() else k: v for k, v in d.items()},
                 )
                 stride, names = int(d["stride"]), d["names"]
+                nk = int(d.get("nk", 0))  # keypoints per box
         elif dnn:  # ONNX OpenCV DNN
             LOGGER.info(f"Loading {w} for ONNX OpenCV DNN inference...")
             check_requirements("opencv-python>=4.5.4")
@@ -507,11 +518,30 @@ class DetectMultiBackend(nn.Module):
             import onnxruntime
 
             providers = ["CUDAExecutionProvider", "CPUExecutionProvider"] if cuda else ["CPUExecutionProvider"]
-            session = onnxruntime.InferenceSession(w, providers=providers)
+            so = onnxruntime.SessionOptions()
+            if options.get("intra_op_threads"):
+                so.intra_op_num_threads = int(options["intra_op_threads"])
+            if options.get("inter_op_threads"):
+                so.inter_op_num_threads = int(options["inter_op_threads"])
+                so.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+            so.graph_optimization_level = {
+                "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+                "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+                "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+                "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+            }[options.get("graph_opt", "all")]
+            cache = options.get("cache")
+            fresh = cache and Path(cache).is_file() and Path(cache).stat().st_mtime >= Path(w).stat().st_mtime
+            if fresh:  # load previously optimized graph, skip re-optimization (stale cache is rebuilt)
+                w, so.graph_optimization_level = str(cache), onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            elif cache:  # optimize once and save for next startup
+                so.optimized_model_filepath = str(cache)
+            session = onnxruntime.InferenceSession(w, sess_options=so, providers=providers)
             output_names = [x.name for x in session.get_outputs()]
             meta = session.get_modelmeta().custom_metadata_map  # metadata
             if "stride" in meta:
                 stride, names = int(meta["stride"]), eval(meta["names"])
+            nk = int(meta.get("nk", 0))  # keypoints per box
         elif xml:  # OpenVINO
             LOGGER.info(f"Loading {w} for OpenVINO inference...")
             check_requirements("openvino>=2023.0")  # requires openvino-dev: https://pypi.org/project/openvino-dev/
@@ -526,8 +556,14 @@ class DetectMultiBackend(nn.Module):
             batch_dim = get_batch(ov_model)
             if batch_dim.is_static:
                 batch_size = batch_dim.get_length()
-            ov_compiled_model = core.compile_model(ov_model, device_name="AUTO")  # AUTO selects best available device
-            stride, names = self._load_metadata(Path(w).with_suffix(".yaml"))  # load metadata
+            if options.get("cache"):
+                core.set_property({"CACHE_DIR": str(options["cache"])})  # compiled blob cache
+            config = {"PERFORMANCE_HINT": "LATENCY"}
+            if options.get("intra_op_threads"):
+                config["INFERENCE_NUM_THREADS"] = int(options["intra_op_threads"])
+            ov_device = options.get("ov_device", "AUTO")  # AUTO selects best available device
+            ov_compiled_model = core.compile_model(ov_model, device_name=ov_device, config=config)
+            stride, names, nk = self._load_metadata(Path(w).with_suffix(".yaml"))  # load metadata
         elif engine:  # TensorRT
             LOGGER.info(f"Loading {w} for TensorRT inference...")
             import tensorrt as trt  # https://developer.nvidia.com/nvidia-tensorrt-download
@@ -800,11 +836,11 @@ class DetectMultiBackend(nn.Module):
 
     @staticmethod
     def _load_metadata(f=Path("path/to/meta.yaml")):
-        """Loads metadata from a YAML file, returning strides and names if the file exists, otherwise `None`."""
+        """Loads metadata from a YAML file, returning stride, names and keypoints per box (`None, None, 0` if missing)."""
         if f.exists():
             d = yaml_load(f)
-            return d["stride"], d["names"]  # assign stride, names
-        return None, None
+            return d["stride"], d["names"], int(d.get("nk", 0))  # assign stride, names, nk
+        return None, None, 0
 
 
 class AutoShape(nn.Module):
@@ -817,6 +853,7 @@ class AutoShape(nn.Module):
     classes = None  # (optional list) filter by class, i.e. = [0, 15, 16] for COCO persons, cats and dogs
     max_det = 1000  # maximum number of detections per image
     amp = False  # Automatic Mixed Precision (AMP) inference
+    nk = 0  # number of keypoints per box (Detect landmark branch)
 
     def __init__(self, model, verbose=True):
         """Initializes YOLOv5 model for inference, setting up attributes and preparing model for evaluation."""
@@ -831,6 +868,11 @@ class AutoShape(nn.Module):
             m = self.model.model.model[-1] if self.dmb else self.model.model[-1]  # Detect()
             m.inplace = False  # Detect.inplace=False for safe multithread inference
             m.export = True  # do not output loss values
+            self.nk = getattr(m, "nk", 0)  # keypoints
+        else:
+            self.nk = getattr(model, "nk", 0)  # keypoints from exported metadata
+        self._geometry = {}  # letterbox geometry per (input shape, size), see _preprocess_fast()
+        self._input_pool = {}  # free preallocated input tensors per (input shape, size, dtype, device)
 
     def _apply(self, fn):
         """Applies to(), cpu(), cuda(), half() etc.
@@ -846,11 +888,61 @@ class AutoShape(nn.Module):
                 m.anchor_grid = list(map(fn, m.anchor_grid))
         return self
 
+    def _letterbox_geometry(self, s, size):
+        """Returns cached (inference shape, resized wh, top, left) for input shape `s`, as letterbox(auto=False)."""
+        key = (s, size)
+        g = self._geometry.get(key)
+        if g is None:
+            gain = max(size) / max(s)
+            shape1 = [make_divisible(int(y * gain), self.stride) for y in s]  # inf shape
+            r = min(shape1[0] / s[0], shape1[1] / s[1])
+            new_unpad = round(s[1] * r), round(s[0] * r)  # wh
+            dw, dh = (shape1[1] - new_unpad[0]) / 2, (shape1[0] - new_unpad[1]) / 2
+            if len(self._geometry) >= 16:
+                self._geometry.clear()
+            g = self._geometry[key] = shape1, new_unpad, round(dh - 0.1), round(dw - 0.1)
+        return g
+
+    def _preprocess_fast(self, im, size, bgr, p):
+        """Letterboxes a single uint8 HWC image into a reused (1,3,h,w) tensor in one resize + one normalize pass.
+
+        Padded tensors are taken from a pool per (shape, size, dtype, device) and returned by forward() after
+        inference, so concurrent callers never share one; pad pixels are only written on allocation. The channel flip
+        (bgr=True) and /255 are folded into the per-channel copy into the tensor interior.
+        """
+        s = im.shape[:2]
+        shape1, new_unpad, top, left = self._letterbox_geometry(s, size)
+        key = (s, size, p.dtype, p.device)
+        try:
+            buf = self._input_pool[key].pop()
+        except (KeyError, IndexError):
+            x = torch.full((1, 3, *shape1), 114 / 255, dtype=p.dtype, device=p.device)
+            resized = None if s[::-1] == new_unpad else np.empty((new_unpad[1], new_unpad[0], 3), dtype=np.uint8)
+            buf = x, resized
+        x, resized = buf
+
+        if resized is not None:
+            im = cv2.resize(im, new_unpad, dst=resized, interpolation=cv2.INTER_LINEAR)
+        src = torch.from_numpy(im).to(p.device, non_blocking=True)  # HWC uint8
+        roi = x[0, :, top : top + new_unpad[1], left : left + new_unpad[0]]
+        for c, sc in enumerate((2, 1, 0) if bgr else (0, 1, 2)):
+            torch.div(src[..., sc], 255, out=roi[c])
+        return x, shape1, (key, buf)
+
+    def _release_input(self, pooled):
+        """Returns a preallocated input tensor from _preprocess_fast() to the pool."""
+        key, buf = pooled
+        if key not in self._input_pool and len(self._input_pool) >= 16:
+            self._input_pool.clear()
+        self._input_pool.setdefault(key, []).append(buf)
+
     @smart_inference_mode()
-    def forward(self, ims, size=640, augment=False, profile=False):
+    def forward(self, ims, size=640, augment=False, profile=False, bgr=False):
         """Performs inference on inputs with optional augment & profiling.
 
-        Supports various formats including file, URI, OpenCV, PIL, numpy, torch.
+        Supports various formats including file, URI, OpenCV, PIL, numpy, torch. Set `bgr=True` for OpenCV BGR arrays
+        instead of converting them beforehand. A single uint8 HWC numpy image takes a fast path with cached letterbox
+        geometry and a preallocated input tensor.
         """
         # For size(height=640, width=1280), RGB images example inputs are:
         #   file:        ims = 'data/images/zidane.jpg'  # str or PosixPath
@@ -872,33 +964,27 @@ class AutoShape(nn.Module):
                     return self.model(ims.to(p.device).type_as(p), augment=augment)  # inference
 
             # Pre-process
-            n, ims = (len(ims), list(ims)) if isinstance(ims, (list, tuple)) else (1, [ims])  # number, list of images
-            shape0, shape1, files = [], [], []  # image and inference shapes, filenames
-            for i, im in enumerate(ims):
-                f = f"image{i}"  # filename
-                if isinstance(im, (str, Path)):  # filename or uri
-                    im, f = Image.open(requests.get(im, stream=True).raw if str(im).startswith("http") else im), im
-                    im = np.asarray(exif_transpose(im))
-                elif isinstance(im, Image.Image):  # PIL Image
-                    im, f = np.asarray(exif_transpose(im)), getattr(im, "filename", f) or f
-                files.append(Path(f).with_suffix(".jpg").name)
-                if im.shape[0] < 5:  # image in CHW
-                    im = im.transpose((1, 2, 0))  # reverse dataloader .transpose(2, 0, 1)
-                im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)  # enforce 3ch input
-                s = im.shape[:2]  # HWC
-                shape0.append(s)  # image shape
-                g = max(size) / max(s)  # gain
-                shape1.append([int(y * g) for y in s])
-                ims[i] = im if im.data.contiguous else np.ascontiguousarray(im)  # update
-            shape1 = [make_divisible(x, self.stride) for x in np.array(shape1).max(0)]  # inf shape
-            x = [letterbox(im, shape1, auto=False)[0] for im in ims]  # pad
-            x = np.ascontiguousarray(np.array(x).transpose((0, 3, 1, 2)))  # stack and BHWC to BCHW
-            x = torch.from_numpy(x).to(p.device).type_as(p) / 255  # uint8 to fp16/32
+            if (
+                isinstance(ims, np.ndarray)
+                and ims.dtype == np.uint8
+                and ims.ndim == 3
+                and ims.shape[2] == 3
+                and min(ims.strides) > 0
+                and not augment
+            ):  # fast path: single HWC uint8 frame
+                x, shape1, pooled = self._preprocess_fast(ims, size, bgr, p)
+                n, shape0, files = 1, [ims.shape[:2]], ["image0.jpg"]
+                ims = [ims[..., ::-1] if bgr else ims]  # RGB view for Detections, no copy
+            else:
+                n, ims, shape0, shape1, files, x = self._preprocess(ims, size, bgr, p)
+                pooled = None
 
         with amp.autocast(autocast):
             # Inference
             with dt[1]:
                 y = self.model(x, augment=augment)  # forward
+                if pooled:
+                    self._release_input(pooled)
 
             # Post-process
             with dt[2]:
@@ -910,12 +996,43 @@ class AutoShape(nn.Module):
                     self.agnostic,
                     self.multi_label,
                     max_det=self.max_det,
+                    nk=self.nk,
                 )  # NMS
                 for i in range(n):
                     scale_boxes(shape1, y[i][:, :4], shape0[i])
+                    if self.nk:
+                        scale_keypoints(shape1, y[i][:, 6:], shape0[i])
 
             return Detections(ims, y, files, dt, self.names, x.shape)
 
+    def _preprocess(self, ims, size, bgr, p):
+        """Letterboxes and stacks a list of arbitrary inputs into a (b,3,h,w) tensor."""
+        n, ims = (len(ims), list(ims)) if isinstance(ims, (list, tuple)) else (1, [ims])  # number, list of images
+        shape0, shape1, files = [], [], []  # image and inference shapes, filenames
+        for i, im in enumerate(ims):
+            f = f"image{i}"  # filename
+            if isinstance(im, (str, Path)):  # filename or uri
+                im, f = Image.open(requests.get(im, stream=True).raw if str(im).startswith("http") else im), im
+                im = np.asarray(exif_transpose(im))
+            elif isinstance(im, Image.Image):  # PIL Image
+                im, f = np.asarray(exif_transpose(im)), getattr(im, "filename", f) or f
+            files.append(Path(f).with_suffix(".jpg").name)
+            if im.shape[0] < 5:  # image in CHW
+                im = im.transpose((1, 2, 0))  # reverse dataloader .transpose(2, 0, 1)
+            im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)  # enforce 3ch input
+            if bgr:
+                im = im[..., ::-1]  # BGR to RGB
+            s = im.shape[:2]  # HWC
+            shape0.append(s)  # image shape
+            g = max(size) / max(s)  # gain
+            shape1.append([int(y * g) for y in s])
+            ims[i] = im if im.data.contiguous else np.ascontiguousarray(im)  # update
+        shape1 = [make_divisible(x, self.stride) for x in np.array(shape1).max(0)]  # inf shape
+        x = [letterbox(im, shape1, auto=False)[0] for im in ims]  # pad
+        x = np.ascontiguousarray(np.array(x).transpose((0, 3, 1, 2)))  # stack and BHWC to BCHW
+        x = torch.from_numpy(x).to(p.device).type_as(p) / 255  # uint8 to fp16/32
+        return n, ims, shape0, shape1, files, x
+
 
 class Detections:
     """Manages YOLOv5 detection results with methods for visualization, saving, cropping, and exporting detections."""
@@ -923,6 +1040,8 @@ class Detections:
     def __init__(self, ims, pred, files, times=(0, 0, 0), names=None, shape=None):
         """Initializes the YOLOv5 Detections class with image info, predictions, filenames, timing and normalization."""
         super().__init__()
+        self.keypoints = [x[:, 6:] for x in pred]  # keypoints xy pixels, (n,0) if no landmark branch
+        pred = [x[:, :6] for x in pred]  # xyxy, conf, cls
         d = pred[0].device  # device
         gn = [torch.tensor([*(im.shape[i] for i in [1, 0, 1, 0]), 1, 1], device=d) for im in ims]  # normalizations
         self.ims = ims  # list of images as numpy arrays
@@ -943,6 +1062,8 @@ class Detections:
         s, crops = "", []
         for i, (im, pred) in enumerate(zip(self.ims, self.pred)):
             s += f"\nimage {i + 1}/{len(self.pred)}: {im.shape[0]}x{im.shape[1]} "  # string
+            if (render or crop or show or save) and not im.flags.c_contiguous:
+                im = np.ascontiguousarray(im)  # e.g. BGR-flipped view from AutoShape(bgr=True)
             if pred.shape[0]:
                 for c in pred[:, -1].unique():
                     n = (pred[:, -1] == c).sum()  # detections per class
@@ -1043,7 +1164,7 @@ class Detections:
         return [
             Detections(
                 [self.ims[i]],
-                [self.pred[i]],
+                [torch.cat((self.pred[i], self.keypoints[i]), 1)],
                 [self.files[i]],
                 self.times,
                 self.names,
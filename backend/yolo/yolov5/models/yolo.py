@@ -75,12 +75,16 @@ class Detect(nn.Module):
     stride = None  # strides computed during build
     dynamic = False  # force grid reconstruction
     export = False  # export mode
+    nk = 0  # keypoints per box, class default for checkpoints pickled before the landmark branch existed
 
-    def __init__(self, nc=80, anchors=(), ch=(), inplace=True):
-        """Initializes YOLOv5 detection layer with specified classes, anchors, channels, and inplace operations."""
+    def __init__(self, nc=80, anchors=(), ch=(), inplace=True, nk=0):
+        """Initializes YOLOv5 detection layer with specified classes, anchors, channels, inplace operations and an
+        optional landmark branch of `nk` keypoints per box.
+        """
         super().__init__()
         self.nc = nc  # number of classes
-        self.no = nc + 5  # number of outputs per anchor
+        self.nk = nk  # number of keypoints (landmarks) per box
+        self.no = nc + 5 + nk * 2  # number of outputs per anchor
         self.nl = len(anchors)  # number of detection layers
         self.na = len(anchors[0]) // 2  # number of anchors
         self.grid = [torch.empty(0) for _ in range(self.nl)]  # init grid
@@ -98,23 +102,57 @@ class Detect(nn.Module):
             x[i] = x[i].view(bs, self.na, self.no, ny, nx).permute(0, 1, 3, 4, 2).contiguous()
 
             if not self.training:  # inference
-                if self.dynamic or self.grid[i].shape[2:4] != x[i].shape[2:4]:
-                    self.grid[i], self.anchor_grid[i] = self._make_grid(nx, ny, i)
+                grid, anchor_grid = self.grid[i], self.anchor_grid[i]  # locals: concurrent calls may swap sizes
+                if self.dynamic or grid.shape[2:4] != (ny, nx) or anchor_grid.shape[2:4] != (ny, nx):
+                    grid, anchor_grid = self._cached_grid(nx, ny, i)
 
                 if isinstance(self, Segment):  # (boxes + masks)
                     xy, wh, conf, mask = x[i].split((2, 2, self.nc + 1, self.no - self.nc - 5), 4)
-                    xy = (xy.sigmoid() * 2 + self.grid[i]) * self.stride[i]  # xy
-                    wh = (wh.sigmoid() * 2) ** 2 * self.anchor_grid[i]  # wh
+                    xy = (xy.sigmoid() * 2 + grid) * self.stride[i]  # xy
+                    wh = (wh.sigmoid() * 2) ** 2 * anchor_grid  # wh
                     y = torch.cat((xy, wh, conf.sigmoid(), mask), 4)
+                elif self.nk:  # Detect (boxes + keypoints)
+                    xy, wh, conf, kpt = x[i].split((2, 2, self.nc + 1, self.nk * 2), 4)
+                    xy = (xy.sigmoid() * 2 + grid) * self.stride[i]  # xy
+                    wh = (wh.sigmoid() * 2) ** 2 * anchor_grid  # wh
+                    kpt = self._decode_keypoints(kpt, i, grid, anchor_grid)  # keypoints
+                    y = torch.cat((xy, wh, conf.sigmoid(), kpt), 4)
                 else:  # Detect (boxes only)
                     xy, wh, conf = x[i].sigmoid().split((2, 2, self.nc + 1), 4)
-                    xy = (xy * 2 + self.grid[i]) * self.stride[i]  # xy
-                    wh = (wh * 2) ** 2 * self.anchor_grid[i]  # wh
+                    xy = (xy * 2 + grid) * self.stride[i]  # xy
+                    wh = (wh * 2) ** 2 * anchor_grid  # wh
                     y = torch.cat((xy, wh, conf), 4)
                 z.append(y.view(bs, self.na * nx * ny, self.no))
 
         return x if self.training else (torch.cat(z, 1),) if self.export else (torch.cat(z, 1), x)
 
+    def _decode_keypoints(self, kpt, i, grid=None, anchor_grid=None):
+        """Decodes raw keypoint offsets `kpt(bs, na, ny, nx, nk*2)` to pixel xy, relative to anchor size and cell
+        centre.
+        """
+        grid = self.grid[i] if grid is None else grid
+        anchor_grid = self.anchor_grid[i] if anchor_grid is None else anchor_grid
+        bs, na, ny, nx, _ = kpt.shape
+        kpt = kpt.view(bs, na, ny, nx, self.nk, 2)
+        centre = (grid + 1.0) * self.stride[i]  # cell centre (grid includes -0.5 offset)
+        kpt = kpt * anchor_grid.unsqueeze(4) + centre.unsqueeze(4)
+        return kpt.view(bs, na, ny, nx, self.nk * 2)
+
+    def _cached_grid(self, nx, ny, i):
+        """Returns (grid, anchor_grid) for level `i` at ny x nx, cached per shape so that alternating inference sizes
+        (e.g. 640/480/320) reuse their grids instead of rebuilding them on every size change.
+        """
+        if self.dynamic:
+            g = self._make_grid(nx, ny, i)
+        else:
+            cache = self.__dict__.setdefault("_grid_cache", {})  # checkpoints pickled without the attribute
+            key = (i, ny, nx, self.anchors.device, self.anchors.dtype)
+            g = cache.get(key)
+            if g is None:
+                g = cache[key] = self._make_grid(nx, ny, i)
+        self.grid[i], self.anchor_grid[i] = g
+        return g
+
     def _make_grid(self, nx=20, ny=20, i=0, torch_1_10=check_version(torch.__version__, "1.10.0")):
         """Generates a mesh grid for anchor boxes with optional compatibility for torch versions < 1.10."""
         d = self.anchors[i].device
@@ -378,9 +416,10 @@ class ClassificationModel(BaseModel):
 def parse_model(d, ch):
     """Parses a YOLOv5 model from a dict `d`, configuring layers based on input channels `ch` and model architecture."""
     LOGGER.info(f"\n{'':>3}{'from':>18}{'n':>3}{'params':>10}  {'module':<40}{'arguments':<30}")
-    anchors, nc, gd, gw, act, ch_mul = (
+    anchors, nc, nk, gd, gw, act, ch_mul = (
         d["anchors"],
         d["nc"],
+        d.get("nk", 0),
         d["depth_multiple"],
         d["width_multiple"],
         d.get("activation"),
@@ -441,6 +480,8 @@ def parse_model(d, ch):
                 args[1] = [list(range(args[1] * 2))] * len(f)
             if m is Segment:
                 args[3] = make_divisible(args[3] * gw, ch_mul)
+            elif nk:  # landmark branch, i.e. Detect(nc, anchors, ch, inplace, nk)
+                args.extend([True, nk])
         elif m is Contract:
             c2 = ch[f] * args[0] ** 2
         elif m is Expand:
@@ -981,6 +981,29 @@ def scale_segments(img1_shape, segments, img0_shape, ratio_pad=None, normalize=F
     return segments
 
 
+def scale_keypoints(img1_shape, keypoints, img0_shape, ratio_pad=None):
+    """Rescales (n, nk*2) keypoint xy coordinates from img1_shape to img0_shape, optionally using provided
+    `ratio_pad`.
+    """
+    if ratio_pad is None:  # calculate from img0_shape
+        gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])  # gain  = old / new
+        pad = (img1_shape[1] - img0_shape[1] * gain) / 2, (img1_shape[0] - img0_shape[0] * gain) / 2  # wh padding
+    else:
+        gain = ratio_pad[0][0]
+        pad = ratio_pad[1]
+
+    keypoints[..., 0::2] -= pad[0]  # x padding
+    keypoints[..., 1::2] -= pad[1]  # y padding
+    keypoints /= gain
+    if isinstance(keypoints, torch.Tensor):
+        keypoints[..., 0::2] = keypoints[..., 0::2].clamp(0, img0_shape[1])  # x
+        keypoints[..., 1::2] = keypoints[..., 1::2].clamp(0, img0_shape[0])  # y
+    else:  # np.array
+        keypoints[..., 0::2] = keypoints[..., 0::2].clip(0, img0_shape[1])  # x
+        keypoints[..., 1::2] = keypoints[..., 1::2].clip(0, img0_shape[0])  # y
+    return keypoints
+
+
 def clip_boxes(boxes, shape):
     """Clips bounding box coordinates (xyxy) to fit within the specified image shape (height, width)."""
     if isinstance(boxes, torch.Tensor):  # faster individually
@@ -1013,11 +1036,14 @@ def non_max_suppression(
     labels=(),
     max_det=300,
     nm=0,  # number of masks
+    nk=0,  # number of keypoints
 ):
     """Non-Maximum Suppression (NMS) on inference results to reject overlapping detections.
 
+    Mask coefficients (nm) and keypoints (nk, xy pairs) trail the class scores and are carried through unchanged.
+
     Returns:
-        list of detections, on (n,6) tensor per image [xyxy, conf, cls]
+        list of detections, on (n,6+nm+2*nk) tensor per image [xyxy, conf, cls, masks, keypoints]
     """
     # Checks
     assert 0 <= conf_thres <= 1, f"Invalid Confidence threshold {conf_thres}, valid values are between 0.0 and 1.0"
@@ -1030,7 +1056,8 @@ def non_max_suppression(
     if mps:  # MPS not fully supported yet, convert tensors to CPU before NMS
         prediction = prediction.cpu()
     bs = prediction.shape[0]  # batch size
-    nc = prediction.shape[2] - nm - 5  # number of classes
+    ne = nm + nk * 2  # number of extra (mask + keypoint) columns
+    nc = prediction.shape[2] - ne - 5  # number of classes
     xc = prediction[..., 4] > conf_thres  # candidates
 
     # Settings
@@ -1043,8 +1070,8 @@ def non_max_suppression(
     merge = False  # use merge-NMS
 
     t = time.time()
-    mi = 5 + nc  # mask start index
-    output = [torch.zeros((0, 6 + nm), device=prediction.device)] * bs
+    mi = 5 + nc  # mask/keypoint start index
+    output = [torch.zeros((0, 6 + ne), device=prediction.device)] * bs
     for xi, x in enumerate(prediction):  # image index, image inference
         # Apply constraints
         # x[((x[..., 2:4] < min_wh) | (x[..., 2:4] > max_wh)).any(1), 4] = 0  # width-height
@@ -1053,7 +1080,7 @@ def non_max_suppression(
         # Cat apriori labels if autolabelling
         if labels and len(labels[xi]):
             lb = labels[xi]
-            v = torch.zeros((len(lb), nc + nm + 5), device=x.device)
+            v = torch.zeros((len(lb), nc + ne + 5), device=x.device)
             v[:, :4] = lb[:, 1:5]  # box
             v[:, 4] = 1.0  # conf
             v[range(len(lb)), lb[:, 0].long() + 5] = 1.0  # cls
@@ -1064,11 +1091,11 @@ def non_max_suppression(
             continue
 
         # Compute conf
-        x[:, 5:] *= x[:, 4:5]  # conf = obj_conf * cls_conf
+        x[:, 5 : x.shape[1] - nk * 2] *= x[:, 4:5]  # conf = obj_conf * cls_conf (keypoints left as pixel xy)
 
         # Box/Mask
         box = xywh2xyxy(x[:, :4])  # center_x, center_y, width, height) to (x1, y1, x2, y2)
-        mask = x[:, mi:]  # zero columns if no masks
+        mask = x[:, mi:]  # zero columns if no masks or keypoints
 
         # Detections matrix nx6 (xyxy, conf, cls)
         if multi_label:
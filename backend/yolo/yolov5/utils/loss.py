@@ -135,6 +135,7 @@ class ComputeLoss:
         self.na = m.na  # number of anchors
         self.nc = m.nc  # number of classes
         self.nl = m.nl  # number of layers
+        self.nk = getattr(m, "nk", 0)  # number of keypoints
         self.anchors = m.anchors
         self.device = device
 
@@ -143,7 +144,8 @@ class ComputeLoss:
         lcls = torch.zeros(1, device=self.device)  # class loss
         lbox = torch.zeros(1, device=self.device)  # box loss
         lobj = torch.zeros(1, device=self.device)  # object loss
-        tcls, tbox, indices, anchors = self.build_targets(p, targets)  # targets
+        lkpt = torch.zeros(1, device=self.device)  # keypoint loss
+        tcls, tbox, indices, anchors, tkpt = self.build_targets(p, targets)  # targets
 
         # Losses
         for i, pi in enumerate(p):  # layer index, layer predictions
@@ -152,7 +154,7 @@ class ComputeLoss:
 
             if n := b.shape[0]:
                 # pxy, pwh, _, pcls = pi[b, a, gj, gi].tensor_split((2, 4, 5), dim=1)  # faster, requires torch 1.8.0
-                pxy, pwh, _, pcls = pi[b, a, gj, gi].split((2, 2, 1, self.nc), 1)  # target-subset of predictions
+                pxy, pwh, _, pcls, pkpt = pi[b, a, gj, gi].split((2, 2, 1, self.nc, self.nk * 2), 1)  # predictions
 
                 # Regression
                 pxy = pxy.sigmoid() * 2 - 0.5
@@ -176,6 +178,13 @@ class ComputeLoss:
                     t[range(n), tcls[i]] = self.cp
                     lcls += self.BCEcls(pcls, t)  # BCE
 
+                # Keypoints
+                if self.nk:
+                    tk, vis = tkpt[i]  # keypoint targets, visibility mask
+                    pk = pkpt.view(n, self.nk, 2) * anchors[i][:, None] + 0.5  # same decoding as Detect()
+                    if vis.any():
+                        lkpt += nn.functional.smooth_l1_loss(pk[vis], tk[vis])
+
             obji = self.BCEobj(pi[..., 4], tobj)
             lobj += obji * self.balance[i]  # obj loss
             if self.autobalance:
@@ -186,17 +195,26 @@ class ComputeLoss:
         lbox *= self.hyp["box"]
         lobj *= self.hyp["obj"]
         lcls *= self.hyp["cls"]
+        lkpt *= self.hyp.get("kpt", 0.05)
         bs = tobj.shape[0]  # batch size
 
-        return (lbox + lobj + lcls) * bs, torch.cat((lbox, lobj, lcls)).detach()
+        # keypoint loss is part of the total but not of the (box, obj, cls) loss items logged by train.py
+        return (lbox + lobj + lcls + lkpt) * bs, torch.cat((lbox, lobj, lcls)).detach()
 
     def build_targets(self, p, targets):
-        """Prepares model targets from input targets (image,class,x,y,w,h) for loss computation, returning class, box,
-        indices, and anchors.
+        """Prepares model targets from input targets (image,class,x,y,w,h[,kx1,ky1,...]) for loss computation, returning
+        class, box, indices, anchors and keypoints.
+
+        Keypoint columns are only read when the Detect() head has a landmark branch (nk > 0); missing keypoints are
+        labelled with negative coordinates and masked out of the loss.
         """
-        na, nt = self.na, targets.shape[0]  # number of anchors, targets
-        tcls, tbox, indices, anch = [], [], [], []
-        gain = torch.ones(7, device=self.device)  # normalized to gridspace gain
+        na, nt, nk = self.na, targets.shape[0], self.nk  # number of anchors, targets, keypoints
+        tcls, tbox, indices, anch, tkpt = [], [], [], [], []
+        missing = 6 + nk * 2 - targets.shape[1]
+        if missing > 0:  # box-only labels (standard dataloader): keypoints absent, masked via negative coords
+            targets = torch.cat((targets, targets.new_full((nt, missing), -1.0)), 1)
+        targets = targets[:, : 6 + nk * 2]  # image, class, box, keypoints
+        gain = torch.ones(7 + nk * 2, device=self.device)  # normalized to gridspace gain
         ai = torch.arange(na, device=self.device).float().view(na, 1).repeat(1, nt)  # same as .repeat_interleave(nt)
         targets = torch.cat((targets.repeat(na, 1, 1), ai[..., None]), 2)  # append anchor indices
 
@@ -219,6 +237,8 @@ class ComputeLoss:
         for i in range(self.nl):
             anchors, shape = self.anchors[i], p[i].shape
             gain[2:6] = torch.tensor(shape)[[3, 2, 3, 2]]  # xyxy gain
+            if nk:
+                gain[6 : 6 + nk * 2] = torch.tensor(shape)[[3, 2]].repeat(nk)  # keypoints xy gain
 
             # Match targets to anchors
             t = targets * gain  # shape(3,n,7)
@@ -242,7 +262,7 @@ class ComputeLoss:
                 offsets = 0
 
             # Define
-            bc, gxy, gwh, a = t.chunk(4, 1)  # (image, class), grid xy, grid wh, anchors
+            bc, gxy, gwh, gk, a = t.split((2, 2, 2, nk * 2, 1), 1)  # (image, class), grid xy, grid wh, kpts, anchors
             a, (b, c) = a.long().view(-1), bc.long().T  # anchors, image, class
             gij = (gxy - offsets).long()
             gi, gj = gij.T  # grid indices
@@ -252,5 +272,8 @@ class ComputeLoss:
             tbox.append(torch.cat((gxy - gij, gwh), 1))  # box
             anch.append(anchors[a])  # anchors
             tcls.append(c)  # class
+            if nk:
+                gk = gk.view(-1, nk, 2)
+                tkpt.append((gk - gij[:, None], gk.gt(0).all(2)))  # keypoints relative to cell, visibility
 
-        return tcls, tbox, indices, anch
+        return tcls, tbox, indices, anch, tkpt
@@ -13,6 +13,7 @@ CREATE TABLE IF NOT EXISTS sessions (
     started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     ended_at TIMESTAMPTZ,
     preview_image TEXT,
+    preview_thumb TEXT,
     status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'finished')),
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
@@ -32,6 +33,9 @@ CREATE TABLE IF NOT EXISTS session_screenshots (
     image_url TEXT NOT NULL,
     direction TEXT NOT NULL CHECK (direction IN ('KIRI', 'KANAN')),
     captured_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    clip_url TEXT,
+    thumb_url TEXT,
+    medium_url TEXT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
@@ -91,6 +95,17 @@ CREATE POLICY "Users can insert own screenshots"
         )
     );
 
+-- Users can only update screenshots in their own sessions (clip_url)
+CREATE POLICY "Users can update own screenshots"
+    ON session_screenshots FOR UPDATE
+    USING (
+        EXISTS (
+            SELECT 1 FROM sessions
+            WHERE sessions.id = session_screenshots.session_id
+            AND sessions.user_id = auth.uid()
+        )
+    );
+
 -- Users can only delete screenshots from their own sessions
 CREATE POLICY "Users can delete own screenshots"
     ON session_screenshots FOR DELETE
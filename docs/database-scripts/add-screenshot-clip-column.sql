@@ -0,0 +1,23 @@
+-- ============================================
+-- ADD clip_url COLUMN TO session_screenshots
+-- ============================================
+-- Evidence clip (MP4, seconds before/after the screenshot) uploaded by detection_stream.py
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE session_screenshots
+ADD COLUMN IF NOT EXISTS clip_url TEXT;
+
+-- clip_url is filled in after the clip finishes encoding
+DROP POLICY IF EXISTS "Users can update own screenshots" ON session_screenshots;
+CREATE POLICY "Users can update own screenshots"
+    ON session_screenshots FOR UPDATE
+    USING (
+        EXISTS (
+            SELECT 1 FROM sessions
+            WHERE sessions.id = session_screenshots.session_id
+            AND sessions.user_id = auth.uid()
+        )
+    );
+
+-- Verify column was added
+SELECT id, session_id, image_url, clip_url FROM session_screenshots LIMIT 5;
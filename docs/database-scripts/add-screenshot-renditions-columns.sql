@@ -0,0 +1,17 @@
+-- ============================================
+-- ADD RENDITION COLUMNS (thumbnail / medium)
+-- ============================================
+-- detection_stream.py uploads original PNG + medium/thumbnail JPEG per screenshot
+-- History list loads preview_thumb, detail page loads medium_url
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE session_screenshots
+ADD COLUMN IF NOT EXISTS thumb_url TEXT,
+ADD COLUMN IF NOT EXISTS medium_url TEXT;
+
+ALTER TABLE sessions
+ADD COLUMN IF NOT EXISTS preview_thumb TEXT;
+
+-- Verify columns were added
+SELECT id, image_url, thumb_url, medium_url FROM session_screenshots LIMIT 5;
+SELECT id, preview_image, preview_thumb FROM sessions LIMIT 5;
@@ -47,7 +47,7 @@ export async function fetchSessionHistory(): Promise<SessionRecord[]> {
       id: session.id,
       started_at: session.started_at,
       ended_at: session.ended_at,
-      preview_image: session.preview_image,
+      preview_image: session.preview_thumb || session.preview_image,  // thumbnail for list cards
       status: session.status,
       screenshot_count: session.screenshot_count || 0
     }));
@@ -110,9 +110,15 @@ export default function Detection() {
       const response = await fetch(`${API_URL}/api/detection/frame`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ image: imageData })
+        body: JSON.stringify({ image: imageData, session_id: sessionId || undefined })
       });
 
+      // Frame di-drop admission (409 diganti frame baru / 503 server penuh): lewati,
+      // frame berikutnya dikirim sesuai jadwal capture
+      if (response.status === 409 || response.status === 503) {
+        console.log(`⏭️ Frame dropped (${response.status})`);
+        return;
+      }
       if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
       const data = await response.json();
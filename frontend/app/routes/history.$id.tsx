@@ -10,6 +10,9 @@ interface Screenshot {
   id: string;
   session_id: string;
   image_url: string;
+  thumb_url?: string | null;
+  medium_url?: string | null;
+  clip_url?: string | null;
   direction: string;
   captured_at: string;
 }
@@ -216,7 +219,7 @@ export default function HistoryDetail() {
               <div key={screenshot.id} className="bg-white rounded-xl shadow-lg overflow-hidden">
                 <div className="relative aspect-video bg-slate-200">
                   <img
-                    src={screenshot.image_url}
+                    src={screenshot.medium_url || screenshot.image_url}
                     alt={`Screenshot ${screenshot.direction}`}
                     className="w-full h-full object-cover"
                     onError={(e) => {
@@ -231,6 +234,15 @@ export default function HistoryDetail() {
                   <p className="text-sm text-gray-600 mb-3">
                     {formatDate(screenshot.captured_at)}
                   </p>
+                  {screenshot.clip_url && (
+                    <video
+                      src={screenshot.clip_url}
+                      controls
+                      preload="none"
+                      poster={screenshot.thumb_url || undefined}
+                      className="w-full rounded-lg mb-3 bg-black"
+                    />
+                  )}
                   <button
                     onClick={() => handleDownload(screenshot.image_url, screenshot.direction, screenshot.captured_at)}
                     className="w-full px-4 py-2 text-white rounded-lg font-medium transition-colors flex items-center justify-center gap-2"